@@ -0,0 +1,66 @@
+"""Full packet decode throughput in process versus a DecodePool.
+
+Decodes a burst of Full packets spread over many contracts with
+``DhanFeed.process_data`` and with ``DecodePool`` using 1, 2 and 4 workers,
+in the default and numeric modes. The pool figure includes sending the frames,
+pickling the packets back and unpickling them in this process.
+
+Run from the repository root with ``PYTHONPATH=. python benchmarks/bench_decodepool.py``.
+"""
+
+import struct
+import threading
+import time
+
+from dhanhq.decodepool import DecodePool
+from dhanhq.marketfeed import DhanFeed
+
+FRAMES = 100_000
+DEPTH = b"".join(struct.pack('<IIHHff', 100, 200, 3, 4, 99.5 - i, 100.5 + i) for i in range(5))
+
+
+def full(security_id):
+    return struct.pack('<BHBIfHIfIIIIIIffff', 8, 162, 2, security_id, 210.5, 50, 1700000000, 209.75,
+                       250000, 7000, 8000, 120000, 130000, 110000, 205.0, 200.0, 215.0, 199.0) + DEPTH
+
+
+def time_in_process(frames, numeric):
+    feed = DhanFeed('CID', 'TOKEN', [], version='v2', numeric=numeric)
+    start = time.perf_counter()
+    for frame in frames:
+        feed.process_data(frame)
+    return time.perf_counter() - start
+
+
+def time_pool(frames, numeric, workers):
+    received = [0]
+    done = threading.Event()
+
+    def on_packets(packets):
+        received[0] += len(packets)
+        if received[0] == len(frames):
+            done.set()
+
+    pool = DecodePool(workers, numeric=numeric, batch_size=512)
+    pool.start(on_packets)
+    start = time.perf_counter()
+    for frame in frames:
+        pool.submit(frame)
+    pool.flush()
+    done.wait()
+    elapsed = time.perf_counter() - start
+    pool.close()
+    return elapsed
+
+
+def main():
+    frames = [full(40000 + i % 3000) for i in range(FRAMES)]
+    for numeric in (False, True):
+        mode = 'numeric' if numeric else 'default'
+        print(f"{mode} in process: {FRAMES / time_in_process(frames, numeric):,.0f} packets/s")
+        for workers in (1, 2, 4):
+            print(f"{mode} pool x{workers}: {FRAMES / time_pool(frames, numeric, workers):,.0f} packets/s")
+
+
+if __name__ == "__main__":
+    main()
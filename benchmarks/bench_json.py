@@ -0,0 +1,82 @@
+"""Cost of decoding large REST responses.
+
+Parses a synthetic day's order book (about 470 KB, the size of a busy
+``get_order_list`` or ``option_chain`` response) through ``dhanhq._parse_response``
+as it was (standard library ``json``), with every available backend of
+``dhanhq.jsonbackend``, and with ``lazy_responses`` when only ``status`` is read
+and when ``data`` is read as well. Also times encoding an order payload.
+
+Run from the repository root with ``PYTHONPATH=. python benchmarks/bench_json.py``.
+"""
+
+import json
+import time
+
+import requests
+
+from dhanhq import jsonbackend
+from dhanhq.dhanhq import dhanhq
+
+ORDERS = 600
+ROUNDS = 50
+
+
+def make_response():
+    orders = [{
+        "dhanClientId": "1000000001", "orderId": str(112111182198 + i), "correlationId": f"basket-{i}",
+        "orderStatus": "TRADED", "transactionType": "BUY", "exchangeSegment": "NSE_FNO", "productType": "INTRADAY",
+        "orderType": "MARKET", "validity": "DAY", "tradingSymbol": f"NIFTY-Jan2024-{21000 + i}-CE",
+        "securityId": str(40000 + i), "quantity": 50, "disclosedQuantity": 0, "price": 112.35 + i,
+        "triggerPrice": 0.0, "afterMarketOrder": False, "boProfitValue": 0.0, "boStopLossValue": 0.0,
+        "legName": "NA", "createTime": "2024-01-05 09:15:01", "updateTime": "2024-01-05 09:15:02",
+        "exchangeTime": "2024-01-05 09:15:02", "drvExpiryDate": "2024-01-11", "drvOptionType": "CALL",
+        "drvStrikePrice": 21000.0 + i, "omsErrorCode": "0", "omsErrorDescription": "", "filledQty": 50,
+        "algoId": "", "remainingQuantity": 0, "averageTradedPrice": 112.4 + i,
+    } for i in range(ORDERS)]
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(orders).encode()
+    return response
+
+
+def time_parse(api, response, read_data):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        parsed = api._parse_response(response)
+        if parsed["status"] == "success" and read_data:
+            parsed["data"]
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def time_dumps():
+    payload = {"dhanClientId": "1000000001", "transactionType": "BUY", "exchangeSegment": "NSE_FNO",
+               "productType": "INTRADAY", "orderType": "LIMIT", "validity": "DAY", "securityId": "43492",
+               "quantity": 50, "disclosedQuantity": 0, "price": 112.35, "afterMarketOrder": False,
+               "boProfitValue": None, "boStopLossValue": None, "triggerPrice": 0.0}
+    rounds = 20_000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        jsonbackend.dumps(payload)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    response = make_response()
+    print(f"order book: {ORDERS} orders, {len(response.content) / 1024:.0f} KB")
+    eager = dhanhq("1000000001", "TOKEN")
+    lazy = dhanhq("1000000001", "TOKEN", lazy_responses=True)
+    for name in jsonbackend.BACKENDS:
+        try:
+            jsonbackend.set_backend(name)
+        except ValueError:
+            print(f"{name:>7}: not installed")
+            continue
+        print(f"{name:>7}: parse {time_parse(eager, response, True) * 1e3:7.2f} ms"
+              f" | lazy, status only {time_parse(lazy, response, False) * 1e6:6.1f} us"
+              f" | lazy + data {time_parse(lazy, response, True) * 1e3:7.2f} ms"
+              f" | dumps order {time_dumps() * 1e6:5.2f} us")
+    jsonbackend.set_backend()
+
+
+if __name__ == "__main__":
+    main()
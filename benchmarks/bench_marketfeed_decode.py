@@ -0,0 +1,109 @@
+"""Packets/sec of the DhanFeed binary decoder.
+
+Compares the original per-packet ``struct.unpack`` decoding (reproduced below
+as the baseline) with the precompiled decoders in :mod:`dhanhq.marketfeed`,
+both in the default string mode and in numeric mode.
+
+Run from the repository root with ``PYTHONPATH=. python benchmarks/bench_marketfeed_decode.py``.
+"""
+
+import struct
+import time
+from datetime import datetime
+
+from dhanhq.marketfeed import DhanFeed
+
+PACKETS = 200_000
+
+
+def make_packets():
+    depth = b"".join(struct.pack('<IIHHff', 100 + i, 200 + i, 3, 4, 99.5 - i, 100.5 + i) for i in range(5))
+    ticker = struct.pack('<BHBIfI', 2, 16, 1, 1333, 1520.25, 1700000000)
+    quote = struct.pack('<BHBIfHIfIIIffff', 4, 50, 1, 1333, 1520.25, 10, 1700000000, 1519.5,
+                        100000, 5000, 6000, 1510.0, 1505.0, 1525.0, 1500.0)
+    full = struct.pack('<BHBIfHIfIIIIIIffff', 8, 162, 2, 49081, 210.5, 50, 1700000000, 209.75,
+                       250000, 7000, 8000, 120000, 130000, 110000, 205.0, 200.0, 215.0, 199.0) + depth
+    return {"ticker": ticker, "quote": quote, "full": full}
+
+
+def utc_time(epoch_time):
+    return datetime.utcfromtimestamp(epoch_time).strftime('%H:%M:%S')
+
+
+def legacy_depth(market_depth_binary):
+    packet_format = '<IIHHff'
+    packet_size = struct.calcsize(packet_format)
+    depth = []
+    for i in range(5):
+        start_idx = i * packet_size
+        end_idx = start_idx + packet_size
+        current_packet = struct.unpack(packet_format, market_depth_binary[start_idx:end_idx])
+        depth.append({
+            "bid_quantity": current_packet[0],
+            "ask_quantity": current_packet[1],
+            "bid_orders": current_packet[2],
+            "ask_orders": current_packet[3],
+            "bid_price": "{:.2f}".format(current_packet[4]),
+            "ask_price": "{:.2f}".format(current_packet[5])
+        })
+    return depth
+
+
+def legacy_decode(data):
+    """Decoder as it was before the precompiled layouts were introduced."""
+    first_byte = struct.unpack('<B', data[0:1])[0]
+    if first_byte == 2:
+        unpack_ticker = [struct.unpack('<BHBIfI', data[0:16])]
+        return {
+            "type": 'Ticker Data',
+            "exchange_segment": unpack_ticker[0][2],
+            "security_id": unpack_ticker[0][3],
+            "LTP": "{:.2f}".format(unpack_ticker[0][4]),
+            "LTT": utc_time(unpack_ticker[0][5])
+        }
+    if first_byte == 4:
+        q = [struct.unpack('<BHBIfHIfIIIffff', data[0:50])]
+        return {
+            "type": 'Quote Data', "exchange_segment": q[0][2], "security_id": q[0][3],
+            "LTP": "{:.2f}".format(q[0][4]), "LTQ": q[0][5], "LTT": utc_time(q[0][6]),
+            "avg_price": "{:.2f}".format(q[0][7]), "volume": q[0][8],
+            "total_sell_quantity": q[0][9], "total_buy_quantity": q[0][10],
+            "open": "{:.2f}".format(q[0][11]), "close": "{:.2f}".format(q[0][12]),
+            "high": "{:.2f}".format(q[0][13]), "low": "{:.2f}".format(q[0][14])
+        }
+    if first_byte == 8:
+        f = [struct.unpack('<BHBIfHIfIIIIIIffff100s', data[0:162])]
+        return {
+            "type": 'Full Data', "exchange_segment": f[0][2], "security_id": f[0][3],
+            "LTP": "{:.2f}".format(f[0][4]), "LTQ": f[0][5], "LTT": utc_time(f[0][6]),
+            "avg_price": "{:.2f}".format(f[0][7]), "volume": f[0][8],
+            "total_sell_quantity": f[0][9], "total_buy_quantity": f[0][10],
+            "OI": f[0][11], "oi_day_high": f[0][12], "oi_day_low": f[0][13],
+            "open": "{:.2f}".format(f[0][14]), "close": "{:.2f}".format(f[0][15]),
+            "high": "{:.2f}".format(f[0][16]), "low": "{:.2f}".format(f[0][17]),
+            "depth": legacy_depth(f[0][18])
+        }
+
+
+def measure(decode, packet, count=PACKETS):
+    start = time.perf_counter()
+    for _ in range(count):
+        decode(packet)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    feed = DhanFeed('CID', 'TOKEN', [], version='v2')
+    numeric_feed = DhanFeed('CID', 'TOKEN', [], version='v2', numeric=True)
+    packets = make_packets()
+    print(f"{'packet':<8}{'before (pkt/s)':>18}{'after (pkt/s)':>18}{'numeric (pkt/s)':>18}{'speedup':>10}")
+    for name, packet in packets.items():
+        assert legacy_decode(packet) == feed.process_data(packet)
+        before = measure(legacy_decode, packet)
+        after = measure(feed.process_data, packet)
+        numeric = measure(numeric_feed.process_data, packet)
+        print(f"{name:<8}{before:>18,.0f}{after:>18,.0f}{numeric:>18,.0f}{numeric / before:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Decode throughput over a tick recording.
+
+Replays a recording made with ``TickRecorder`` through ``DhanFeed.process_data``
+as fast as possible, in the default and numeric modes. Without an argument a
+synthetic session of Ticker, Quote and Full frames is recorded first.
+
+Run from the repository root with ``PYTHONPATH=. python benchmarks/bench_replay.py [recording]``.
+"""
+
+import random
+import struct
+import sys
+import tempfile
+import time
+
+from dhanhq.marketfeed import DhanFeed
+from dhanhq.recorder import TickRecorder, TickReplay, read_frames
+
+FRAMES = 200_000
+
+
+def record_synthetic(directory):
+    depth = b"".join(struct.pack('<IIHHff', 100, 200, 3, 4, 99.5, 100.5) for _ in range(5))
+    rng = random.Random(7)
+    with TickRecorder(directory, compress=True) as recorder:
+        for i in range(FRAMES):
+            security_id = rng.randrange(1000, 1500)
+            kind = rng.random()
+            if kind < 0.6:
+                frame = struct.pack('<BHBIfI', 2, 16, 1, security_id, 100 + kind, 1700000000 + i // 1000)
+            elif kind < 0.9:
+                frame = struct.pack('<BHBIfHIfIIIffff', 4, 50, 1, security_id, 100.0, 10, 1700000000, 99.5,
+                                    100000, 5000, 6000, 98.0, 97.0, 101.0, 96.0)
+            else:
+                frame = struct.pack('<BHBIfHIfIIIIIIffff', 8, 162, 2, security_id, 210.5, 50, 1700000000, 209.75,
+                                    250000, 7000, 8000, 120000, 130000, 110000, 205.0, 200.0, 215.0, 199.0) + depth
+            recorder.write(1700000000 + i / 1000, frame)
+    return directory
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else record_synthetic(tempfile.mkdtemp())
+    start = time.perf_counter()
+    frames = sum(1 for _ in read_frames(source))
+    read = time.perf_counter() - start
+    print(f"read {frames} frames: {frames / read:,.0f} frames/s")
+    for numeric in (False, True):
+        feed = DhanFeed('CID', 'TOKEN', [], version='v2', numeric=numeric)
+        start = time.perf_counter()
+        decoded = sum(1 for _ in TickReplay(source, speed=None).replay(feed))
+        elapsed = time.perf_counter() - start
+        print(f"replay {'numeric' if numeric else 'default'}: {decoded / elapsed:,.0f} packets/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Time to push a 5,000 instrument subscription through DhanFeed.
+
+Runs ``subscribe_instruments`` against an in-memory websocket in v1 (binary
+packets) and v2 (JSON messages) modes, and compares the v1 packet builder
+with the original ``bytes +=`` implementation reproduced below.
+
+Run from the repository root with ``PYTHONPATH=. python benchmarks/bench_subscription.py``.
+"""
+
+import asyncio
+import struct
+import time
+
+from dhanhq import marketfeed
+from dhanhq.marketfeed import DhanFeed
+
+INSTRUMENTS = 5_000
+ROUNDS = 20
+
+
+class NullWebSocket:
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, message):
+        self.sent += 1
+
+
+def legacy_subscription_packet(client_id, instruments, feed_request_code):
+    """Packet builder as it was before the preallocated buffer was introduced."""
+    num_instruments = len(instruments)
+    header = struct.pack('<bH30s50s', feed_request_code, 83 + 4 + num_instruments * 21,
+                         client_id.encode('utf-8'), b"\0" * 50)
+    num_instruments_bytes = struct.pack('<I', num_instruments)
+    instrument_info = b""
+    for exchange_segment, security_id in instruments:
+        instrument_info += struct.pack('<B20s', exchange_segment, security_id.encode('utf-8'))
+    for i in range(100 - num_instruments):
+        instrument_info += struct.pack('<B20s', 0, "".encode('utf-8'))
+    return header + num_instruments_bytes + instrument_info
+
+
+def make_instruments():
+    return [(marketfeed.NSE_FNO, str(40000 + i), marketfeed.Quote) for i in range(INSTRUMENTS)]
+
+
+def time_subscribe(version):
+    feed = DhanFeed('1000000001', 'TOKEN', make_instruments(), version=version)
+    feed.is_authorized = True
+    feed.ws = NullWebSocket()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        asyncio.run(feed.subscribe_instruments())
+    return (time.perf_counter() - start) / ROUNDS, feed.ws.sent // ROUNDS
+
+
+def time_packets(build):
+    batches = [[(ex, token) for ex, token, _ in make_instruments()[i:i + 100]] for i in range(0, INSTRUMENTS, 100)]
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for batch in batches:
+            build(batch)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def main():
+    feed = DhanFeed('1000000001', 'TOKEN', [], version='v1')
+    sample = [(marketfeed.NSE, str(i)) for i in range(37)]
+    assert feed.create_subscription_packet(sample, 15) == legacy_subscription_packet('1000000001', sample, 15)
+
+    before = time_packets(lambda batch: legacy_subscription_packet('1000000001', batch, 17))
+    after = time_packets(lambda batch: feed.create_subscription_packet(batch, 17))
+    print(f"v1 packets for {INSTRUMENTS} instruments: before {before * 1e3:.2f} ms, after {after * 1e3:.2f} ms "
+          f"({before / after:.1f}x)")
+    for version in ('v1', 'v2'):
+        elapsed, messages = time_subscribe(version)
+        print(f"{version} subscribe_instruments: {elapsed * 1e3:.2f} ms for {messages} messages")
+
+
+if __name__ == "__main__":
+    main()
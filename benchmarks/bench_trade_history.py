@@ -0,0 +1,57 @@
+"""Time to read a long trade history page by page.
+
+Fetches 40 pages of 50 trades from a fake ``get_trade_history`` with a fixed
+round-trip latency (25 ms by default), one page at a time as a hand-written
+loop does, and through ``dhanhq.tradehistory.iter_pages`` with several prefetch
+depths.
+
+Run from the repository root with ``PYTHONPATH=. python benchmarks/bench_trade_history.py``.
+"""
+
+import time
+
+from dhanhq.tradehistory import iter_pages
+
+PAGES = 40
+PAGE_SIZE = 50
+LATENCY = 0.025
+
+
+def fetch(page_number):
+    time.sleep(LATENCY)
+    data = [{"orderId": f"{page_number}-{i}", "tradedQuantity": 1} for i in range(PAGE_SIZE)]
+    return {"status": "success", "remarks": "", "data": data if page_number < PAGES else []}
+
+
+def manual_loop():
+    trades = 0
+    page_number = 0
+    while True:
+        data = fetch(page_number)["data"]
+        if not data:
+            return trades
+        trades += len(data)
+        page_number += 1
+
+
+def streamed(prefetch):
+    return sum(len(page) for page in iter_pages(fetch, prefetch=prefetch))
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    trades = function(*args)
+    return trades, time.perf_counter() - start
+
+
+def main():
+    print(f"{PAGES} pages of {PAGE_SIZE} trades, {LATENCY * 1e3:.0f} ms per request")
+    trades, seconds = timed(manual_loop)
+    print(f"  manual loop: {seconds * 1e3:7.1f} ms ({trades} trades)")
+    for prefetch in (0, 1, 2, 4, 8):
+        trades, seconds = timed(streamed, prefetch)
+        print(f"  prefetch={prefetch}: {seconds * 1e3:7.1f} ms ({trades} trades)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
+import asyncio
 import logging
 import aiohttp
-from json import loads as json_loads, dumps as json_dumps
+
+from .basket import (REVERSE, basket_response, check_rollback, filled_quantity, leg_failed, leg_result, prepare_legs,
+                     reverse_leg)
+from .jsonbackend import loads as json_loads, dumps as json_dumps
+from .ratelimit import endpoint_class
 
 
 class AsyncDhanHQ:
@@ -33,7 +38,7 @@ class AsyncDhanHQ:
     DAY = "DAY"
     IOC = "IOC"
 
-    def __init__(self, client_id, access_token, disable_ssl=False, session=None):
+    def __init__(self, client_id, access_token, disable_ssl=False, session=None, rate_limiter=None):
         self.client_id = str(client_id)
         self.access_token = access_token
         self.base_url = "https://api.dhan.co/v2"
@@ -46,17 +51,24 @@ class AsyncDhanHQ:
         self.disable_ssl = disable_ssl
         self.session = session or aiohttp.ClientSession(timeout=self.timeout)
         self._session_owner = session is None
+        self.rate_limiter = rate_limiter
 
     async def close(self):
         if self._session_owner:
             await self.session.close()
 
+    async def _throttle(self, method, url):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(endpoint_class(method, url))
+
     async def _parse_response(self, response):
+        if self.rate_limiter is not None and response.status == 429:
+            self.rate_limiter.throttled(endpoint_class(response.method, str(response.url)))
         try:
             status = "failure"
             remarks = ""
             data = ""
-            python_response = await response.json(content_type=None)
+            python_response = await response.json(content_type=None, loads=json_loads)
             if response.status == 200:
                 status = "success"
                 data = python_response
@@ -79,6 +91,7 @@ class AsyncDhanHQ:
     async def get_order_list(self):
         try:
             url = self.base_url + "/orders"
+            await self._throttle("GET", url)
             resp = await self.session.get(url, headers=self.header, ssl=self._ssl())
             return await self._parse_response(resp)
         except Exception as e:
@@ -88,6 +101,7 @@ class AsyncDhanHQ:
     async def get_order_by_id(self, order_id):
         try:
             url = self.base_url + f"/orders/{order_id}"
+            await self._throttle("GET", url)
             resp = await self.session.get(url, headers=self.header, ssl=self._ssl())
             return await self._parse_response(resp)
         except Exception as e:
@@ -143,6 +157,7 @@ class AsyncDhanHQ:
             else:
                 payload["triggerPrice"] = 0.0
 
+            await self._throttle("POST", url)
             resp = await self.session.post(
                 url, data=json_dumps(payload), headers=self.header, ssl=self._ssl()
             )
@@ -151,9 +166,51 @@ class AsyncDhanHQ:
             logging.error("Exception in AsyncDhanHQ>>place_order: %s", e)
             return {"status": "failure", "remarks": str(e), "data": ""}
 
+    async def cancel_order(self, order_id):
+        try:
+            url = self.base_url + f"/orders/{order_id}"
+            await self._throttle("DELETE", url)
+            resp = await self.session.delete(url, headers=self.header, ssl=self._ssl())
+            return await self._parse_response(resp)
+        except Exception as e:
+            logging.error("Exception in AsyncDhanHQ>>cancel_order: %s", e)
+            return {"status": "failure", "remarks": str(e), "data": ""}
+
+    async def place_basket_order(self, legs, rollback=None, max_concurrency=None, tag_prefix=None):
+        """Places the legs concurrently, see :meth:`dhanhq.dhanhq.place_basket_order`."""
+        try:
+            check_rollback(rollback)
+            legs = prepare_legs(legs, tag_prefix)
+            semaphore = asyncio.Semaphore(max_concurrency or len(legs))
+
+            async def place(leg):
+                async with semaphore:
+                    return await self.place_order(**leg)
+
+            responses = await asyncio.gather(*(place(leg) for leg in legs))
+            results = [leg_result(leg, response) for leg, response in zip(legs, responses)]
+            actions = None
+            if rollback and any(leg_failed(result) for result in results):
+                actions = list(await asyncio.gather(*(
+                    self._rollback_leg(leg, result["orderId"], rollback)
+                    for leg, result in zip(legs, results) if not leg_failed(result))))
+            return basket_response(results, actions)
+        except Exception as e:
+            logging.error("Exception in AsyncDhanHQ>>place_basket_order: %s", e)
+            return {"status": "failure", "remarks": str(e), "data": ""}
+
+    async def _rollback_leg(self, leg, order_id, rollback):
+        action = {"orderId": order_id, "cancel": await self.cancel_order(order_id), "reverse": None}
+        if rollback == REVERSE:
+            quantity = filled_quantity(await self.get_order_by_id(order_id))
+            if quantity:
+                action["reverse"] = await self.place_order(**reverse_leg(leg, quantity))
+        return action
+
     async def get_positions(self):
         try:
             url = self.base_url + "/positions"
+            await self._throttle("GET", url)
             resp = await self.session.get(url, headers=self.header, ssl=self._ssl())
             return await self._parse_response(resp)
         except Exception as e:
@@ -181,6 +238,7 @@ class AsyncDhanHQ:
                 "fromDate": from_date,
                 "toDate": to_date,
             })
+            await self._throttle("POST", url)
             resp = await self.session.post(
                 url, data=payload, headers=self.header, ssl=self._ssl()
             )
@@ -210,6 +268,7 @@ class AsyncDhanHQ:
                 "fromDate": from_date,
                 "toDate": to_date,
             })
+            await self._throttle("POST", url)
             resp = await self.session.post(
                 url, data=payload, headers=self.header, ssl=self._ssl()
             )
@@ -228,6 +287,7 @@ class AsyncDhanHQ:
                 "access-token": self.access_token,
                 "client-id": self.client_id,
             }
+            await self._throttle("POST", url)
             resp = await self.session.post(
                 url, data=payload, headers=headers, ssl=self._ssl()
             )
@@ -246,6 +306,7 @@ class AsyncDhanHQ:
                 "access-token": self.access_token,
                 "client-id": self.client_id,
             }
+            await self._throttle("POST", url)
             resp = await self.session.post(
                 url, data=payload, headers=headers, ssl=self._ssl()
             )
@@ -264,6 +325,7 @@ class AsyncDhanHQ:
                 "access-token": self.access_token,
                 "client-id": self.client_id,
             }
+            await self._throttle("POST", url)
             resp = await self.session.post(
                 url, data=payload, headers=headers, ssl=self._ssl()
             )
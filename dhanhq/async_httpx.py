@@ -1,6 +1,11 @@
+import asyncio
 import logging
 import httpx
-from json import dumps as json_dumps
+
+from .basket import (REVERSE, basket_response, check_rollback, filled_quantity, leg_failed, leg_result, prepare_legs,
+                     reverse_leg)
+from .jsonbackend import loads as json_loads, dumps as json_dumps
+from .ratelimit import endpoint_class
 
 class AsyncDhanHQ:
     """Asynchronous variant of :class:`dhanhq.dhanhq` using ``httpx.AsyncClient``."""
@@ -37,7 +42,8 @@ class AsyncDhanHQ:
     DAY = "DAY"
     IOC = "IOC"
 
-    def __init__(self, client_id, access_token, disable_ssl: bool = False, session: httpx.AsyncClient | None = None):
+    def __init__(self, client_id, access_token, disable_ssl: bool = False, session: httpx.AsyncClient | None = None,
+                 rate_limiter=None):
         self.client_id = str(client_id)
         self.access_token = access_token
         self.base_url = "https://api.dhan.co/v2"
@@ -54,14 +60,21 @@ class AsyncDhanHQ:
         else:
             self.session = session
             self._session_owner = False
+        self.rate_limiter = rate_limiter
 
     async def close(self):
         if self._session_owner:
             await self.session.aclose()
 
+    async def _throttle(self, method, url):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(endpoint_class(method, url))
+
     async def _parse_response(self, response: httpx.Response):
+        if self.rate_limiter is not None and response.status_code == 429:
+            self.rate_limiter.throttled(endpoint_class(response.request.method, str(response.url)))
         try:
-            python_response = response.json()
+            python_response = json_loads(response.content)
             if response.status_code == 200:
                 return {"status": "success", "remarks": "", "data": python_response}
             return {
@@ -80,6 +93,7 @@ class AsyncDhanHQ:
     async def get_order_list(self):
         try:
             url = self.base_url + "/orders"
+            await self._throttle("GET", url)
             resp = await self.session.get(url, headers=self.header)
             return await self._parse_response(resp)
         except Exception as e:  # pragma: no cover - defensive
@@ -89,6 +103,7 @@ class AsyncDhanHQ:
     async def get_order_by_id(self, order_id):
         try:
             url = self.base_url + f"/orders/{order_id}"
+            await self._throttle("GET", url)
             resp = await self.session.get(url, headers=self.header)
             return await self._parse_response(resp)
         except Exception as e:  # pragma: no cover - defensive
@@ -138,15 +153,58 @@ class AsyncDhanHQ:
                 else:
                     raise Exception("amo_time value must be ['PRE_OPEN','OPEN','OPEN_30','OPEN_60']")
             payload["triggerPrice"] = float(trigger_price) if trigger_price > 0 else 0.0
+            await self._throttle("POST", url)
             resp = await self.session.post(url, headers=self.header, data=json_dumps(payload))
             return await self._parse_response(resp)
         except Exception as e:  # pragma: no cover - defensive
             logging.error("Exception in AsyncDhanHQ>>place_order: %s", e)
             return {"status": "failure", "remarks": str(e), "data": ""}
 
+    async def cancel_order(self, order_id):
+        try:
+            url = self.base_url + f"/orders/{order_id}"
+            await self._throttle("DELETE", url)
+            resp = await self.session.delete(url, headers=self.header)
+            return await self._parse_response(resp)
+        except Exception as e:
+            logging.error("Exception in AsyncDhanHQ>>cancel_order: %s", e)
+            return {"status": "failure", "remarks": str(e), "data": ""}
+
+    async def place_basket_order(self, legs, rollback=None, max_concurrency=None, tag_prefix=None):
+        """Places the legs concurrently, see :meth:`dhanhq.dhanhq.place_basket_order`."""
+        try:
+            check_rollback(rollback)
+            legs = prepare_legs(legs, tag_prefix)
+            semaphore = asyncio.Semaphore(max_concurrency or len(legs))
+
+            async def place(leg):
+                async with semaphore:
+                    return await self.place_order(**leg)
+
+            responses = await asyncio.gather(*(place(leg) for leg in legs))
+            results = [leg_result(leg, response) for leg, response in zip(legs, responses)]
+            actions = None
+            if rollback and any(leg_failed(result) for result in results):
+                actions = list(await asyncio.gather(*(
+                    self._rollback_leg(leg, result["orderId"], rollback)
+                    for leg, result in zip(legs, results) if not leg_failed(result))))
+            return basket_response(results, actions)
+        except Exception as e:
+            logging.error("Exception in AsyncDhanHQ>>place_basket_order: %s", e)
+            return {"status": "failure", "remarks": str(e), "data": ""}
+
+    async def _rollback_leg(self, leg, order_id, rollback):
+        action = {"orderId": order_id, "cancel": await self.cancel_order(order_id), "reverse": None}
+        if rollback == REVERSE:
+            quantity = filled_quantity(await self.get_order_by_id(order_id))
+            if quantity:
+                action["reverse"] = await self.place_order(**reverse_leg(leg, quantity))
+        return action
+
     async def get_positions(self):
         try:
             url = self.base_url + "/positions"
+            await self._throttle("GET", url)
             resp = await self.session.get(url, headers=self.header)
             return await self._parse_response(resp)
         except Exception as e:  # pragma: no cover - defensive
@@ -174,6 +232,7 @@ class AsyncDhanHQ:
                 "fromDate": from_date,
                 "toDate": to_date,
             })
+            await self._throttle("POST", url)
             resp = await self.session.post(url, headers=self.header, data=payload)
             return await self._parse_response(resp)
         except Exception as e:  # pragma: no cover - defensive
@@ -201,6 +260,7 @@ class AsyncDhanHQ:
                 "fromDate": from_date,
                 "toDate": to_date,
             })
+            await self._throttle("POST", url)
             resp = await self.session.post(url, headers=self.header, data=payload)
             return await self._parse_response(resp)
         except Exception as e:  # pragma: no cover - defensive
@@ -217,6 +277,7 @@ class AsyncDhanHQ:
                 "access-token": self.access_token,
                 "client-id": self.client_id,
             }
+            await self._throttle("POST", url)
             resp = await self.session.post(url, headers=headers, data=payload)
             return await self._parse_response(resp)
         except Exception as e:  # pragma: no cover - defensive
@@ -233,6 +294,7 @@ class AsyncDhanHQ:
                 "access-token": self.access_token,
                 "client-id": self.client_id,
             }
+            await self._throttle("POST", url)
             resp = await self.session.post(url, headers=headers, data=payload)
             return await self._parse_response(resp)
         except Exception as e:  # pragma: no cover - defensive
@@ -249,6 +311,7 @@ class AsyncDhanHQ:
                 "access-token": self.access_token,
                 "client-id": self.client_id,
             }
+            await self._throttle("POST", url)
             resp = await self.session.post(url, headers=headers, data=payload)
             return await self._parse_response(resp)
         except Exception as e:  # pragma: no cover - defensive
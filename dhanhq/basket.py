@@ -0,0 +1,117 @@
+"""
+    Helpers shared by the basket order methods of the sync and async clients.
+
+    A basket is a list of legs, each a dict of ``place_order`` keyword arguments. Every leg is sent with its own
+    ``correlationId`` and all legs are submitted concurrently. When a leg fails or its order is rejected (orderStatus
+    :data:`REJECTED`) and a rollback is requested, the legs already accepted are cancelled (:data:`CANCEL`), or
+    cancelled and their filled quantity closed with a market order (:data:`REVERSE`).
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import uuid
+from collections.abc import Mapping
+
+"""Rollback modes"""
+CANCEL = "cancel"
+REVERSE = "reverse"
+
+"""Order status of a placement the API accepted but rejected, e.g. by its risk checks"""
+REJECTED = "REJECTED"
+
+"""Longest correlationId the API accepts"""
+CORRELATION_ID_LENGTH = 25
+
+
+def new_correlation_id(prefix=None):
+    """Returns a unique correlationId, optionally starting with ``prefix``."""
+    token = uuid.uuid4().hex
+    if not prefix:
+        return token[:CORRELATION_ID_LENGTH]
+    return f"{prefix}-{token}"[:CORRELATION_ID_LENGTH]
+
+
+def prepare_legs(legs, tag_prefix=None):
+    """Returns copies of ``legs`` whose ``tag`` (correlationId) is set, unique within the basket.
+
+    Raises:
+        ValueError: For an empty basket or a leg that is not a dict.
+    """
+    if not legs:
+        raise ValueError("A basket needs at least one leg")
+    basket = new_correlation_id()[:8] if tag_prefix is None else tag_prefix
+    prepared = []
+    for index, leg in enumerate(legs):
+        if not isinstance(leg, dict):
+            raise ValueError("Every basket leg must be a dict of place_order arguments")
+        leg = dict(leg)
+        if not leg.get("tag"):
+            leg["tag"] = f"{basket}-{index}"[:CORRELATION_ID_LENGTH]
+        prepared.append(leg)
+    return prepared
+
+
+def check_rollback(rollback):
+    """Raises ValueError for an unknown rollback mode."""
+    if rollback not in (None, CANCEL, REVERSE):
+        raise ValueError(f"rollback must be None, '{CANCEL}' or '{REVERSE}'")
+
+
+def response_order(response):
+    """Returns the order dict of an order response, whose ``data`` may be a dict or a one element list."""
+    data = response.get("data") if isinstance(response, Mapping) else None
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return data if isinstance(data, dict) else {}
+
+
+def order_id(response):
+    """Returns the order ID of a successful placement response, or None."""
+    if response.get("status") != "success":
+        return None
+    data = response_order(response)
+    value = data.get("orderId", data.get("order_id"))
+    return None if value is None else str(value)
+
+
+def filled_quantity(response):
+    """Returns the filled quantity reported by a ``get_order_by_id`` response."""
+    if response.get("status") != "success":
+        return 0
+    return int(response_order(response).get("filledQty") or 0)
+
+
+def reverse_leg(leg, quantity):
+    """Returns the ``place_order`` arguments closing ``quantity`` of a filled leg at market."""
+    side = str(leg["transaction_type"]).upper()
+    return {
+        "security_id": leg["security_id"],
+        "exchange_segment": leg["exchange_segment"],
+        "transaction_type": "SELL" if side == "BUY" else "BUY",
+        "quantity": quantity,
+        "order_type": "MARKET",
+        "product_type": leg["product_type"],
+        "price": 0,
+        "tag": new_correlation_id("rv"),
+    }
+
+
+def leg_result(leg, response):
+    rejected = str(response_order(response).get("orderStatus", "")).upper() == REJECTED
+    return {"correlationId": leg["tag"], "orderId": order_id(response), "rejected": rejected, "response": response}
+
+
+def leg_failed(result):
+    """Returns True for a leg whose placement call failed or whose order was rejected."""
+    return result["orderId"] is None or result["rejected"]
+
+
+def basket_response(results, rollback):
+    """Builds the ``{"status", "remarks", "data"}`` response of a basket from its leg results."""
+    failed = sum(1 for result in results if leg_failed(result))
+    return {
+        "status": "failure" if failed else "success",
+        "remarks": f"{failed} of {len(results)} legs failed" if failed else "",
+        "data": {"legs": results, "rollback": rollback},
+    }
@@ -0,0 +1,252 @@
+"""
+    Streaming OHLCV candles built from market feed ticks.
+
+    :class:`CandleAggregator` is a :class:`dhanhq.marketfeed.DhanFeed` sink folding Ticker, Quote and Full
+    packets into bars of several intervals at once. Bars of every instrument live in flat ``array('d')`` rows, a
+    ring of recent closed bars is kept per instrument and interval, and callbacks are told when a bar closes.
+    Bars can be seeded from ``dhanhq.intraday_minute_data`` so indicators are warm at startup.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from array import array
+from collections import defaultdict
+
+from .marketfeed import EXCHANGE_SEGMENTS, IST_OFFSET, SEGMENT_CODES, _TICKER, _QUOTE, _FULL
+
+"""Fields of one bar, in row order"""
+BAR_FIELDS = ('start', 'open', 'high', 'low', 'close', 'volume')
+
+_WIDTH = len(BAR_FIELDS)
+_START, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME = range(_WIDTH)
+_NO_BAR = array('d', [math.nan]) * _WIDTH
+
+"""Default seconds the bar-close timer waits past a boundary for ticks of the ending bar still in flight"""
+DEFAULT_CLOSE_GRACE = 1.0
+
+
+class CandleAggregator:
+    """
+    OHLCV bars per ``(exchange_segment, security_id)`` for every interval in ``intervals`` (seconds).
+
+    Register it with ``feed.add_sink(aggregator)``. Bars are aligned to multiples of the interval on the LTT
+    clock; a bar closes when a tick of a later bar arrives or when :meth:`close_due` finds it has ended.
+    :meth:`start_timer` runs ``close_due`` at every interval boundary, so quiet instruments close on time too.
+    Volume is taken from the cumulative day volume of Quote and Full packets, so Ticker-only subscriptions
+    produce bars with zero volume. The last ``history`` closed bars are kept per instrument and interval.
+    """
+
+    def __init__(self, intervals=(60, 300, 900), history=100):
+        self.intervals = tuple(intervals)
+        self.history = history
+        self._rows = {}
+        self._keys = []
+        self._volume = array('d')
+        self._bars = {interval: array('d') for interval in self.intervals}
+        self._closed = {interval: array('d') for interval in self.intervals}
+        self._counts = {interval: array('q') for interval in self.intervals}
+        self._last_closed = {interval: array('d') for interval in self.intervals}
+        self._callbacks = defaultdict(list)
+        self._timer = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add_callback(self, callback, interval=None):
+        """Registers ``callback(bar)`` for bars closing on one interval or, by default, every interval."""
+        self._callbacks[interval].append(callback)
+
+    def remove_callback(self, callback, interval=None):
+        """Unregisters a callback added with :meth:`add_callback`."""
+        if callback in self._callbacks.get(interval, ()):
+            self._callbacks[interval].remove(callback)
+
+    def update(self, frame):
+        """Folds one raw binary feed frame into the bars; frames without a trade price are ignored."""
+        code = frame[0]
+        if code == 2:
+            _, _, exchange_segment, security_id, ltp, ltt = _TICKER.unpack_from(frame)
+            self.add_tick(exchange_segment, security_id, ltp, ltt)
+        elif code == 4 or code == 8:
+            values = (_QUOTE if code == 4 else _FULL).unpack_from(frame)
+            self.add_tick(values[2], values[3], values[4], values[6], values[8])
+
+    def add_tick(self, exchange_segment, security_id, price, timestamp, cumulative_volume=None):
+        """Folds one trade price at ``timestamp`` (LTT seconds) into every interval's bar."""
+        row = self._row(exchange_segment, security_id)
+        traded = 0
+        if cumulative_volume is not None:
+            last = self._volume[row]
+            if cumulative_volume >= last:
+                traded = cumulative_volume - last
+            self._volume[row] = cumulative_volume
+        for interval in self.intervals:
+            self._fold(interval, row, timestamp - timestamp % interval, price, price, price, price, traded, True)
+
+    def seed(self, client, instruments, from_date, to_date):
+        """Loads today's bars from ``client.intraday_minute_data`` without emitting bar-close events.
+
+        Args:
+            client (dhanhq): REST client.
+            instruments (list): ``(exchange_segment, security_id, instrument_type)`` tuples.
+            from_date (str): First day requested, ``YYYY-MM-DD``.
+            to_date (str): Last day requested, ``YYYY-MM-DD``.
+
+        Returns:
+            list: The instruments that could not be seeded.
+        """
+        failed = []
+        for exchange_segment, security_id, instrument_type in instruments:
+            segment = EXCHANGE_SEGMENTS[int(SEGMENT_CODES.get(exchange_segment, exchange_segment))]
+            response = client.intraday_minute_data(str(security_id), segment, instrument_type, from_date, to_date)
+            if response.get("status") != "success":
+                logging.warning("Could not seed candles of %s %s: %s", segment, security_id,
+                                response.get("remarks"))
+                failed.append((exchange_segment, security_id, instrument_type))
+                continue
+            data = response["data"]
+            self.seed_bars(exchange_segment, security_id, data["timestamp"], data["open"], data["high"],
+                           data["low"], data["close"], data["volume"])
+        return failed
+
+    def seed_bars(self, exchange_segment, security_id, timestamps, opens, highs, lows, closes, volumes):
+        """Folds minute bars with UTC EPOCH ``timestamps``, as returned by the REST API, into every interval."""
+        row = self._row(exchange_segment, security_id)
+        for timestamp, open_price, high, low, close, volume in zip(timestamps, opens, highs, lows, closes, volumes):
+            timestamp = int(timestamp) + IST_OFFSET
+            for interval in self.intervals:
+                self._fold(interval, row, timestamp - timestamp % interval, open_price, high, low, close, volume,
+                           False)
+
+    def close_due(self, now=None):
+        """Closes and emits every bar that has ended by ``now`` (LTT seconds, the current time by default);
+        call it periodically so quiet instruments close on time. Returns the number of bars closed."""
+        if now is None:
+            now = time.time() + IST_OFFSET
+        closed = 0
+        for interval in self.intervals:
+            bars = self._bars[interval]
+            for row in range(len(self._keys)):
+                base = row * _WIDTH
+                if bars[base] + interval <= now:
+                    self._close(interval, row, True)
+                    bars[base:base + _WIDTH] = _NO_BAR
+                    closed += 1
+        return closed
+
+    def start_timer(self, grace=DEFAULT_CLOSE_GRACE, loop=None):
+        """Starts an asyncio task closing the ended bars ``grace`` seconds after every interval boundary, e.g. on
+        the loop of the feed the aggregator is a sink of. Returns the task; :meth:`stop_timer` cancels it."""
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.ensure_future(self._run_timer(grace), loop=loop)
+        return self._timer
+
+    def stop_timer(self):
+        """Cancels the task started by :meth:`start_timer`."""
+        timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+
+    async def _run_timer(self, grace):
+        while True:
+            now = time.time() + IST_OFFSET
+            boundary = min(now - now % interval + interval for interval in self.intervals)
+            await asyncio.sleep(boundary + grace - now)
+            try:
+                self.close_due(boundary)
+            except Exception as e:
+                logging.error("Exception in CandleAggregator>>timer: %s", e)
+
+    def current(self, exchange_segment, security_id, interval):
+        """Returns the bar in progress, or None."""
+        row = self._find(exchange_segment, security_id)
+        if row is None:
+            return None
+        base = row * _WIDTH
+        bar = self._bars[interval][base:base + _WIDTH]
+        return None if math.isnan(bar[_START]) else self._bar(self._keys[row], interval, bar)
+
+    def bars(self, exchange_segment, security_id, interval, count=None):
+        """Returns up to ``count`` of the most recent closed bars, oldest first."""
+        row = self._find(exchange_segment, security_id)
+        if row is None:
+            return []
+        total = self._counts[interval][row]
+        available = min(total, self.history)
+        if count is not None:
+            available = min(available, count)
+        closed = self._closed[interval]
+        base = row * self.history * _WIDTH
+        bars = []
+        for index in range(total - available, total):
+            offset = base + (index % self.history) * _WIDTH
+            bars.append(self._bar(self._keys[row], interval, closed[offset:offset + _WIDTH]))
+        return bars
+
+    def _fold(self, interval, row, start, open_price, high, low, close, volume, emit):
+        if start <= self._last_closed[interval][row]:
+            # LTT lags the clock of close_due, so ticks of a bar already closed are dropped
+            return
+        bars = self._bars[interval]
+        base = row * _WIDTH
+        current = bars[base]
+        if current == start:
+            if high > bars[base + _HIGH]:
+                bars[base + _HIGH] = high
+            if low < bars[base + _LOW]:
+                bars[base + _LOW] = low
+            bars[base + _CLOSE] = close
+            bars[base + _VOLUME] += volume
+        elif math.isnan(current) or start > current:
+            # Ticks older than the bar in progress are ignored
+            if not math.isnan(current):
+                self._close(interval, row, emit)
+            bars[base:base + _WIDTH] = array('d', (start, open_price, high, low, close, volume))
+
+    def _close(self, interval, row, emit):
+        base = row * _WIDTH
+        bar = self._bars[interval][base:base + _WIDTH]
+        counts = self._counts[interval]
+        offset = (row * self.history + counts[row] % self.history) * _WIDTH
+        self._closed[interval][offset:offset + _WIDTH] = bar
+        self._last_closed[interval][row] = bar[_START]
+        counts[row] += 1
+        if emit:
+            callbacks = self._callbacks.get(interval, []) + self._callbacks.get(None, [])
+            if callbacks:
+                bar = self._bar(self._keys[row], interval, bar)
+                for callback in callbacks:
+                    try:
+                        callback(bar)
+                    except Exception as e:
+                        logging.error("Exception in CandleAggregator>>callback: %s", e)
+
+    @staticmethod
+    def _bar(key, interval, values):
+        bar = {"exchange_segment": key[0], "security_id": key[1], "interval": interval}
+        bar.update(zip(BAR_FIELDS, values))
+        bar["start"] = int(bar["start"])
+        return bar
+
+    def _find(self, exchange_segment, security_id):
+        exchange_segment = SEGMENT_CODES.get(exchange_segment, exchange_segment)
+        return self._rows.get((int(exchange_segment), int(security_id)))
+
+    def _row(self, exchange_segment, security_id):
+        row = self._find(exchange_segment, security_id)
+        if row is None:
+            key = (int(SEGMENT_CODES.get(exchange_segment, exchange_segment)), int(security_id))
+            row = self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._volume.append(math.inf)
+            for interval in self.intervals:
+                self._bars[interval].extend(_NO_BAR)
+                self._closed[interval].extend(array('d', [math.nan]) * (self.history * _WIDTH))
+                self._counts[interval].append(0)
+                self._last_closed[interval].append(-math.inf)
+        return row
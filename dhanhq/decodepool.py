@@ -0,0 +1,169 @@
+"""
+    Decoding of market feed frames in worker processes.
+
+    With a :class:`DecodePool` the receive task of :class:`dhanhq.marketfeed.DhanFeed` only reads raw frames.
+    Market data frames are routed to a worker process chosen by ``security_id``, so the packets of one
+    instrument are always decoded by the same worker and come back in arrival order. Frames travel to the
+    workers and packets back in batches over pipes, one pickle per batch, together with the decode time of
+    every frame when the pool is ``timed``.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import logging
+import multiprocessing
+import struct
+import threading
+import time
+
+"""Response codes of the market data packets decoded by workers; other frames are decoded in place"""
+POOLED_CODES = frozenset((2, 3, 4, 5, 6, 8))
+
+"""Default number of frames sent to a worker at once"""
+DEFAULT_BATCH_SIZE = 256
+
+"""Default number of submitted frames whose packets may wait to be dispatched before the feed stops reading"""
+DEFAULT_MAX_PENDING = 16384
+
+_SECURITY_ID = struct.Struct('<I')
+
+
+def _decode_worker(frames_conn, packets_conn, numeric, timed):
+    """Worker process: decodes batches of frames until it receives None, sending back ``(packets, durations)``
+    where ``durations`` holds the decode time of every frame when ``timed``, else None."""
+    from .marketfeed import DhanFeed
+    feed = DhanFeed('', '', [], numeric=numeric)
+    process_data = feed.process_data
+    clock = time.perf_counter
+    try:
+        while True:
+            frames = frames_conn.recv()
+            if frames is None:
+                break
+            if not timed:
+                packets_conn.send(([process_data(frame) for frame in frames], None))
+                continue
+            packets, durations = [], []
+            for frame in frames:
+                started = clock()
+                packets.append(process_data(frame))
+                durations.append(clock() - started)
+            packets_conn.send((packets, durations))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        packets_conn.close()
+
+
+class DecodePool:
+    """
+    Worker processes decoding feed frames, preserving the order of packets per ``security_id``.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        batch_size (int): Frames collected per worker before a batch is sent.
+        numeric (bool): Decode in numeric mode, see :class:`dhanhq.marketfeed.DhanFeed`.
+        timed (bool): Workers return the decode time of every frame with its packet.
+    """
+
+    def __init__(self, workers=2, numeric=False, batch_size=DEFAULT_BATCH_SIZE, timed=False):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.numeric = numeric
+        self.batch_size = batch_size
+        self.timed = timed
+        self.frames_sent = 0
+        self._batches = [[] for _ in range(workers)]
+        self._processes = []
+        self._senders = []
+        self._readers = []
+        self._flush_scheduled = False
+        self._loop = None
+
+    @property
+    def running(self):
+        return bool(self._processes)
+
+    def start(self, on_packets, loop=None):
+        """Starts the workers; ``on_packets(packets, durations)`` is called from a reader thread with every
+        decoded batch, or through ``loop.call_soon_threadsafe`` when ``loop`` is given. ``durations`` lists the
+        decode time of each packet for a ``timed`` pool, else it is None. Batches of one worker arrive in order.
+        """
+        self._loop = loop
+        if loop is None:
+            deliver = on_packets
+        else:
+            def deliver(packets, durations):
+                loop.call_soon_threadsafe(on_packets, packets, durations)
+        for index in range(self.workers):
+            frames_reader, frames_writer = multiprocessing.Pipe(duplex=False)
+            packets_reader, packets_writer = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_decode_worker,
+                                              args=(frames_reader, packets_writer, self.numeric, self.timed),
+                                              daemon=True, name=f"dhan-decode-{index}")
+            process.start()
+            frames_reader.close()
+            packets_writer.close()
+            reader = threading.Thread(target=self._read, args=(packets_reader, deliver), daemon=True)
+            reader.start()
+            self._processes.append(process)
+            self._senders.append(frames_writer)
+            self._readers.append(reader)
+
+    def submit(self, frame):
+        """Queues a market data frame for its worker; the batch is sent when full or on the next loop turn."""
+        worker = _SECURITY_ID.unpack_from(frame, 4)[0] % self.workers
+        batch = self._batches[worker]
+        batch.append(frame)
+        if len(batch) >= self.batch_size:
+            self._send(worker)
+        elif not self._flush_scheduled and self._loop is not None:
+            self._flush_scheduled = True
+            self._loop.call_soon(self.flush)
+
+    def flush(self):
+        """Sends every partial batch."""
+        self._flush_scheduled = False
+        for worker, batch in enumerate(self._batches):
+            if batch:
+                self._send(worker)
+
+    def close(self, timeout=5):
+        """Sends the pending frames, stops the workers and waits for their last packets."""
+        if not self._processes:
+            return
+        self.flush()
+        for sender in self._senders:
+            try:
+                sender.send(None)
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for reader in self._readers:
+            reader.join(timeout)
+        for sender in self._senders:
+            sender.close()
+        self._processes, self._senders, self._readers = [], [], []
+
+    def _send(self, worker):
+        batch = self._batches[worker]
+        self._batches[worker] = []
+        self._senders[worker].send(batch)
+        self.frames_sent += len(batch)
+
+    @staticmethod
+    def _read(conn, deliver):
+        try:
+            while True:
+                deliver(*conn.recv())
+        except (EOFError, OSError):
+            pass
+        except Exception as e:
+            logging.error("Exception in DecodePool>>reader: %s", e)
+        finally:
+            conn.close()
@@ -0,0 +1,163 @@
+"""
+    Five level market depth books updated in place from Market Depth and Full packets.
+
+    A :class:`DepthBook` copies the depth bytes of each packet into its own preallocated buffer instead of
+    building a list of dicts, and decodes best bid/ask, spread, totals, imbalance and microprice on demand.
+    :class:`DepthBooks` is a :class:`dhanhq.marketfeed.DhanFeed` sink keeping one book per instrument.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import struct
+
+from .marketfeed import DEPTH_LEVELS, SEGMENT_CODES, _DEPTH_LEVEL, _FULL, _MARKET_DEPTH
+
+"""Offset of the depth levels in each packet carrying them, by response code"""
+DEPTH_OFFSETS = {3: _MARKET_DEPTH.size, 8: _FULL.size}
+
+_DEPTH_SIZE = DEPTH_LEVELS * _DEPTH_LEVEL.size
+_LEVELS = struct.Struct('<' + 'IIHHff' * DEPTH_LEVELS)
+_HEADER = struct.Struct('<BHBIf')
+_QUANTITY = struct.Struct('<I')
+_PRICE = struct.Struct('<f')
+# Offsets inside one level: bid quantity, ask quantity, bid orders, ask orders, bid price, ask price
+_BID_QUANTITY, _ASK_QUANTITY, _BID_PRICE, _ASK_PRICE = 0, 4, 12, 16
+
+
+class DepthBook:
+    """
+    Latest five level depth of one instrument.
+
+    Levels are indexed from 0 (best). Prices of empty levels read as 0.0.
+    """
+
+    __slots__ = ('exchange_segment', 'security_id', 'ltp', 'updates', '_depth', '_view')
+
+    def __init__(self, exchange_segment, security_id):
+        self.exchange_segment = exchange_segment
+        self.security_id = security_id
+        self.ltp = 0.0
+        self.updates = 0
+        self._depth = bytearray(_DEPTH_SIZE)
+        self._view = memoryview(self._depth)
+
+    def __repr__(self):
+        return (f"DepthBook({self.exchange_segment}, {self.security_id}, bid={self.best_bid} x "
+                f"{self.best_bid_quantity}, ask={self.best_ask} x {self.best_ask_quantity})")
+
+    def update(self, frame):
+        """Copies the depth of a Market Depth or Full frame of this instrument into the book."""
+        offset = DEPTH_OFFSETS[frame[0]]
+        self.ltp = _HEADER.unpack_from(frame)[4]
+        self._view[:] = memoryview(frame)[offset:offset + _DEPTH_SIZE]
+        self.updates += 1
+
+    def level(self, index):
+        """Returns ``(bid_quantity, ask_quantity, bid_orders, ask_orders, bid_price, ask_price)`` of a level."""
+        return _DEPTH_LEVEL.unpack_from(self._depth, index * _DEPTH_LEVEL.size)
+
+    def levels(self):
+        """Returns every level as the dicts ``DhanFeed`` emits in numeric mode."""
+        return [{
+            "bid_quantity": bid_quantity,
+            "ask_quantity": ask_quantity,
+            "bid_orders": bid_orders,
+            "ask_orders": ask_orders,
+            "bid_price": bid_price,
+            "ask_price": ask_price
+        } for bid_quantity, ask_quantity, bid_orders, ask_orders, bid_price, ask_price
+            in _DEPTH_LEVEL.iter_unpack(self._depth)]
+
+    @property
+    def best_bid(self):
+        return _PRICE.unpack_from(self._depth, _BID_PRICE)[0]
+
+    @property
+    def best_ask(self):
+        return _PRICE.unpack_from(self._depth, _ASK_PRICE)[0]
+
+    @property
+    def best_bid_quantity(self):
+        return _QUANTITY.unpack_from(self._depth, _BID_QUANTITY)[0]
+
+    @property
+    def best_ask_quantity(self):
+        return _QUANTITY.unpack_from(self._depth, _ASK_QUANTITY)[0]
+
+    @property
+    def spread(self):
+        """Best ask minus best bid."""
+        return self.best_ask - self.best_bid
+
+    @property
+    def mid(self):
+        """Average of the best bid and ask."""
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def total_bid_quantity(self):
+        """Bid quantity summed over the five levels."""
+        return sum(_LEVELS.unpack(self._depth)[0::6])
+
+    @property
+    def total_ask_quantity(self):
+        """Ask quantity summed over the five levels."""
+        return sum(_LEVELS.unpack(self._depth)[1::6])
+
+    @property
+    def imbalance(self):
+        """``(bid - ask) / (bid + ask)`` of the total quantities, from -1 (all asks) to 1 (all bids)."""
+        values = _LEVELS.unpack(self._depth)
+        bids, asks = sum(values[0::6]), sum(values[1::6])
+        return (bids - asks) / (bids + asks) if bids + asks else 0.0
+
+    @property
+    def microprice(self):
+        """Best bid and ask weighted by the opposite side's quantity, or the mid when both are empty."""
+        bid_quantity, ask_quantity = self.best_bid_quantity, self.best_ask_quantity
+        if not bid_quantity + ask_quantity:
+            return self.mid
+        return (self.best_bid * ask_quantity + self.best_ask * bid_quantity) / (bid_quantity + ask_quantity)
+
+
+class DepthBooks:
+    """
+    Feed sink keeping a :class:`DepthBook` per instrument receiving Market Depth or Full packets.
+
+    Register it with ``feed.add_sink(books)`` and look books up with ``books[exchange_segment, security_id]``;
+    exchange segments may be numeric codes or REST names and security IDs int or str.
+    """
+
+    def __init__(self):
+        self._books = {}
+
+    def __len__(self):
+        return len(self._books)
+
+    def __iter__(self):
+        return iter(self._books.values())
+
+    def __contains__(self, instrument):
+        return self.get(*instrument) is not None
+
+    def __getitem__(self, instrument):
+        book = self.get(*instrument)
+        if book is None:
+            raise KeyError(instrument)
+        return book
+
+    def get(self, exchange_segment, security_id):
+        """Returns the book of an instrument, or None before its first depth packet."""
+        exchange_segment = SEGMENT_CODES.get(exchange_segment, exchange_segment)
+        return self._books.get((int(exchange_segment), int(security_id)))
+
+    def update(self, frame):
+        """Applies one raw binary feed frame; frames without depth are ignored."""
+        if frame[0] not in DEPTH_OFFSETS:
+            return
+        _, _, exchange_segment, security_id, _ = _HEADER.unpack_from(frame)
+        book = self._books.get((exchange_segment, security_id))
+        if book is None:
+            book = self._books[(exchange_segment, security_id)] = DepthBook(exchange_segment, security_id)
+        book.update(frame)
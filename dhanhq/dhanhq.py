@@ -9,12 +9,24 @@ and perform various trading operations through the DhanHQ API.
 """
 
 import logging
+import threading
+import time
 import requests
-from json import loads as json_loads, dumps as json_dumps
 from pathlib import Path
 from webbrowser import open as web_open
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
+from collections.abc import Mapping
+
+from .basket import (REVERSE, basket_response, check_rollback, filled_quantity, leg_failed, leg_result,
+                     new_correlation_id, prepare_legs, reverse_leg)
+from .jsonbackend import LazyResponse, loads as json_loads, dumps as json_dumps
+from .ratelimit import RateLimiter
+from .retry import AMBIGUOUS_STATUSES, RetryPolicy, created_before, order_not_found, request_was_sent
+from .tradehistory import PREFETCH, iter_pages, to_dataframe, write_parquet
+from .transport import create_session, prewarm_session, connection_stats
+
 
 class dhanhq:
     """DhanHQ Class to interact with REST APIs"""
@@ -58,7 +70,9 @@ class dhanhq:
     COMPACT_CSV_URL = "https://images.dhan.co/api-data/api-scrip-master.csv"
     DETAILED_CSV_URL = "https://images.dhan.co/api-data/api-scrip-master-detailed.csv"
 
-    def __init__(self, client_id, access_token, disable_ssl=False, pool=None, paper_trading=False):
+    def __init__(self, client_id, access_token, disable_ssl=False, pool=None, paper_trading=False, snapshot=None,
+                 snapshot_max_age=None, prewarm=0, rate_limiter=None, lazy_responses=False,
+                 retry_policy=None):
         """
         Initialize the dhanhq class with client ID and access token.
 
@@ -66,7 +80,21 @@ class dhanhq:
             client_id (str): The client ID for the trading account.
             access_token (str): The access token for API authentication.
             disable_ssl (bool): Flag to disable SSL verification.
-            pool (dict): Optional connection pool settings.
+            pool (dict): Optional transport settings passed to :func:`dhanhq.transport.create_session`, e.g.
+                ``{"pool_maxsize": 64, "dns_ttl": 60}``. TLS certificates are verified unless it holds
+                ``"verify": False``.
+            snapshot (SnapshotStore): Optional store fed by a live market feed; ticker_data and quote_data are
+                answered from it when every requested instrument is present.
+            snapshot_max_age (float): Seconds after which a snapshot is stale and the API is called instead.
+            prewarm (int): Connections to open to the API in the background right away, so the first requests
+                skip the TCP and TLS handshakes.
+            rate_limiter (RateLimiter): Limiter scheduling every request per endpoint class, shareable between
+                clients and threads; True creates one with the default DhanHQ limits.
+            lazy_responses (bool): Return :class:`dhanhq.jsonbackend.LazyResponse` objects whose body is only
+                decoded when ``data`` or ``remarks`` is read.
+            retry_policy (RetryPolicy): Retry GET requests with backoff and make order placement safe to retry:
+                orders get a correlationId and are only resubmitted when the API has no order under it.
+                True creates one with the defaults of :class:`dhanhq.retry.RetryPolicy`.
         """
         try:
             self.client_id = str(client_id)
@@ -82,14 +110,31 @@ class dhanhq:
             self.paper_trading = paper_trading
             self._paper_orders = []
             self._paper_positions = {}
-            requests.packages.urllib3.util.connection.HAS_IPV6 = False
-            self.session = requests.Session()
-            if pool:
-                reqadapter = requests.adapters.HTTPAdapter(**pool)
-                self.session.mount("https://", reqadapter)
+            self.snapshot = snapshot
+            self.snapshot_max_age = snapshot_max_age
+            self.lazy_responses = lazy_responses
+            if rate_limiter is True:
+                rate_limiter = RateLimiter()
+            self.rate_limiter = rate_limiter
+            if retry_policy is True:
+                retry_policy = RetryPolicy()
+            self.retry_policy = retry_policy
+            self.session = create_session(rate_limiter=rate_limiter, retry_policy=retry_policy, **(pool or {}))
+            if prewarm and not paper_trading:
+                threading.Thread(target=prewarm_session, args=(self.session, self.base_url, int(prewarm)),
+                                 daemon=True).start()
         except Exception as e:
             logging.error("Exception in dhanhq>>init : %s", e)
 
+    def connection_stats(self):
+        """
+        Report the reuse of pooled HTTP connections.
+
+        Returns:
+            dict: Connections opened, requests sent, requests that reused a connection and DNS cache hits/misses.
+        """
+        return connection_stats(self.session)
+
     def _parse_response(self, response):
         """
         Parse the API response.
@@ -100,6 +145,8 @@ class dhanhq:
         Returns:
             dict: Parsed response containing status, remarks, and data.
         """
+        if self.lazy_responses:
+            return LazyResponse(response.status_code, response.content)
         try:
             status = "failure"
             remarks = ""
@@ -358,6 +405,8 @@ class dhanhq:
             }
             if tag is not None and tag != "":
                 payload["correlationId"] = tag
+            elif self.retry_policy is not None:
+                payload["correlationId"] = new_correlation_id()
             if after_market_order:
                 if amo_time in ["PRE_OPEN", "OPEN", "OPEN_30", "OPEN_60"]:
                     payload["amoTime"] = amo_time
@@ -370,11 +419,7 @@ class dhanhq:
             elif trigger_price == 0:
                 payload["triggerPrice"] = 0.0
 
-            payload = json_dumps(payload)
-            response = self.session.post(
-                url, data=payload, headers=self.header, timeout=self.timeout
-            )
-            return self._parse_response(response)
+            return self._post_order(url, payload, tagged=bool(tag))
         except Exception as e:
             logging.error("Exception in dhanhq>>place_order: %s", e)
             return {
@@ -443,6 +488,8 @@ class dhanhq:
             }
             if tag is not None and tag != "":
                 payload["correlationId"] = tag
+            elif self.retry_policy is not None:
+                payload["correlationId"] = new_correlation_id()
             if after_market_order:
                 if amo_time in ["OPEN", "OPEN_30", "OPEN_60"]:
                     payload["amoTime"] = amo_time
@@ -455,11 +502,7 @@ class dhanhq:
             elif trigger_price == 0:
                 payload["triggerPrice"] = 0.0
 
-            payload = json_dumps(payload)
-            response = self.session.post(
-                url, data=payload, headers=self.header, timeout=self.timeout
-            )
-            return self._parse_response(response)
+            return self._post_order(url, payload, slicing=True, tagged=bool(tag))
         except Exception as e:
             logging.error("Exception in dhanhq>>place_order: %s", e)
             return {
@@ -468,6 +511,165 @@ class dhanhq:
                 "data": "",
             }
 
+    def _post_order(self, url, payload, slicing=False, tagged=False):
+        """
+        Send an order placement request.
+
+        Without a retry policy the request is sent once. With one, an attempt that provably never reached the
+        API (no connection, or HTTP 429) is sent again after a backoff. After an ambiguous failure, a network
+        error once the request may have been sent or an HTTP 5xx, the order is looked up by its correlationId:
+        a found order is returned as placed, and the request is only resubmitted when every lookup confirms the
+        API has no such order. When the lookups themselves fail the order state is unknown and a failure naming
+        the correlationId is returned instead of risking a duplicate order.
+
+        A caller supplied tag may already name older orders, so for ``tagged`` orders only an order created
+        since the first attempt counts as found, and finding only older ones leaves the order state unknown.
+
+        Args:
+            url (str): Order placement URL.
+            payload (dict): Order payload, with ``correlationId`` set when a retry policy is used.
+            slicing (bool): The payload is a slice order, whose response lists every slice.
+            tagged (bool): The correlationId is the caller's tag rather than one generated for this order.
+
+        Returns:
+            dict: The response containing the status of the order placement.
+        """
+        data = json_dumps(payload)
+        policy = self.retry_policy
+        if policy is None:
+            response = self.session.post(url, data=data, headers=self.header, timeout=self.timeout)
+            return self._parse_response(response)
+        correlation_id = payload["correlationId"]
+        since = time.time() if tagged else None
+        for attempt in range(policy.attempts):
+            last = attempt == policy.attempts - 1
+            try:
+                response = self.session.post(url, data=data, headers=self.header, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not request_was_sent(e):
+                    if last:
+                        raise
+                    policy.retries += 1
+                    policy.sleep(policy.delay(attempt))
+                    continue
+                error = e
+            else:
+                if response.status_code == 429 and not last:
+                    policy.retries += 1
+                    policy.sleep(policy.delay(attempt, response))
+                    continue
+                if response.status_code not in AMBIGUOUS_STATUSES:
+                    return self._parse_response(response)
+                error = f"HTTP {response.status_code}"
+            logging.warning("Order %s failed ambiguously (%s), checking the order book", correlation_id, error)
+            found, missing = self._find_order(correlation_id, slicing, since)
+            if found is not None:
+                return found
+            if not missing:
+                return {
+                    "status": "failure",
+                    "remarks": f"Order state unknown after {error}, check correlationId {correlation_id}",
+                    "data": "",
+                }
+            if not last:
+                policy.retries += 1
+                policy.sleep(policy.delay(attempt))
+        return {"status": "failure", "remarks": f"Order not placed after {error}", "data": ""}
+
+    def _find_order(self, correlation_id, slicing=False, since=None):
+        """
+        Look an order up by correlationId, as ``get_order_by_correlationID`` does, after an ambiguous placement
+        failure.
+
+        Only a successful lookup without orders or a not-found error (see :func:`dhanhq.retry.order_not_found`)
+        counts as the order missing; any other failure, including 5xx, 429 and authentication errors, leaves the
+        order state unknown.
+
+        Args:
+            correlation_id (str): The correlationId the order was sent with.
+            slicing (bool): Return every order found as a list, the shape of a slice order response.
+            since (float): Epoch time of the first attempt; orders created before it are not the one placed, and
+                finding only such orders leaves the order state unknown.
+
+        Returns:
+            tuple: The placement response of the order when found, else None, and whether the API confirmed on
+            every lookup that it has no such order.
+        """
+        policy = self.retry_policy
+        url = self.base_url + f"/orders/external/{correlation_id}"
+        for _ in range(policy.lookup_attempts):
+            policy.sleep(policy.lookup_delay)
+            try:
+                response = self.session.get(url, headers=self.header, timeout=self.timeout)
+                if order_not_found(response):
+                    continue
+                if response.status_code != 200:
+                    return None, False
+                data = json_loads(response.content)
+            except Exception as e:
+                logging.warning("Exception in dhanhq>>find_order: %s", e)
+                return None, False
+            orders = [order for order in (data if isinstance(data, list) else [data])
+                      if isinstance(order, Mapping) and order.get("orderId")]
+            if since is not None and orders:
+                orders = [order for order in orders if not created_before(order, since)]
+                if not orders:
+                    return None, False
+            if not orders:
+                continue
+            placed = [{"orderId": order["orderId"], "orderStatus": order.get("orderStatus")} for order in orders]
+            return {"status": "success", "remarks": "", "data": placed if slicing else placed[0]}, False
+        return None, True
+
+    def place_basket_order(self, legs, rollback=None, max_workers=None, tag_prefix=None):
+        """
+        Place several orders concurrently, e.g. the legs of a straddle, so they go out within one round trip.
+
+        Args:
+            legs (list): One dict of :meth:`place_order` arguments per leg. A leg without ``tag`` gets a
+                correlationId unique within the basket.
+            rollback (str): What to do with the accepted legs when another leg fails: None to keep them,
+                ``"cancel"`` to cancel them or ``"reverse"`` to cancel them and close their filled quantity at market.
+            max_workers (int): Legs sent at the same time, all of them by default.
+            tag_prefix (str): Prefix of the generated correlationIds, random by default.
+
+        Returns:
+            dict: The response with ``data["legs"]`` holding the correlationId, orderId (None when the placement
+            call failed), ``rejected`` flag (the API answered with orderStatus REJECTED) and placement response of
+            each leg in order, and ``data["rollback"]`` the rollback actions taken. Rejected legs count as failed.
+        """
+        try:
+            check_rollback(rollback)
+            legs = prepare_legs(legs, tag_prefix)
+            with ThreadPoolExecutor(max_workers=max_workers or len(legs)) as executor:
+                responses = list(executor.map(lambda leg: self.place_order(**leg), legs))
+            results = [leg_result(leg, response) for leg, response in zip(legs, responses)]
+            actions = None
+            if rollback and any(leg_failed(result) for result in results):
+                accepted = [(leg, result["orderId"]) for leg, result in zip(legs, results) if not leg_failed(result)]
+                with ThreadPoolExecutor(max_workers=max(len(accepted), 1)) as executor:
+                    actions = list(executor.map(lambda item: self._rollback_leg(*item, rollback), accepted))
+            return basket_response(results, actions)
+        except Exception as e:
+            logging.error("Exception in dhanhq>>place_basket_order: %s", e)
+            return {
+                "status": "failure",
+                "remarks": str(e),
+                "data": "",
+            }
+
+    def _rollback_leg(self, leg, order_id, rollback):
+        if self.paper_trading:
+            # paper orders fill on placement, so there is nothing to cancel
+            action = {"orderId": order_id, "cancel": None, "reverse": None}
+            quantity = int(leg["quantity"])
+        else:
+            action = {"orderId": order_id, "cancel": self.cancel_order(order_id), "reverse": None}
+            quantity = filled_quantity(self.get_order_by_id(order_id)) if rollback == REVERSE else 0
+        if rollback == REVERSE and quantity:
+            action["reverse"] = self.place_order(**reverse_leg(leg, quantity))
+        return action
+
     def get_positions(self):
         """
         Retrieve a list of all open positions for the day.
@@ -1106,6 +1308,57 @@ class dhanhq:
                 "data": "",
             }
 
+    def iter_trade_history(self, from_date, to_date, prefetch=PREFETCH, start_page=0):
+        """
+        Iterate over the trade history page by page, fetching the next pages while the current one is consumed.
+
+        Args:
+            from_date (str): The start date for the trade history.
+            to_date (str): The end date for the trade history.
+            prefetch (int): Pages requested ahead of the one being consumed; 0 fetches one page at a time.
+            start_page (int): First page to fetch.
+
+        Yields:
+            list: The trades of each page, until the first empty page.
+
+        Raises:
+            RuntimeError: When a page fails.
+        """
+        return iter_pages(lambda page_number: self.get_trade_history(from_date, to_date, page_number),
+                          start_page, prefetch)
+
+    def trade_history_dataframe(self, from_date, to_date, prefetch=PREFETCH):
+        """
+        Retrieve the whole trade history for a date range as a ``pandas.DataFrame``.
+
+        Args:
+            from_date (str): The start date for the trade history.
+            to_date (str): The end date for the trade history.
+            prefetch (int): Pages requested ahead of the one being converted.
+
+        Returns:
+            pd.DataFrame: One row per trade.
+        """
+        return to_dataframe(self.iter_trade_history(from_date, to_date, prefetch))
+
+    def trade_history_to_parquet(self, path, from_date, to_date, prefetch=PREFETCH, schema=None):
+        """
+        Stream the whole trade history for a date range into a Parquet file, one row group per page.
+
+        Requires ``pyarrow``.
+
+        Args:
+            path (str): File to write.
+            from_date (str): The start date for the trade history.
+            to_date (str): The end date for the trade history.
+            prefetch (int): Pages requested ahead of the one being written.
+            schema (pyarrow.Schema): Schema of the file, inferred from the first page by default.
+
+        Returns:
+            int: Trades written.
+        """
+        return write_parquet(self.iter_trade_history(from_date, to_date, prefetch), path, schema)
+
     def ledger_report(self, from_date, to_date):
         """
         Retrieve the ledger details for a specific date range.
@@ -1243,6 +1496,10 @@ class dhanhq:
             dict: The response containing last traded price (LTP) data.
         """
         try:
+            if self.snapshot is not None:
+                cached = self.snapshot.ltp_response(securities, self.snapshot_max_age)
+                if cached is not None:
+                    return cached
             url = self.base_url + f"/marketfeed/ltp"
             payload = {
                 exchange_segment: security_id
@@ -1324,6 +1581,10 @@ class dhanhq:
             volume data.
         """
         try:
+            if self.snapshot is not None:
+                cached = self.snapshot.quote_response(securities, self.snapshot_max_age)
+                if cached is not None:
+                    return cached
             url = self.base_url + f"/marketfeed/quote"
             payload = {
                 exchange_segment: security_id
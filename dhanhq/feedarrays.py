@@ -0,0 +1,111 @@
+"""
+    NumPy structured array decoding of buffered market feed packets.
+
+    The dtypes mirror the little-endian layouts read by :class:`dhanhq.marketfeed.DhanFeed`, so a burst of
+    same-type packets is decoded with one ``numpy.frombuffer`` call instead of one ``struct`` call per packet.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+"""One market depth level, '<IIHHff'"""
+DEPTH_DTYPE = np.dtype([
+    ('bid_quantity', '<u4'),
+    ('ask_quantity', '<u4'),
+    ('bid_orders', '<u2'),
+    ('ask_orders', '<u2'),
+    ('bid_price', '<f4'),
+    ('ask_price', '<f4'),
+])
+
+"""Ticker packet, '<BHBIfI'"""
+TICKER_DTYPE = np.dtype([
+    ('response_code', 'u1'),
+    ('message_length', '<u2'),
+    ('exchange_segment', 'u1'),
+    ('security_id', '<u4'),
+    ('LTP', '<f4'),
+    ('LTT', '<u4'),
+])
+
+"""Quote packet, '<BHBIfHIfIIIffff'"""
+QUOTE_DTYPE = np.dtype([
+    ('response_code', 'u1'),
+    ('message_length', '<u2'),
+    ('exchange_segment', 'u1'),
+    ('security_id', '<u4'),
+    ('LTP', '<f4'),
+    ('LTQ', '<u2'),
+    ('LTT', '<u4'),
+    ('avg_price', '<f4'),
+    ('volume', '<u4'),
+    ('total_sell_quantity', '<u4'),
+    ('total_buy_quantity', '<u4'),
+    ('open', '<f4'),
+    ('close', '<f4'),
+    ('high', '<f4'),
+    ('low', '<f4'),
+])
+
+"""Full packet, '<BHBIfHIfIIIIIIffff100s' with the 100 depth bytes as five depth levels"""
+FULL_DTYPE = np.dtype([
+    ('response_code', 'u1'),
+    ('message_length', '<u2'),
+    ('exchange_segment', 'u1'),
+    ('security_id', '<u4'),
+    ('LTP', '<f4'),
+    ('LTQ', '<u2'),
+    ('LTT', '<u4'),
+    ('avg_price', '<f4'),
+    ('volume', '<u4'),
+    ('total_sell_quantity', '<u4'),
+    ('total_buy_quantity', '<u4'),
+    ('OI', '<u4'),
+    ('oi_day_high', '<u4'),
+    ('oi_day_low', '<u4'),
+    ('open', '<f4'),
+    ('close', '<f4'),
+    ('high', '<f4'),
+    ('low', '<f4'),
+    ('depth', DEPTH_DTYPE, (5,)),
+])
+
+"""Response code of the packets decoded into arrays, mapped to the packet type and its dtype"""
+PACKET_DTYPES = {
+    2: ('Ticker Data', TICKER_DTYPE),
+    4: ('Quote Data', QUOTE_DTYPE),
+    8: ('Full Data', FULL_DTYPE),
+}
+
+
+def decode_frames(frames):
+    """
+    Decodes Ticker, Quote and Full packets into one structured array per packet type.
+
+    Args:
+        frames (list): Binary websocket frames in the order they were received.
+
+    Returns:
+        tuple: A dict mapping packet type to its structured array (rows in arrival order) and the list of
+        frames of every other packet type, left for per-packet decoding.
+    """
+    grouped = defaultdict(list)
+    others = []
+    for frame in frames:
+        code = frame[0]
+        if code in PACKET_DTYPES:
+            grouped[code].append(frame)
+        else:
+            others.append(frame)
+
+    arrays = {}
+    for code, group in grouped.items():
+        packet_type, dtype = PACKET_DTYPES[code]
+        size = dtype.itemsize
+        buffer = b"".join(frame if len(frame) == size else frame[:size] for frame in group)
+        arrays[packet_type] = np.frombuffer(buffer, dtype=dtype)
+    return arrays, others
@@ -0,0 +1,403 @@
+"""
+    The feedmanager module spreads a large instrument universe over several :class:`DhanFeed` connections.
+
+    Instruments are assigned to the least loaded connection (shard) with spare capacity, shards are added and
+    drained as the subscription grows and shrinks, and the ticks of every shard are merged into one stream.
+    Shards run in the caller's event loop or, with ``processes=True``, each in its own process so decoding
+    scales past one core.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import queue
+import sys
+
+from .marketfeed import DhanFeed, Ticker
+
+"""Instruments the broker accepts on one websocket connection"""
+MAX_INSTRUMENTS_PER_CONNECTION = 5000
+
+"""Websocket connections the broker accepts per client"""
+MAX_CONNECTIONS = 5
+
+"""Seconds a shard process waits for a command before checking its connection again"""
+COMMAND_POLL = 0.25
+
+"""Exit code of a shard process whose connection the server closed with a code that is not retried"""
+SHARD_FATAL_EXIT = 3
+
+"""Seconds before a dead shard is restarted, doubled after every failed restart up to the maximum"""
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 60.0
+
+
+def normalize_instrument(instrument):
+    """Returns ``(exchange_segment, security_id, request_code)``, defaulting to Ticker mode like DhanFeed."""
+    if len(instrument) == 2:
+        return instrument[0], instrument[1], Ticker
+    return tuple(instrument)
+
+
+def _run_shard(client_id, access_token, instruments, version, numeric, ticks, commands, reconnect=False):
+    """Process entry point of a shard started with ``processes=True``."""
+    try:
+        fatal = asyncio.run(_shard_main(client_id, access_token, instruments, version, numeric, ticks, commands,
+                                        reconnect))
+    except Exception as e:
+        logging.error("Feed shard process stopped: %s", e)
+        sys.exit(1)
+    if fatal:
+        sys.exit(SHARD_FATAL_EXIT)
+
+
+def _next_command(commands):
+    """Returns the next command, or None when none arrives within :data:`COMMAND_POLL` seconds."""
+    try:
+        return commands.get(timeout=COMMAND_POLL)
+    except queue.Empty:
+        return None
+
+
+async def _shard_main(client_id, access_token, instruments, version, numeric, ticks, commands, reconnect=False):
+    """Streams decoded ticks of one connection into ``ticks`` while applying commands from ``commands``.
+
+    Commands are ``(method_name, symbols)`` tuples naming ``subscribe_symbols`` or ``unsubscribe_symbols``,
+    and ``("close", None)`` which disconnects and returns False. The shard also returns once its connection is
+    closed for good, True when the server closed it with a code that is not retried. Commands are polled, so no
+    thread is left blocked on ``commands`` when the shard returns.
+    """
+    loop = asyncio.get_running_loop()
+    feed = DhanFeed(client_id, access_token, instruments, version, numeric=numeric, reconnect=reconnect)
+    feed.add_callback(ticks.put)
+    receiver = await feed.start()
+    command = loop.run_in_executor(None, _next_command, commands)
+    try:
+        while True:
+            done, _ = await asyncio.wait({receiver, command}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                return feed.closed_by_server
+            if command.result() is not None:
+                name, symbols = command.result()
+                if name == "close":
+                    return False
+                getattr(feed, name)(symbols)
+            command = loop.run_in_executor(None, _next_command, commands)
+    finally:
+        await feed.disconnect()
+
+
+class _Shard:
+    """One connection of the manager and the instruments assigned to it."""
+
+    def __init__(self, index):
+        self.index = index
+        self.instruments = set()
+        self.feed = None
+        self.reader = None
+        self.process = None
+        self.commands = None
+        self.watcher = None
+        self.restarts = 0
+        self.failed = False
+
+    @property
+    def running(self):
+        return self.feed is not None or self.process is not None
+
+
+class FeedManager:
+    """
+    Shards a subscription across several market feed connections and merges their ticks.
+
+    A shard whose connection or process ends without being stopped is restarted after ``restart_delay``
+    seconds, backing off while restarts fail. A shard the server disconnected with a code that is not retried
+    (805-809) is marked failed and left stopped; :meth:`shard_status` reports it.
+
+    Attributes:
+        shards (list): The shards in use, each holding the set of instruments it streams.
+        shard_size (int): Maximum instruments per connection.
+    """
+
+    def __init__(self, client_id, access_token, instruments, version='v2', shard_size=MAX_INSTRUMENTS_PER_CONNECTION,
+                 max_connections=MAX_CONNECTIONS, processes=False, numeric=False, reconnect=False,
+                 restart_delay=RESTART_DELAY):
+        """
+        Initializes the manager and assigns the initial instruments to shards.
+
+        Args:
+            client_id (str): The client ID for authentication.
+            access_token (str): The access token for authentication.
+            instruments (list): ``(exchange_segment, security_id[, request_code])`` tuples to subscribe.
+            version (str): Market feed version used by every connection.
+            shard_size (int): Maximum instruments per connection.
+            max_connections (int): Maximum number of connections to open.
+            processes (bool): Run every shard, including its decoding, in a separate process.
+            numeric (bool): Emit numeric ticks, see :class:`DhanFeed`.
+            reconnect (bool): Reconnect and resubscribe dropped shard connections, see :class:`DhanFeed`.
+            restart_delay (float): Seconds before a shard that stopped on its own is started again.
+        """
+        self.client_id = client_id
+        self.access_token = access_token
+        self.version = version
+        self.shard_size = shard_size
+        self.max_connections = max_connections
+        self.processes = processes
+        self.numeric = numeric
+        self.reconnect = reconnect
+        self.restart_delay = restart_delay
+        self.shards = []
+        self._assignment = {}
+        self._ticks = None
+        self._process_ticks = None
+        self._process_reader = None
+        self._running = False
+        try:
+            self.loop = asyncio.get_event_loop()
+        except RuntimeError:
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+        self._assign([normalize_instrument(instrument) for instrument in instruments])
+
+    @property
+    def instruments(self):
+        """All instruments currently subscribed across shards."""
+        return list(self._assignment)
+
+    def shard_of(self, instrument):
+        """Returns the index of the shard streaming ``instrument``, or None."""
+        return self._assignment.get(normalize_instrument(instrument))
+
+    def shard_status(self):
+        """Returns the index, instrument count, running state, restarts and failed flag of every shard."""
+        return [{
+            "index": shard.index,
+            "instruments": len(shard.instruments),
+            "running": shard.running,
+            "restarts": shard.restarts,
+            "failed": shard.failed,
+        } for shard in self.shards]
+
+    def run_forever(self):
+        """Opens every shard connection and runs the event loop."""
+        self.loop.run_until_complete(self.connect())
+
+    def get_data(self):
+        """Fetch the next tick from any shard while the event loop is open."""
+        return self.loop.run_until_complete(self.get_instrument_data())
+
+    def close_connection(self):
+        """Close every shard connection."""
+        return self.loop.run_until_complete(self.disconnect())
+
+    def __aiter__(self):
+        """Allow ``async for tick in manager`` over the merged ticks."""
+        return self._iterate()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+    async def connect(self):
+        """Opens a connection for every shard that is not running yet."""
+        if self._ticks is None:
+            self._ticks = asyncio.Queue()
+        self._running = True
+        for shard in self.shards:
+            if not shard.running:
+                await self._start_shard(shard)
+
+    async def disconnect(self):
+        """Closes every shard connection."""
+        self._running = False
+        for shard in self.shards:
+            await self._stop_shard(shard)
+            watcher, shard.watcher = shard.watcher, None
+            if watcher is not None and watcher is not asyncio.current_task():
+                watcher.cancel()
+        if self._process_reader is not None:
+            self._process_ticks.put(None)
+            await self._process_reader
+            self._process_reader = None
+        logging.info("All feed shards closed!")
+
+    async def get_instrument_data(self):
+        """Returns the next decoded tick from any shard."""
+        return await self._ticks.get()
+
+    async def _iterate(self):
+        while True:
+            yield await self.get_instrument_data()
+
+    def subscribe_symbols(self, symbols):
+        """Subscribes additional instruments on the least loaded shards, opening new shards when needed."""
+        new = [instrument for instrument in dict.fromkeys(normalize_instrument(s) for s in symbols)
+               if instrument not in self._assignment]
+        for shard, added in self._assign(new).items():
+            if shard.running:
+                self._send(shard, "subscribe_symbols", added)
+            elif self._running:
+                asyncio.ensure_future(self._start_shard(shard))
+
+    def unsubscribe_symbols(self, symbols):
+        """Unsubscribes instruments from their shards, then rebalances the remaining instruments."""
+        removed = {}
+        for instrument in dict.fromkeys(normalize_instrument(s) for s in symbols):
+            index = self._assignment.pop(instrument, None)
+            if index is not None:
+                self.shards[index].instruments.discard(instrument)
+                removed.setdefault(self.shards[index], []).append(instrument)
+        for shard, instruments in removed.items():
+            if shard.running:
+                self._send(shard, "unsubscribe_symbols", instruments)
+        self.rebalance()
+
+    def rebalance(self):
+        """Drains the smallest shards into the others while fewer connections can carry the subscription.
+
+        While connected, instruments only move onto running shards, and stopped shards (e.g. failed ones) are
+        drained first, so no instrument is left on a connection that is not streaming it.
+        """
+        needed = max(1, math.ceil(len(self._assignment) / self.shard_size))
+        active = [shard for shard in self.shards if shard.instruments]
+        while len(active) > needed:
+            source = min(active, key=lambda shard: (self._running and shard.running, len(shard.instruments)))
+            active.remove(source)
+            moving = sorted(source.instruments, key=str)
+            targets = [shard for shard in active if shard.running or not self._running]
+            for target in sorted(targets, key=lambda shard: len(shard.instruments)):
+                room = self.shard_size - len(target.instruments)
+                batch, moving = moving[:room], moving[room:]
+                if not batch:
+                    continue
+                for instrument in batch:
+                    source.instruments.discard(instrument)
+                    target.instruments.add(instrument)
+                    self._assignment[instrument] = target.index
+                if target.running:
+                    self._send(target, "subscribe_symbols", batch)
+                if source.running:
+                    self._send(source, "unsubscribe_symbols", batch)
+                if not moving:
+                    break
+        for shard in self.shards:
+            if not shard.instruments and shard.running:
+                asyncio.ensure_future(self._stop_shard(shard))
+
+    def _assign(self, instruments):
+        """Assigns instruments to the least loaded shards and returns the additions of every shard."""
+        added = {}
+        for instrument in instruments:
+            candidates = [shard for shard in self.shards if len(shard.instruments) < self.shard_size]
+            if candidates:
+                shard = min(candidates, key=lambda candidate: len(candidate.instruments))
+            elif len(self.shards) < self.max_connections:
+                shard = _Shard(len(self.shards))
+                self.shards.append(shard)
+            else:
+                raise ValueError(
+                    f"Subscription exceeds {self.max_connections} connections of {self.shard_size} instruments.")
+            shard.instruments.add(instrument)
+            self._assignment[instrument] = shard.index
+            added.setdefault(shard, []).append(instrument)
+        return added
+
+    def _send(self, shard, method, instruments):
+        """Forwards a subscription change to a running shard."""
+        if shard.process is not None:
+            shard.commands.put((method, instruments))
+        else:
+            getattr(shard.feed, method)(instruments)
+
+    async def _start_shard(self, shard):
+        """Opens the connection of one shard and starts merging its ticks."""
+        if not shard.instruments or shard.running:
+            return
+        instruments = list(shard.instruments)
+        if self.processes:
+            if self._process_ticks is None:
+                self._process_ticks = multiprocessing.Queue()
+            if self._process_reader is None:
+                self._process_reader = asyncio.ensure_future(self._read_processes())
+            shard.commands = multiprocessing.Queue()
+            shard.process = multiprocessing.Process(
+                target=_run_shard,
+                args=(self.client_id, self.access_token, instruments, self.version, self.numeric,
+                      self._process_ticks, shard.commands, self.reconnect),
+                daemon=True,
+            )
+            shard.process.start()
+        else:
+            # Subscription changes made while connecting land in feed.instruments and are sent by connect()
+            feed = shard.feed = DhanFeed(self.client_id, self.access_token, instruments, self.version,
+                                         numeric=self.numeric, reconnect=self.reconnect)
+            feed.add_callback(self._ticks.put_nowait)
+            try:
+                shard.reader = await feed.start()
+            except Exception:
+                shard.feed = None
+                raise
+        shard.failed = False
+        shard.watcher = asyncio.ensure_future(self._watch_shard(shard, shard.process, shard.reader))
+
+    async def _watch_shard(self, shard, process, reader):
+        """Restarts a shard whose process or connection ended without :meth:`_stop_shard` being called."""
+        if process is not None:
+            await asyncio.get_running_loop().run_in_executor(None, process.join)
+            fatal = process.exitcode == SHARD_FATAL_EXIT
+        else:
+            await asyncio.wait({reader})
+            fatal = shard.feed is not None and shard.feed.closed_by_server
+        if shard.process is not process or shard.reader is not reader:
+            return  # stopped on purpose
+        await self._stop_shard(shard)
+        if fatal:
+            shard.failed = True
+            logging.error("Feed shard %s was disconnected by the server and is not restarted", shard.index)
+            return
+        delay = self.restart_delay
+        while self._running and shard.instruments and not shard.running:
+            logging.warning("Feed shard %s stopped, restarting in %.1fs", shard.index, delay)
+            await asyncio.sleep(delay)
+            if not self._running or shard.running:
+                return
+            shard.restarts += 1
+            try:
+                await self._start_shard(shard)
+            except Exception as e:
+                logging.error("Restarting feed shard %s failed: %s", shard.index, e)
+                delay = min(delay * 2, MAX_RESTART_DELAY)
+
+    def _stop_shard(self, shard):
+        """Detaches the connection of one shard and returns the coroutine closing it."""
+        process, commands, reader, feed = shard.process, shard.commands, shard.reader, shard.feed
+        shard.process = shard.commands = shard.reader = shard.feed = None
+        return self._close_shard(process, commands, reader, feed)
+
+    async def _close_shard(self, process, commands, reader, feed):
+        """Closes a detached shard process or connection."""
+        if process is not None:
+            commands.put(("close", None))
+            await asyncio.get_running_loop().run_in_executor(None, process.join, 5)
+            if process.is_alive():
+                process.terminate()
+        if reader is not None:
+            reader.cancel()
+        if feed is not None:
+            await feed.disconnect()
+
+    async def _read_processes(self):
+        """Moves the ticks of every shard process into the merged queue."""
+        loop = asyncio.get_running_loop()
+        while True:
+            tick = await loop.run_in_executor(None, self._process_ticks.get)
+            if tick is None:
+                return
+            self._ticks.put_nowait(tick)
@@ -0,0 +1,220 @@
+"""
+    Latency and throughput instrumentation of the market feed.
+
+    A :class:`DhanFeed` created with ``metrics=FeedMetrics()`` reports every frame it receives: counts per
+    packet type, frames per second, decode time and the lag between the exchange time (LTT) and the local
+    receive time, plus the depth of its frame queue and its reconnects. Lag is taken when the frame arrives,
+    so time spent waiting in the frame queue or decoding is not part of it. Any object with the same
+    ``attach``, ``record`` and ``record_decode`` methods can be plugged in instead; without metrics the feed
+    pays one ``None`` check per frame. :func:`prometheus_text` renders the metrics in the Prometheus text format and
+    :func:`start_http_server` serves them for scraping.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import struct
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .marketfeed import IST_OFFSET
+
+"""Packet type of every response code"""
+PACKET_TYPES = {
+    2: 'Ticker Data',
+    3: 'Market Depth',
+    4: 'Quote Data',
+    5: 'OI Data',
+    6: 'Previous Close',
+    7: 'Market Status',
+    8: 'Full Data',
+    50: 'Disconnection',
+}
+
+"""Default histogram buckets, in seconds"""
+DECODE_BUCKETS = (2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+LAG_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 300)
+
+"""Offset of the LTT field by response code"""
+_LTT_OFFSETS = {2: 12, 4: 14, 8: 14}
+_LTT = struct.Struct('<I')
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, in the shape Prometheus expects."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Returns ``(upper_bound, count)`` pairs ending with ``inf``."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket holding quantile ``q``, or None when empty."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+
+
+class FeedMetrics:
+    """
+    Counters and histograms of one or more feeds.
+
+    Attributes:
+        frames (dict): Frames received per packet type.
+        decode (Histogram): Seconds spent decoding each frame.
+        lag (Histogram): Seconds between LTT and the local receive time, for packets carrying LTT.
+    """
+
+    def __init__(self, decode_buckets=DECODE_BUCKETS, lag_buckets=LAG_BUCKETS):
+        self._counts = [0] * 256
+        self.decode = Histogram(decode_buckets)
+        self.lag = Histogram(lag_buckets)
+        self.started = time.time()
+        self._feeds = []
+        self._second = 0
+        self._second_frames = 0
+        self._last_second_frames = 0
+
+    @property
+    def frames(self):
+        return {PACKET_TYPES.get(code, str(code)): count for code, count in enumerate(self._counts) if count}
+
+    @property
+    def total_frames(self):
+        return sum(self._counts)
+
+    def attach(self, feed):
+        """Called by :class:`DhanFeed` so its queue and reconnects are exported too."""
+        self._feeds.append(feed)
+
+    def record(self, frame, decode_seconds=None, received=None):
+        """Records one frame received at EPOCH time ``received`` (now by default), with its decode time when
+        already known; the receive task of ``DhanFeed`` records frames on arrival and their decode time later
+        through :meth:`record_decode`."""
+        if isinstance(frame, str):
+            return
+        now = time.time() if received is None else received
+        code = frame[0]
+        self._counts[code] += 1
+        if decode_seconds is not None:
+            self.decode.observe(decode_seconds)
+        offset = _LTT_OFFSETS.get(code)
+        if offset is not None:
+            self.lag.observe(now + IST_OFFSET - _LTT.unpack_from(frame, offset)[0])
+        second = int(now)
+        if second != self._second:
+            self._last_second_frames = self._second_frames if second == self._second + 1 else 0
+            self._second = second
+            self._second_frames = 0
+        self._second_frames += 1
+
+    def record_decode(self, decode_seconds):
+        """Records the decode time of a frame already counted by :meth:`record`."""
+        self.decode.observe(decode_seconds)
+
+    def frames_per_second(self):
+        """Frames received during the last complete second."""
+        second = int(time.time())
+        if second == self._second:
+            return self._last_second_frames
+        return self._second_frames if second == self._second + 1 else 0
+
+    def queue_stats(self):
+        """Returns ``queue.stats()`` of every attached feed with a frame queue."""
+        return [feed.queue.stats() for feed in self._feeds if getattr(feed, 'queue', None) is not None]
+
+    def snapshot(self):
+        """Returns every metric as plain values."""
+        return {
+            "frames": self.frames,
+            "total_frames": self.total_frames,
+            "frames_per_second": self.frames_per_second(),
+            "decode_p50": self.decode.quantile(0.5),
+            "decode_p99": self.decode.quantile(0.99),
+            "lag_p50": self.lag.quantile(0.5),
+            "lag_p99": self.lag.quantile(0.99),
+            "queues": self.queue_stats(),
+            "reconnects": self.reconnects(),
+        }
+
+    def reconnects(self):
+        """Reconnections of every attached feed."""
+        return sum(getattr(feed, 'reconnect_count', 0) for feed in self._feeds)
+
+
+def _histogram_lines(name, help_text, histogram):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for bound, total in histogram.cumulative():
+        le = "+Inf" if bound == float('inf') else repr(bound)
+        lines.append(f'{name}_bucket{{le="{le}"}} {total}')
+    lines.append(f"{name}_sum {histogram.sum}")
+    lines.append(f"{name}_count {histogram.count}")
+    return lines
+
+
+def prometheus_text(metrics, prefix='dhan_feed'):
+    """Renders :class:`FeedMetrics` in the Prometheus text exposition format."""
+    lines = [f"# HELP {prefix}_frames_total Frames received by packet type.",
+             f"# TYPE {prefix}_frames_total counter"]
+    for packet_type, count in metrics.frames.items():
+        lines.append(f'{prefix}_frames_total{{type="{packet_type}"}} {count}')
+    lines += [f"# HELP {prefix}_frames_per_second Frames received during the last second.",
+              f"# TYPE {prefix}_frames_per_second gauge",
+              f"{prefix}_frames_per_second {metrics.frames_per_second()}"]
+    lines += _histogram_lines(f"{prefix}_decode_seconds", "Time spent decoding one frame.", metrics.decode)
+    lines += _histogram_lines(f"{prefix}_lag_seconds", "Local receive time minus exchange LTT.", metrics.lag)
+    queues = metrics.queue_stats()
+    if queues:
+        lines += [f"# HELP {prefix}_queue_depth Frames waiting to be decoded.", f"# TYPE {prefix}_queue_depth gauge"]
+        lines += [f'{prefix}_queue_depth{{feed="{index}"}} {stats["depth"]}' for index, stats in enumerate(queues)]
+        lines += [f"# HELP {prefix}_queue_dropped_total Frames dropped by a full queue.",
+                  f"# TYPE {prefix}_queue_dropped_total counter"]
+        lines += [f'{prefix}_queue_dropped_total{{feed="{index}"}} {stats["dropped"]}'
+                  for index, stats in enumerate(queues)]
+    lines += [f"# HELP {prefix}_reconnects_total Reconnections of the attached feeds.",
+              f"# TYPE {prefix}_reconnects_total counter",
+              f"{prefix}_reconnects_total {metrics.reconnects()}"]
+    return "\n".join(lines) + "\n"
+
+
+def start_http_server(metrics, port=9108, address='', prefix='dhan_feed'):
+    """Serves :func:`prometheus_text` on ``/metrics`` from a daemon thread and returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus_text(metrics, prefix).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,126 @@
+"""
+    Bounded queue of raw market feed frames placed between the websocket receive task and the decoder.
+
+    When the consumer falls behind, the queue either blocks the receiver (pushing back on the socket), drops the
+    oldest frames, or conflates Ticker and Quote frames so only the newest one per instrument is decoded.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import asyncio
+import struct
+from collections import deque
+
+"""Constants for Queue Policy"""
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+CONFLATE = "conflate"
+
+"""Response codes of the packets conflated per instrument, Ticker and Quote"""
+CONFLATED_CODES = (2, 4)
+
+_HEADER = struct.Struct('<BHBI')
+
+
+class FeedQueue:
+    """
+    Bounded FIFO of raw feed frames with a selectable overflow policy.
+
+    Attributes:
+        maxsize (int): Maximum number of frames held.
+        policy (str): One of ``BLOCK``, ``DROP_OLDEST`` or ``CONFLATE``.
+        dropped (int): Frames discarded because the queue was full.
+        conflated (int): Frames replaced by a newer frame of the same instrument.
+        high_watermark (int): Largest depth reached.
+    """
+
+    def __init__(self, maxsize=10000, policy=BLOCK):
+        if policy not in (BLOCK, DROP_OLDEST, CONFLATE):
+            raise ValueError(f"Unsupported queue policy: {policy}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self.conflated = 0
+        self.high_watermark = 0
+        # Conflated frames are queued as their (code, exchange_segment, security_id) key, the newest frame of
+        # each key waits in _latest
+        self._items = deque()
+        self._latest = {}
+        self._closed = False
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def depth(self):
+        """Number of frames waiting to be decoded."""
+        return len(self._items)
+
+    def stats(self):
+        """Returns queue depth and drop counters."""
+        return {
+            "depth": len(self._items),
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "high_watermark": self.high_watermark,
+        }
+
+    async def put(self, frame):
+        """Queues a frame, waiting for space under the ``BLOCK`` policy."""
+        if self.policy == CONFLATE and frame and isinstance(frame, (bytes, bytearray)) and frame[0] in CONFLATED_CODES:
+            code, _, exchange_segment, security_id = _HEADER.unpack_from(frame)
+            key = (code, exchange_segment, security_id)
+            if key in self._latest:
+                self._latest[key] = frame
+                self.conflated += 1
+                return
+            self._latest[key] = frame
+            frame = key
+        if len(self._items) >= self.maxsize:
+            if self.policy == BLOCK:
+                while len(self._items) >= self.maxsize:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+            else:
+                self._discard(self._items.popleft())
+                self.dropped += 1
+        self._items.append(frame)
+        if len(self._items) > self.high_watermark:
+            self.high_watermark = len(self._items)
+        self._not_empty.set()
+
+    def get_nowait(self):
+        """Returns the oldest frame, or None when the queue is empty."""
+        if not self._items:
+            return None
+        item = self._items.popleft()
+        if type(item) is tuple:
+            item = self._latest.pop(item)
+        self._not_full.set()
+        return item
+
+    async def get(self):
+        """Waits for the oldest frame; returns None once the queue is closed and drained."""
+        while not self._items:
+            if self._closed:
+                return None
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    def close(self):
+        """Lets :meth:`get` return None after the remaining frames are consumed."""
+        self._closed = True
+        self._not_empty.set()
+
+    def _discard(self, item):
+        if type(item) is tuple:
+            self._latest.pop(item, None)
@@ -0,0 +1,165 @@
+"""
+    JSON encoding and decoding of REST payloads.
+
+    The clients encode requests and decode responses through :func:`loads` and :func:`dumps`, which use the
+    fastest installed backend: ``orjson``, then ``ujson``, then the standard library. :func:`set_backend` switches
+    backends at runtime. Values a fast backend cannot handle, such as integers beyond 64 bits, fall back to the
+    standard library so every backend returns the same results.
+
+    :class:`LazyResponse` is the ``{"status", "remarks", "data"}`` response of a call whose body is only decoded
+    when ``data`` or ``remarks`` is read, for callers that often check ``status`` alone.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import json
+import logging
+from collections.abc import Mapping
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - optional dependency
+    ujson = None
+
+"""Backends in order of preference"""
+BACKENDS = ("orjson", "ujson", "json")
+
+_backend = None
+_loads = json.loads
+_dumps = json.dumps
+
+
+def _orjson_loads(data):
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def _orjson_dumps(obj):
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+    except TypeError:
+        return json.dumps(obj)
+
+
+def _ujson_loads(data):
+    try:
+        return ujson.loads(data)
+    except ValueError:
+        return json.loads(data)
+
+
+def _ujson_dumps(obj):
+    try:
+        return ujson.dumps(obj, ensure_ascii=False)
+    except (TypeError, OverflowError):
+        return json.dumps(obj)
+
+
+_IMPLEMENTATIONS = {
+    "orjson": (lambda: orjson is not None, _orjson_loads, _orjson_dumps),
+    "ujson": (lambda: ujson is not None, _ujson_loads, _ujson_dumps),
+    "json": (lambda: True, json.loads, json.dumps),
+}
+
+
+def set_backend(name=None):
+    """Selects a backend by name, or the first available one of :data:`BACKENDS`, and returns its name.
+
+    Raises:
+        ValueError: For an unknown or unavailable backend.
+    """
+    global _backend, _loads, _dumps
+    names = BACKENDS if name is None else (name,)
+    for candidate in names:
+        implementation = _IMPLEMENTATIONS.get(candidate)
+        if implementation is None:
+            raise ValueError(f"Unknown JSON backend {candidate!r}, expected one of {BACKENDS}")
+        available, loads_, dumps_ = implementation
+        if available():
+            _backend, _loads, _dumps = candidate, loads_, dumps_
+            return candidate
+    raise ValueError(f"JSON backend {name!r} is not installed")
+
+
+def backend():
+    """Returns the name of the backend in use."""
+    return _backend
+
+
+def loads(data):
+    """Decodes JSON from ``bytes`` or ``str``."""
+    return _loads(data)
+
+
+def dumps(obj):
+    """Encodes ``obj`` as a JSON ``str``."""
+    return _dumps(obj)
+
+
+set_backend()
+
+
+class LazyResponse(Mapping):
+    """
+    Read-only ``{"status", "remarks", "data"}`` response that decodes the body on first access to ``data`` or
+    ``remarks``.
+
+    ``status`` follows the HTTP status code alone, so a 200 response whose body is not JSON reads as
+    ``"success"`` with ``data`` ``""`` and the decoding error in ``remarks``.
+    """
+
+    __slots__ = ("status_code", "content", "_decoded")
+
+    _KEYS = ("status", "remarks", "data")
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self._decoded = None
+
+    def __getitem__(self, key):
+        if key == "status":
+            return "success" if self.status_code == 200 else "failure"
+        if key not in self._KEYS:
+            raise KeyError(key)
+        if self._decoded is None:
+            self._decoded = self._decode()
+        return self._decoded[key]
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __eq__(self, other):
+        return isinstance(other, Mapping) and dict(self) == dict(other)
+
+    def __repr__(self):
+        return f"LazyResponse(status_code={self.status_code}, decoded={self._decoded is not None})"
+
+    def _decode(self):
+        try:
+            data = loads(self.content)
+        except Exception as e:
+            logging.warning("Exception in LazyResponse>>decode: %s", e)
+            return {"remarks": str(e), "data": ""}
+        if self.status_code == 200:
+            return {"remarks": "", "data": data}
+        error = data if isinstance(data, dict) else {}
+        return {
+            "remarks": {
+                "error_code": error.get("errorCode"),
+                "error_type": error.get("errorType"),
+                "error_message": error.get("errorMessage"),
+            },
+            "data": data,
+        }
@@ -7,13 +7,21 @@
 """
 
 import websockets
+import websockets.protocol
 import asyncio
 import struct
+import random
+import time
 from datetime import datetime
 from collections import defaultdict
+from functools import lru_cache
 import json
 import logging
 
+from .feedqueue import FeedQueue, BLOCK
+from .subscriptions import SubscriptionManager, normalize
+from .decodepool import DecodePool, POOLED_CODES, DEFAULT_BATCH_SIZE, DEFAULT_MAX_PENDING
+
 # Constants
 """WebSocket URL for DhanHQ Live Market Feed"""
 market_feed_wss = 'wss://api-feed.dhan.co'
@@ -34,10 +42,117 @@ Quote = 17
 Depth = 19
 Full = 21
 
+"""Seconds the LTT of feed packets runs ahead of UTC; the exchange stamps ticks in Indian Standard Time"""
+IST_OFFSET = 19800
+
+"""Exchange Segment codes mapped to the names used by the v2 JSON requests"""
+EXCHANGE_SEGMENTS = {
+    IDX: "IDX_I",
+    NSE: "NSE_EQ",
+    NSE_FNO: "NSE_FNO",
+    NSE_CURR: "NSE_CURRENCY",
+    BSE: "BSE_EQ",
+    MCX: "MCX_COMM",
+    BSE_CURR: "BSE_CURRENCY",
+    BSE_FNO: "BSE_FNO"
+}
+
+"""Exchange Segment names mapped back to their codes"""
+SEGMENT_CODES = {name: code for code, name in EXCHANGE_SEGMENTS.items()}
+
+"""Precompiled binary layouts of the feed packets, shared by every decoder"""
+_TICKER = struct.Struct('<BHBIfI')
+_OI = struct.Struct('<BHBII')
+_QUOTE = struct.Struct('<BHBIfHIfIIIffff')
+_FULL = struct.Struct('<BHBIfHIfIIIIIIffff')
+_MARKET_DEPTH = struct.Struct('<BHBIf')
+_DEPTH_LEVEL = struct.Struct('<IIHHff')
+_DISCONNECTION = struct.Struct('<BHBIH')
+_REQUEST_HEADER = struct.Struct('<bH30s50s')
+_INSTRUMENT_COUNT = struct.Struct('<I')
+_INSTRUMENT = struct.Struct('<B20s')
+
+"""Server disconnection codes after which the feed does not reconnect"""
+FATAL_DISCONNECTIONS = frozenset((805, 806, 807, 808, 809))
+
+"""Instruments carried by one v1 subscription packet, unused slots are zero padded"""
+SUBSCRIPTION_SLOTS = 100
+
+"""Depth levels carried by Market Depth and Full packets"""
+DEPTH_LEVELS = 5
+
+"""Default number of packets held for an iterator that falls behind"""
+ITERATOR_QUEUE_SIZE = 10000
+
+"""Marks the end of the stream for packet iterators"""
+_CLOSED = object()
+
+"""Price fields of each packet type rendered as strings outside numeric mode"""
+_PRICE_FIELDS = {
+    'Ticker Data': ('LTP',),
+    'Previous Close': ('prev_close',),
+    'Quote Data': ('LTP', 'avg_price', 'open', 'close', 'high', 'low'),
+    'Full Data': ('LTP', 'avg_price', 'open', 'close', 'high', 'low'),
+}
+
+
+@lru_cache(maxsize=1024)
+def _clock_time(epoch_time):
+    """Formats EPOCH time as an ``HH:MM:SS`` string, memoized as consecutive ticks share seconds."""
+    return datetime.utcfromtimestamp(epoch_time).strftime('%H:%M:%S')
+
 
 class DhanFeed:
-    def __init__(self, client_id, access_token, instruments, version='v1'):
-        """Initializes the DhanFeed instance with user credentials, instruments to subscribe, and callback functions."""
+    # Response code of every binary packet mapped to the method decoding it
+    packet_handlers = {
+        2: 'process_ticker',
+        3: 'process_market_depth',
+        4: 'process_quote',
+        5: 'process_oi',
+        6: 'process_prev_close',
+        7: 'process_status',
+        8: 'process_full',
+        50: 'server_disconnection',
+    }
+
+    def __init__(self, client_id, access_token, instruments, version='v1', numeric=False,
+                 queue_size=None, queue_policy=BLOCK, reconnect=False, reconnect_delay=1.0,
+                 max_reconnect_delay=60.0, max_reconnect_attempts=None, metrics=None, decode_workers=0,
+                 decode_batch_size=DEFAULT_BATCH_SIZE, decode_max_pending=DEFAULT_MAX_PENDING):
+        """Initializes the DhanFeed instance with user credentials, instruments to subscribe, and callback functions.
+
+        With ``numeric=True`` packets carry prices as floats and LTT as integer EPOCH seconds instead of
+        formatted strings; :meth:`format_tick` renders such a packet in the string form on demand.
+
+        With ``queue_size`` set, the receive task started by :meth:`start` hands raw frames to a separate decode
+        task through a :class:`FeedQueue` of that size, overflowing according to ``queue_policy``
+        (``'block'``, ``'drop_oldest'`` or ``'conflate'``). Sinks are updated by the receive task as frames
+        arrive, so they also see the frames the queue later drops or conflates.
+
+        With ``reconnect=True`` the receive task reconnects after a dropped connection, waiting with exponential
+        backoff from ``reconnect_delay`` up to ``max_reconnect_delay`` seconds plus jitter, and replays the
+        current ``instruments``. Disconnections reported by the server as fatal (codes 805-809) are not retried.
+        See :meth:`connection_stats` for reconnect counts and downtime.
+
+        ``metrics`` takes a :class:`dhanhq.feedmetrics.FeedMetrics`, or any object with its ``attach``,
+        ``record`` and ``record_decode`` methods. The receive task records every frame with its receive time as
+        it arrives, and its decode time once decoded.
+
+        With ``decode_workers`` set, the receive task only reads frames and market data frames are decoded in
+        that many worker processes by a :class:`dhanhq.decodepool.DecodePool`, in batches of up to
+        ``decode_batch_size`` frames. Packets of one instrument keep their order, and other frames (market status,
+        disconnection) are dispatched only after the packets of every frame received before them. Sinks still
+        see every frame in this process and the workers report their decode times to ``metrics``. Once
+        ``decode_max_pending`` frames wait to be dispatched the receive task stops reading until the callbacks
+        catch up. Not combined with ``queue_size``.
+
+        Iterating the feed (``async for packet in feed``) reads from the receive task, starting it when it does
+        not run yet. Each iterator holds up to ``queue_size`` (default ``ITERATOR_QUEUE_SIZE``) packets; when
+        it falls further behind, the dispatch waits for it under the ``'block'`` policy and otherwise drops its
+        oldest packet.
+        """
+        if decode_workers and queue_size:
+            raise ValueError("decode_workers and queue_size cannot be combined")
 
         self.client_id = client_id
         self.access_token = access_token
@@ -46,8 +161,42 @@ class DhanFeed:
         self._is_first_connect = True
         self.ws = None
         self.on_ticks = None
-        self.loop = asyncio.get_event_loop()
+        try:
+            self.loop = asyncio.get_event_loop()
+        except RuntimeError:
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
         self.version = version
+        self.numeric = numeric
+        self._handlers = {code: getattr(self, name) for code, name in self.packet_handlers.items()}
+        self._callbacks = defaultdict(list)
+        self._receiver = None
+        self._iteration_receiver = None
+        self._iterators = set()
+        self.iterator_queue_size = queue_size or ITERATOR_QUEUE_SIZE
+        self._iterators_block = queue_policy == BLOCK
+        self._sinks = []
+        self.subscriptions = SubscriptionManager(self)
+        self.decode_workers = decode_workers
+        self.decode_batch_size = decode_batch_size
+        self.decode_max_pending = decode_max_pending
+        self._pool = None
+        self._pool_pending = 0
+        self._pool_progress = None
+        self.metrics = metrics
+        self.queue = FeedQueue(queue_size, queue_policy) if queue_size else None
+        self.reconnect = reconnect
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.on_close = False
+        self._fatal_disconnection = False
+        self.reconnect_count = 0
+        self.downtime_windows = []
+        self.time_to_first_tick = []
+        self._reconnected_at = None
+        if metrics is not None:
+            metrics.attach(self)
 
     async def __aenter__(self):
         """Allow usage of ``async with`` for automatic connection management."""
@@ -58,10 +207,18 @@ class DhanFeed:
         """Ensure the websocket connection is closed when exiting."""
         await self.disconnect()
 
+    def __aiter__(self):
+        """Allow ``async for tick in feed``, ending when the connection closes."""
+        return self._iterate()
+
     def run_forever(self):
         """Starts the WebSocket connection and runs the event loop."""
         self.loop.run_until_complete(self.connect())
 
+    def listen(self):
+        """Connects and dispatches packets to the registered callbacks until the connection closes."""
+        self.loop.run_until_complete(self._listen())
+
     def get_data(self): 
         """Fetch instruments data while the event loop is open."""
         return self.loop.run_until_complete(self.get_instrument_data()) 
@@ -95,9 +252,272 @@ class DhanFeed:
         self.data = self.process_data(response)
         return self.data
 
+    def add_callback(self, callback, packet_type=None):
+        """Registers ``callback(packet)`` for one packet type (e.g. 'Ticker Data') or, by default, every packet.
+
+        Callbacks run on the receive task in arrival order; coroutine functions are awaited.
+        """
+        self._callbacks[packet_type].append(callback)
+
+    def remove_callback(self, callback, packet_type=None):
+        """Unregisters a callback added with :meth:`add_callback`."""
+        if callback in self._callbacks[packet_type]:
+            self._callbacks[packet_type].remove(callback)
+
+    def add_sink(self, sink):
+        """Registers an object whose ``update(frame)`` receives every raw frame before it is decoded,
+        e.g. a :class:`dhanhq.snapshot.SnapshotStore`."""
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        """Unregisters a sink added with :meth:`add_sink`."""
+        self._sinks.remove(sink)
+
+    async def start(self):
+        """Connects and starts the long-running receive task that dispatches every packet."""
+        await self.connect()
+        if self._receiver is None or self._receiver.done():
+            self._receiver = asyncio.ensure_future(self._receive_loop())
+        # a receive task started by an iterator now outlives it
+        self._iteration_receiver = None
+        return self._receiver
+
+    async def stop(self):
+        """Stops the receive task, keeping the connection open."""
+        receiver, self._receiver = self._receiver, None
+        if receiver is not None and receiver is not asyncio.current_task():
+            receiver.cancel()
+            try:
+                await receiver
+            except asyncio.CancelledError:
+                pass
+
+    async def _listen(self):
+        await (await self.start())
+
+    async def _receive_loop(self):
+        """Receives, decodes and dispatches packets until the connection closes for good."""
+        decoder = None
+        if self.decode_workers:
+            decoded = asyncio.Queue()
+            self._pool_pending = 0
+            self._pool_progress = asyncio.Event()
+            self._pool = DecodePool(self.decode_workers, self.numeric, self.decode_batch_size,
+                                    timed=self.metrics is not None)
+            self._pool.start(lambda packets, durations: decoded.put_nowait((packets, durations)),
+                             asyncio.get_running_loop())
+            decoder = asyncio.ensure_future(self._pool_dispatch_loop(decoded))
+        elif self.queue is not None:
+            decoder = asyncio.ensure_future(self._decode_loop())
+        try:
+            while True:
+                try:
+                    await self._receive_frames(decoder)
+                except (websockets.ConnectionClosed, OSError) as e:
+                    logging.info("Connection closed: %s", e)
+                    if (not self.reconnect or self.on_close or self._fatal_disconnection
+                            or not await self._reconnect()):
+                        break
+            if self._pool is not None:
+                await asyncio.get_running_loop().run_in_executor(None, self._pool.close)
+                # close() returns after the reader threads handed over the last batches, so None comes after them
+                decoded.put_nowait(None)
+                await decoder
+            elif decoder is not None:
+                self.queue.close()
+                await decoder
+        finally:
+            if decoder is not None:
+                decoder.cancel()
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+            for queue in self._iterators:
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(_CLOSED)
+
+    async def _receive_frames(self, decoder):
+        while True:
+            frame = await self.ws.recv()
+            if self.metrics is not None:
+                self.metrics.record(frame, received=time.time())
+            if self._reconnected_at is not None:
+                self.time_to_first_tick.append(time.monotonic() - self._reconnected_at)
+                self._reconnected_at = None
+            # Sinks see every frame on receipt, including frames the queue later drops or conflates
+            for sink in self._sinks:
+                sink.update(frame)
+            if self._pool is not None:
+                if frame[0] in POOLED_CODES:
+                    self._pool.submit(frame)
+                    self._pool_pending += 1
+                    if self._pool_pending >= self.decode_max_pending:
+                        await self._wait_for_pool(self.decode_max_pending - 1)
+                    continue
+                # packets of earlier frames are still with the workers, so dispatch them first
+                self._pool.flush()
+                await self._wait_for_pool(0)
+            if decoder is not None and self._pool is None:
+                if frame[0] == 50:
+                    # the decode task may still be behind when the connection closes, so judge the code here
+                    self._fatal_disconnection = _DISCONNECTION.unpack_from(frame)[4] in FATAL_DISCONNECTIONS
+                await self.queue.put(frame)
+                continue
+            packet = self._decode(frame, counted=True)
+            if packet is not None:
+                await self._dispatch(packet)
+
+    async def _reconnect(self):
+        """Reconnects with exponential backoff and jitter, replaying the subscription. Returns False on give up."""
+        down_since = time.time()
+        down_since_monotonic = time.monotonic()
+        attempt = 0
+        while self.max_reconnect_attempts is None or attempt < self.max_reconnect_attempts:
+            delay = min(self.max_reconnect_delay, self.reconnect_delay * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+            try:
+                self.ws = None
+                await self.connect()
+            except Exception as e:
+                logging.warning("Reconnect attempt %s failed: %s", attempt, e)
+                continue
+            self.reconnect_count += 1
+            self._reconnected_at = time.monotonic()
+            self.downtime_windows.append((down_since, down_since + self._reconnected_at - down_since_monotonic))
+            logging.info("Reconnected after %s attempt(s)", attempt)
+            return True
+        logging.error("Giving up reconnecting after %s attempts", attempt)
+        return False
+
+    @property
+    def closed_by_server(self):
+        """True when the server disconnected the feed with a code that is not retried (805-809)."""
+        return self.on_close or self._fatal_disconnection
+
+    def connection_stats(self):
+        """Returns reconnect count, downtime windows (start and end EPOCH seconds) and time to first tick."""
+        return {
+            "connected": self.ws is not None and self.ws.state == websockets.protocol.State.OPEN,
+            "reconnects": self.reconnect_count,
+            "downtime_windows": list(self.downtime_windows),
+            "total_downtime": sum(end - start for start, end in self.downtime_windows),
+            "time_to_first_tick": list(self.time_to_first_tick),
+        }
+
+    async def _decode_loop(self):
+        """Decodes and dispatches frames taken from the bounded queue."""
+        while True:
+            frame = await self.queue.get()
+            if frame is None:
+                return
+            packet = self._decode(frame, counted=True)
+            if packet is not None:
+                await self._dispatch(packet)
+
+    async def _pool_dispatch_loop(self, decoded):
+        """Dispatches the packet batches returned by the decode workers until it receives None."""
+        while True:
+            batch = await decoded.get()
+            if batch is None:
+                return
+            packets, durations = batch
+            if durations is not None and self.metrics is not None:
+                for duration in durations:
+                    self.metrics.record_decode(duration)
+            for packet in packets:
+                if packet is not None:
+                    await self._dispatch(packet)
+            self._pool_pending -= len(packets)
+            self._pool_progress.set()
+
+    async def _wait_for_pool(self, pending):
+        """Waits until at most ``pending`` frames submitted to the decode pool are still to be dispatched."""
+        while self._pool_pending > pending:
+            self._pool_progress.clear()
+            await self._pool_progress.wait()
+
+    async def _dispatch(self, packet):
+        """Delivers a decoded packet to iterators, ``on_ticks`` and the registered callbacks."""
+        self.data = packet
+        for queue in tuple(self._iterators):
+            if queue.full():
+                if self._iterators_block:
+                    await queue.put(packet)
+                    continue
+                queue.get_nowait()
+            queue.put_nowait(packet)
+        callbacks = self._callbacks.get(None, [])
+        if isinstance(packet, dict) and packet["type"] in self._callbacks:
+            callbacks = self._callbacks[packet["type"]] + callbacks
+        if self.on_ticks is not None:
+            callbacks = callbacks + [self.on_ticks]
+        for callback in callbacks:
+            try:
+                result = callback(packet)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logging.error("Exception in DhanFeed callback %s: %s", callback, e)
+
+    async def _iterate(self):
+        """Yields the packets dispatched by the receive task. Without a running receive task one is started for
+        the iteration and cancelled once no iterator is left, so the socket never has two readers."""
+        queue = asyncio.Queue(self.iterator_queue_size)
+        self._iterators.add(queue)
+        if self._receiver is None or self._receiver.done():
+            self._receiver = self._iteration_receiver = asyncio.ensure_future(self._receive_loop())
+        try:
+            while True:
+                packet = await queue.get()
+                if packet is _CLOSED:
+                    return
+                yield packet
+        finally:
+            self._iterators.discard(queue)
+            receiver = self._iteration_receiver
+            if not self._iterators and receiver is not None and receiver is self._receiver:
+                self._receiver = self._iteration_receiver = None
+                receiver.cancel()
+
+    async def drain_frames(self, max_frames=10000, timeout=0.001):
+        """Waits for one frame, then collects frames that arrive within ``timeout`` seconds of each other."""
+        frames = [await self.ws.recv()]
+        while len(frames) < max_frames:
+            try:
+                frames.append(await asyncio.wait_for(self.ws.recv(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return [frame for frame in frames if isinstance(frame, (bytes, bytearray)) and frame]
+
+    async def get_instrument_data_batch(self, max_frames=10000, timeout=0.001):
+        """Drains pending frames and decodes Ticker, Quote and Full packets into NumPy structured arrays.
+
+        Returns a dict keyed by packet type ('Ticker Data', 'Quote Data', 'Full Data') holding one structured
+        array per type, plus 'others' with the remaining packets decoded as usual. Every drained frame is passed to
+        the sinks first.
+        """
+        from .feedarrays import decode_frames
+
+        frames = await self.drain_frames(max_frames, timeout)
+        for frame in frames:
+            for sink in self._sinks:
+                sink.update(frame)
+        arrays, others = decode_frames(frames)
+        decoded = []
+        on_close = False
+        for frame in others:
+            decoded.append(self._decode(frame))
+            on_close = on_close or self.on_close
+        self.on_close = on_close
+        arrays["others"] = decoded
+        return arrays
+
     async def disconnect(self):
         """Closes the WebSocket connection by sending a disconnect message,
         closing the socket and clearing the stored reference."""
+        await self.stop()
         if self.ws:
             if self.version == 'v2':
                 disconnect_message = {
@@ -182,242 +602,194 @@ class DhanFeed:
 
     async def subscribe_instruments(self):
         """Subscribe Instruments on the Open Websocket"""
-        if self.version == 'v1':
-            if not self.is_authorized:
-                logging.warning("Not authorized. Please authorize first.")
-                return
-
-            # Subscription packet creation
-            group_size = 100
-
-            new_instrument_list = self.validate_and_process_tuples(self.instruments, group_size)
-
-            if new_instrument_list != {}:
-                for instrument_type in new_instrument_list:
-                    if new_instrument_list[instrument_type] != []:
-                        for instrument_group in new_instrument_list[instrument_type]:
-                            self.subscription_code = int(instrument_type)
-                            subscription_packet = self.create_subscription_packet(instrument_group, self.subscription_code)
-                            await self.ws.send(subscription_packet)
-        elif self.version == 'v2':
-            new_instrument_list = self.validate_and_process_tuples(self.instruments)
-            for instrument_type, instrument_groups in new_instrument_list.items():
-                for instrument_group in instrument_groups:
-                    # Split the instrument group into batches of 100
-                    for i in range(0, len(instrument_group), 100):
-                        batch = instrument_group[i:i+100]
-                        subscription_message = {
-                            "RequestCode": int(instrument_type),
-                            "InstrumentCount": len(batch),
-                            "InstrumentList": [
-                                {
-                                    "ExchangeSegment": self.get_exchange_segment(ex),
-                                    "SecurityId": token
-                                } for ex, token in batch
-                            ]
-                        }
-                        await self.ws.send(json.dumps(subscription_message))
+        if self.version == 'v1' and not self.is_authorized:
+            logging.warning("Not authorized. Please authorize first.")
+            return
+        # A new connection starts without subscriptions, so the whole instrument list is sent
+        self.subscriptions.reset()
+        await self.subscriptions.flush()
 
     def get_exchange_segment(self, exchange_code):
         """Convert numeric exchange code to string representation"""
-        exchange_map = {
-            0: "IDX_I",
-            1: "NSE_EQ",
-            2: "NSE_FNO",
-            3: "NSE_CURRENCY",
-            4: "BSE_EQ",
-            5: "MCX_COMM",
-            7: "BSE_CURRENCY",
-            8: "BSE_FNO"
-        }
-        return exchange_map.get(exchange_code, str(exchange_code))
+        return EXCHANGE_SEGMENTS.get(exchange_code, str(exchange_code))
 
     def process_data(self, data):
         """Read binary data and initiate processing in received format"""
-        first_byte = struct.unpack('<B', data[0:1])[0]
+        for sink in self._sinks:
+            sink.update(data)
+        return self._decode(data)
+
+    async def process_frame(self, frame):
+        """Processes one raw frame from another source, e.g. a recording, as the receive task does: updates the
+        sinks, decodes it and dispatches the packet to iterators and callbacks. Returns the packet."""
+        packet = self.process_data(frame)
+        if packet is not None:
+            await self._dispatch(packet)
+        return packet
+
+    def _decode(self, data, counted=False):
+        """Decodes one frame without updating the sinks, for frames the sinks have already seen. ``counted``
+        frames were recorded by the metrics on receipt, so only their decode time is recorded here."""
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
         self.on_close = False
-        if first_byte == 2:
-            return self.process_ticker(data)
-        elif first_byte == 3:
-            return self.process_market_depth(data)
-        elif first_byte == 4:
-            return self.process_quote(data)
-        elif first_byte == 5:
-            return self.process_oi(data)
-        elif first_byte == 6:
-            return self.process_prev_close(data)
-        elif first_byte == 7:
-            return self.process_status(data)
-        elif first_byte == 8:
-            return self.process_full(data)
-        elif first_byte == 50:
-            return self.server_disconnection(data)
+        handler = self._handlers.get(data[0])
+        packet = handler(data) if handler is not None else None
+        if metrics is not None:
+            if counted:
+                metrics.record_decode(time.perf_counter() - started)
+            else:
+                metrics.record(data, time.perf_counter() - started)
+        return packet
 
     def process_ticker(self, data):
         """Parse and process Ticker Data"""
-        unpack_ticker = [struct.unpack('<BHBIfI', data[0:16])]
-        # Assign unpacked data to fields
+        _, _, exchange_segment, security_id, ltp, ltt = _TICKER.unpack_from(data)
         ticker_data = {
             "type" : 'Ticker Data',
-            "exchange_segment" : unpack_ticker[0][2],
-            "security_id" : unpack_ticker[0][3],
-            "LTP" : "{:.2f}".format(unpack_ticker[0][4]),
-            "LTT" : self.utc_time(unpack_ticker[0][5])
+            "exchange_segment" : exchange_segment,
+            "security_id" : security_id,
+            "LTP" : ltp,
+            "LTT" : ltt
         }
-        return ticker_data
+        return ticker_data if self.numeric else self._format_fields(ticker_data)
 
     def process_prev_close(self, data):
         """Parse and process Previous Day Data"""
-        unpack_pclose = [struct.unpack('<BHBIfI', data[0:16])]
-        # Assign unpacked data to fields
+        _, _, exchange_segment, security_id, prev_close, prev_oi = _TICKER.unpack_from(data)
         prev_close = {
             "type" : 'Previous Close',
-            "exchange_segment" : unpack_pclose[0][2],
-            "security_id" : unpack_pclose[0][3],
-            "prev_close" : "{:.2f}".format(unpack_pclose[0][4]),
-            "prev_OI" : unpack_pclose[0][5]
+            "exchange_segment" : exchange_segment,
+            "security_id" : security_id,
+            "prev_close" : prev_close,
+            "prev_OI" : prev_oi
         }
-        return prev_close
+        return prev_close if self.numeric else self._format_fields(prev_close)
+
+    def process_depth(self, data, offset):
+        """Parse the five depth levels that start at ``offset`` through a memoryview of the packet"""
+        levels = memoryview(data)[offset:offset + DEPTH_LEVELS * _DEPTH_LEVEL.size]
+        return [{
+            "bid_quantity": bid_quantity,
+            "ask_quantity": ask_quantity,
+            "bid_orders": bid_orders,
+            "ask_orders": ask_orders,
+            "bid_price": bid_price,
+            "ask_price": ask_price
+        } for bid_quantity, ask_quantity, bid_orders, ask_orders, bid_price, ask_price
+            in _DEPTH_LEVEL.iter_unpack(levels)]
 
     def process_market_depth(self, data):
         """Parse and process Market Depth Data"""
-        market_data = [struct.unpack('<BHBIf100s', data[0:112])]
-        market_data_list = list(market_data[0][0:5])
-
-        exchange_segment = market_data_list[2]
-        sec_id = market_data_list[3]
-        ltp = market_data_list[4]
-
-        # Process Market Depth
-        market_depth_binary = market_data[0][5]
-        packet_format = '<IIHHff'
-        packet_size = struct.calcsize(packet_format)
-        depth = []
-        for i in range(5):
-            start_idx = i * packet_size
-            end_idx = start_idx + packet_size
-            current_packet = struct.unpack(packet_format, market_depth_binary[start_idx:end_idx])
-            
-            depth.append({
-                "bid_quantity": current_packet[0],
-                "ask_quantity": current_packet[1],
-                "bid_orders": current_packet[2],
-                "ask_orders": current_packet[3],
-                "bid_price": "{:.2f}".format(current_packet[4]),
-                "ask_price": "{:.2f}".format(current_packet[5])
-            })
-
+        _, _, exchange_segment, sec_id, ltp = _MARKET_DEPTH.unpack_from(data)
         market_depth = {
             "type" : 'Market Depth',
             "exchange_segment" : exchange_segment,
             "security_id" : sec_id,
             "LTP" : ltp,
-            "depth" : depth
+            "depth" : self.process_depth(data, _MARKET_DEPTH.size)
                    }
-        return market_depth
+        return market_depth if self.numeric else self._format_fields(market_depth)
 
     def process_quote(self, data):
         """Parse and process Quote Data"""
-        unpack_quote = [struct.unpack('<BHBIfHIfIIIffff', data[0:50])]
+        unpack_quote = _QUOTE.unpack_from(data)
         quote_data = {
             "type" : 'Quote Data',
-            "exchange_segment" : unpack_quote[0][2],
-            "security_id": unpack_quote[0][3],
-            "LTP": "{:.2f}".format(unpack_quote[0][4]),
-            "LTQ" : unpack_quote[0][5],
-            "LTT" : self.utc_time(unpack_quote[0][6]),
-            "avg_price" : "{:.2f}".format(unpack_quote[0][7]),
-            "volume" : unpack_quote[0][8],
-            "total_sell_quantity" : unpack_quote[0][9],
-            "total_buy_quantity" : unpack_quote[0][10],
-            "open" : "{:.2f}".format(unpack_quote[0][11]),
-            "close": "{:.2f}".format(unpack_quote[0][12]),
-            "high": "{:.2f}".format(unpack_quote[0][13]),
-            "low": "{:.2f}".format(unpack_quote[0][14])
+            "exchange_segment" : unpack_quote[2],
+            "security_id": unpack_quote[3],
+            "LTP": unpack_quote[4],
+            "LTQ" : unpack_quote[5],
+            "LTT" : unpack_quote[6],
+            "avg_price" : unpack_quote[7],
+            "volume" : unpack_quote[8],
+            "total_sell_quantity" : unpack_quote[9],
+            "total_buy_quantity" : unpack_quote[10],
+            "open" : unpack_quote[11],
+            "close": unpack_quote[12],
+            "high": unpack_quote[13],
+            "low": unpack_quote[14]
         }
-        return quote_data
+        return quote_data if self.numeric else self._format_fields(quote_data)
 
     def process_oi(self, data):
         """Parse and process OI Data"""
-        unpack_oi = [struct.unpack('<BHBII', data[0:12])]
+        _, _, exchange_segment, security_id, oi = _OI.unpack_from(data)
         oi_data = {
             "type" : 'OI Data',
-            "exchange_segment" : unpack_oi[0][2],
-            "security_id": unpack_oi[0][3],
-            "OI": unpack_oi[0][4]
+            "exchange_segment" : exchange_segment,
+            "security_id": security_id,
+            "OI": oi
         }
         return oi_data
 
     def process_status(self, data):
         """Parse and process market status"""
-        unpack_status = [struct.unpack('<BHBI', data[0:8])]
         market_status = "Markets Open"
         return market_status
     
     def process_full(self, data):
         """Parse and process Full Packet Data"""
-        unpack_full = [struct.unpack('<BHBIfHIfIIIIIIffff100s', data[0:162])]
-
-        # Processing Market Depth in Full Packet
-        market_depth_binary = unpack_full[0][18]
-        packet_format = '<IIHHff'
-        packet_size = struct.calcsize(packet_format)
-
-        depth = []
-        for i in range(5):
-            start_idx = i * packet_size
-            end_idx = start_idx + packet_size
-            current_packet = struct.unpack(packet_format, market_depth_binary[start_idx:end_idx])
-            
-            depth.append({
-                "bid_quantity": current_packet[0],
-                "ask_quantity": current_packet[1],
-                "bid_orders": current_packet[2],
-                "ask_orders": current_packet[3],
-                "bid_price": "{:.2f}".format(current_packet[4]),
-                "ask_price": "{:.2f}".format(current_packet[5])
-            })
-
+        unpack_full = _FULL.unpack_from(data)
         full_packet = {
             "type" : 'Full Data',
-            "exchange_segment" : unpack_full[0][2],
-            "security_id": unpack_full[0][3],
-            "LTP": "{:.2f}".format(unpack_full[0][4]),
-            "LTQ" : unpack_full[0][5],
-            "LTT" : self.utc_time(unpack_full[0][6]),
-            "avg_price" : "{:.2f}".format(unpack_full[0][7]),
-            "volume" : unpack_full[0][8],
-            "total_sell_quantity" : unpack_full[0][9],
-            "total_buy_quantity" : unpack_full[0][10],
-            "OI" : unpack_full[0][11],
-            "oi_day_high" : unpack_full[0][12],
-            "oi_day_low" : unpack_full[0][13],
-            "open" : "{:.2f}".format(unpack_full[0][14]),
-            "close": "{:.2f}".format(unpack_full[0][15]),
-            "high": "{:.2f}".format(unpack_full[0][16]),
-            "low": "{:.2f}".format(unpack_full[0][17]),
-            "depth": depth
+            "exchange_segment" : unpack_full[2],
+            "security_id": unpack_full[3],
+            "LTP": unpack_full[4],
+            "LTQ" : unpack_full[5],
+            "LTT" : unpack_full[6],
+            "avg_price" : unpack_full[7],
+            "volume" : unpack_full[8],
+            "total_sell_quantity" : unpack_full[9],
+            "total_buy_quantity" : unpack_full[10],
+            "OI" : unpack_full[11],
+            "oi_day_high" : unpack_full[12],
+            "oi_day_low" : unpack_full[13],
+            "open" : unpack_full[14],
+            "close": unpack_full[15],
+            "high": unpack_full[16],
+            "low": unpack_full[17],
+            "depth": self.process_depth(data, _FULL.size)
         }
-        return full_packet
+        return full_packet if self.numeric else self._format_fields(full_packet)
+
+    def format_tick(self, tick):
+        """Returns a copy of a numeric mode packet with prices and LTT formatted as the default mode emits them."""
+        tick = dict(tick)
+        if "depth" in tick:
+            tick["depth"] = [dict(level) for level in tick["depth"]]
+        return self._format_fields(tick)
+
+    def _format_fields(self, tick):
+        """Formats price fields with two decimals and LTT as ``HH:MM:SS`` in place."""
+        for field in _PRICE_FIELDS.get(tick["type"], ()):
+            tick[field] = '%.2f' % tick[field]
+        if "LTT" in tick:
+            tick["LTT"] = _clock_time(tick["LTT"])
+        for level in tick.get("depth", ()):
+            level["bid_price"] = '%.2f' % level["bid_price"]
+            level["ask_price"] = '%.2f' % level["ask_price"]
+        return tick
 
 
     def server_disconnection(self, data):
         """Parse and process server disconnection error"""
-        disconnection_packet = [struct.unpack('<BHBIH', data[0:10])]
+        error_code = _DISCONNECTION.unpack_from(data)[4]
         self.on_close = False
-        if disconnection_packet[0][4] == 805:
+        if error_code == 805:
             logging.error("Disconnected: No. of active websocket connections exceeded")
             self.on_close = True
-        elif disconnection_packet[0][4] == 806:
+        elif error_code == 806:
             logging.error("Disconnected: Subscribe to Data APIs to continue")
             self.on_close = True
-        elif disconnection_packet[0][4] == 807:
+        elif error_code == 807:
             logging.error("Disconnected: Access Token is expired")
             self.on_close = True
-        elif disconnection_packet[0][4] == 808:
+        elif error_code == 808:
             logging.error("Disconnected: Invalid Client ID")
             self.on_close = True
-        elif disconnection_packet[0][4] == 809:
+        elif error_code == 809:
             logging.error("Disconnected: Authentication Failed - check ")
             self.on_close = True
 
@@ -436,106 +808,61 @@ class DhanFeed:
 
     def create_header(self, feed_request_code, message_length, client_id):
         """Creates header packet for the subscription packet."""
-        dhan_auth = b"\0" * 50
-        header = struct.pack('<bH30s50s', feed_request_code, message_length, client_id.encode('utf-8'), dhan_auth)
-        return header
+        return _REQUEST_HEADER.pack(feed_request_code, message_length, client_id.encode('utf-8'), b"")
 
     def utc_time(self, epoch_time):
         """Converts EPOCH time to UTC time."""
-        return datetime.utcfromtimestamp(epoch_time).strftime('%H:%M:%S')
+        return _clock_time(epoch_time)
     
     def create_subscription_packet(self, instruments, feed_request_code):
         """Creates the subscription packet with specified instruments and subscription code"""
         num_instruments = len(instruments)
-
-        header = self.create_header(feed_request_code = feed_request_code, 
-                                    message_length=83 + 4 + num_instruments * 21,
-                                    client_id=self.client_id)
-        num_instruments_bytes = struct.pack('<I', num_instruments)
-        instrument_info = b""
-        for exchange_segment, security_id in instruments: 
-            instrument_info += struct.pack('<B20s', exchange_segment, security_id.encode('utf-8'))
-
-        instruments = [(0, "")]
-        for i in range(100 - num_instruments):
-            instrument_info += struct.pack('<B20s', instruments[0][0], instruments[0][1].encode('utf-8'))
-
-        subscription_packet = header + num_instruments_bytes + instrument_info
-        return subscription_packet
+        instruments_offset = _REQUEST_HEADER.size + _INSTRUMENT_COUNT.size
+
+        # A zero filled buffer already holds the padding of the unused instrument slots
+        packet = bytearray(instruments_offset + max(num_instruments, SUBSCRIPTION_SLOTS) * _INSTRUMENT.size)
+        _REQUEST_HEADER.pack_into(packet, 0, feed_request_code, instruments_offset + num_instruments * _INSTRUMENT.size,
+                                  self.client_id.encode('utf-8'), b"")
+        _INSTRUMENT_COUNT.pack_into(packet, _REQUEST_HEADER.size, num_instruments)
+
+        pack_instrument = _INSTRUMENT.pack_into
+        for offset, (exchange_segment, security_id) in zip(
+                range(instruments_offset, len(packet), _INSTRUMENT.size), instruments):
+            pack_instrument(packet, offset, exchange_segment, security_id.encode('utf-8'))
+        return bytes(packet)
+
+    def create_subscription_message(self, instruments, request_code):
+        """Creates the v2 JSON subscription message with specified instruments and request code"""
+        return json.dumps({
+            "RequestCode": request_code,
+            "InstrumentCount": len(instruments),
+            "InstrumentList": [
+                {
+                    "ExchangeSegment": EXCHANGE_SEGMENTS.get(ex, str(ex)),
+                    "SecurityId": token
+                } for ex, token in instruments
+            ]
+        })
     
-    def subscribe_symbols(self, symbols): 
-        """Function to subscribe to additional symbols when connection is already established."""
-        # Update the instruments list
-        unique_symbols_set = set(self.instruments)
-        unique_symbols_set.update(symbols)
-        self.instruments = list(unique_symbols_set)
-
-        # If the WebSocket is open, send the subscription packet for the new symbols
-        if self.ws and not self.ws.closed:
-            # Prepare the instruments list for subscription
-            group_size = 100
-            new_instrument_list = self.validate_and_process_tuples(symbols, group_size)
+    def subscribe_symbols(self, symbols):
+        """Function to subscribe to additional symbols when connection is already established.
+
+        Only instruments not subscribed yet are sent. Returns the task sending them, which can be awaited to
+        confirm delivery, or None while disconnected.
+        """
+        instruments = dict.fromkeys(normalize(self.instruments, self.version))
+        instruments.update(dict.fromkeys(normalize(symbols, self.version)))
+        self.instruments = list(instruments)
+        if self.ws:
+            return self.subscriptions.schedule()
 
-            if self.version == 'v1':
-                for instrument_type in new_instrument_list:
-                    if new_instrument_list[instrument_type]:
-                        for instrument_group in new_instrument_list[instrument_type]:
-                            subscription_packet = self.create_subscription_packet(instrument_group, int(instrument_type))
-                            asyncio.ensure_future(self.ws.send(subscription_packet))
-            elif self.version == 'v2':
-                new_instrument_list = self.validate_and_process_tuples(symbols)
-                for instrument_type, instrument_groups in new_instrument_list.items():
-                    for instrument_group in instrument_groups:
-                        for i in range(0, len(instrument_group), 100):
-                            batch = instrument_group[i:i+100]
-                            subscription_message = {
-                                "RequestCode": int(instrument_type),
-                                "InstrumentCount": len(batch),
-                                "InstrumentList": [
-                                    {
-                                        "ExchangeSegment": self.get_exchange_segment(ex),
-                                        "SecurityId": token
-                                    } for ex, token in batch
-                                ]
-                            }
-                            asyncio.ensure_future(self.ws.send(json.dumps(subscription_message)))
-
-    def unsubscribe_symbols(self, symbols): 
-        """Function to unsubscribe symbols from connection when connection is already active."""
-        # Update the instruments list by removing the specified symbols
-        unique_symbols_set = set(self.instruments)
-        unique_symbols_set.difference_update(symbols)
-        self.instruments = list(unique_symbols_set)
-
-        # If the WebSocket is open, send the unsubscription packet for the symbols
-        if self.ws and not self.ws.closed:
-            # Prepare the instruments list for unsubscription
-            group_size = 100
-            instrument_list_to_unsubscribe = self.validate_and_process_tuples(symbols, group_size)
+    def unsubscribe_symbols(self, symbols):
+        """Function to unsubscribe symbols from connection when connection is already active.
 
-            if self.version == 'v1':
-            # Send unsubscription packets for the removed symbols
-                for instrument_type in instrument_list_to_unsubscribe:
-                    if instrument_list_to_unsubscribe[instrument_type]:
-                        for instrument_group in instrument_list_to_unsubscribe[instrument_type]:
-                            # Use the original instrument_type for grouping, but increment for the actual request
-                            unsubscription_packet = self.create_subscription_packet(instrument_group, int(instrument_type) + 1)
-                            asyncio.ensure_future(self.ws.send(unsubscription_packet))
-            
-            elif self.version == 'v2':
-                for instrument_type, instrument_groups in instrument_list_to_unsubscribe.items():
-                    for instrument_group in instrument_groups:
-                        for i in range(0, len(instrument_group), 100):
-                            batch = instrument_group[i:i+100]
-                            unsubscription_message = {
-                                # Use the incremented instrument_type for the actual request
-                                "RequestCode": int(instrument_type) + 1,
-                                "InstrumentCount": len(batch),
-                                "InstrumentList": [
-                                    {
-                                        "ExchangeSegment": self.get_exchange_segment(ex),
-                                        "SecurityId": token
-                                    } for ex, token in batch
-                                ]
-                            }
-                            asyncio.ensure_future(self.ws.send(json.dumps(unsubscription_message)))
+        Returns the task sending the unsubscription, which can be awaited, or None while disconnected.
+        """
+        removed = set(normalize(symbols, self.version))
+        self.instruments = [instrument for instrument in normalize(self.instruments, self.version)
+                            if instrument not in removed]
+        if self.ws:
+            return self.subscriptions.schedule()
@@ -0,0 +1,174 @@
+"""
+    In-memory order book kept current from live order updates.
+
+    :class:`OrderBookCache` loads the day's orders once through ``dhanhq.get_order_list`` and then applies the
+    updates of an :class:`dhanhq.orderupdate.OrderSocket`, so order lookups are dict reads instead of REST calls.
+    The book is reconciled with the REST order list again only after the socket reconnects, when updates may
+    have been missed, or when :meth:`OrderBookCache.reconcile` is called.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import asyncio
+import logging
+import threading
+
+from .orderupdate import RECONNECTED, order_field
+
+"""Order update fields mapped to the field of the REST order book holding the same value"""
+UPDATE_FIELDS = {
+    "orderNo": "orderId",
+    "status": "orderStatus",
+    "correlationId": "correlationId",
+    "exchOrderNo": "exchangeOrderId",
+    "securityId": "securityId",
+    "txnType": "transactionType",
+    "product": "productType",
+    "orderType": "orderType",
+    "validity": "validity",
+    "quantity": "quantity",
+    "disclosedQty": "disclosedQuantity",
+    "price": "price",
+    "triggerPrice": "triggerPrice",
+    "tradedQty": "filledQty",
+    "remainingQuantity": "remainingQuantity",
+    "avgTradedPrice": "averageTradedPrice",
+    "lastUpdatedTime": "updateTime",
+    "reasonDescription": "omsErrorDescription",
+}
+
+
+def _response(data):
+    return {"status": "success", "remarks": "", "data": data}
+
+
+class OrderBookCache:
+    """
+    Orders of the day indexed by ``orderId`` and ``correlationId``.
+
+    The lookup methods return the same ``{"status", "remarks", "data"}`` responses as the :class:`dhanhq.dhanhq`
+    methods they replace. Orders missing from the cache are fetched through the client and cached.
+
+    Attributes:
+        client (dhanhq): REST client used to load and reconcile the book.
+        loaded (bool): Whether the book has been loaded from the REST order list.
+        reconciliations (int): Successful loads of the REST order list.
+    """
+
+    def __init__(self, client, socket=None):
+        self.client = client
+        self.loaded = False
+        self.reconciliations = 0
+        self._orders = {}
+        self._by_correlation = {}
+        self._lock = threading.Lock()
+        self._replay = None
+        if socket is not None:
+            self.attach(socket)
+
+    def __len__(self):
+        return len(self._orders)
+
+    def attach(self, socket):
+        """Keeps the book current from ``socket`` and reconciles it whenever the socket reconnects."""
+        socket.add_callback(self.apply)
+        socket.add_callback(self._reconnected, RECONNECTED)
+
+    def reconcile(self):
+        """Replaces the book with the REST order list and returns True on success.
+
+        Updates applied while the request is in flight are applied again on top of the new book.
+        """
+        with self._lock:
+            self._replay = []
+        response = self.client.get_order_list()
+        with self._lock:
+            replay, self._replay = self._replay, None
+            if response.get("status") != "success" or not isinstance(response.get("data"), list):
+                logging.warning("Order book reconciliation failed: %s", response.get("remarks"))
+                return False
+            self._orders = {}
+            self._by_correlation = {}
+            for order in response["data"]:
+                self._store(dict(order))
+            for update in replay:
+                self._merge(update)
+            self.loaded = True
+            self.reconciliations += 1
+        return True
+
+    def apply(self, update):
+        """Merges one order update of :class:`dhanhq.orderupdate.OrderSocket` into the book."""
+        order = {}
+        for field, rest_field in UPDATE_FIELDS.items():
+            value = order_field(update, field)
+            if value is not None:
+                order[rest_field] = value
+        if "orderId" not in order:
+            return
+        order["orderId"] = str(order["orderId"])
+        if "orderStatus" in order:
+            order["orderStatus"] = str(order["orderStatus"]).upper()
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append(order)
+            self._merge(order)
+
+    async def _reconnected(self, _):
+        await asyncio.get_running_loop().run_in_executor(None, self.reconcile)
+
+    def _merge(self, order):
+        current = self._orders.get(order["orderId"])
+        if current is None:
+            self._store(dict(order))
+        else:
+            current.update(order)
+            self._index(current)
+
+    def _store(self, order):
+        order["orderId"] = str(order.get("orderId"))
+        self._orders[order["orderId"]] = order
+        self._index(order)
+
+    def _index(self, order):
+        correlation_id = order.get("correlationId")
+        if correlation_id:
+            self._by_correlation[str(correlation_id)] = order
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.reconcile()
+
+    def get_order_list(self):
+        """Returns every cached order, loading the book on first use."""
+        self._ensure_loaded()
+        with self._lock:
+            return _response([dict(order) for order in self._orders.values()])
+
+    def get_order_by_id(self, order_id):
+        """Returns one order by ``orderId``, asking the API when it is not cached."""
+        self._ensure_loaded()
+        with self._lock:
+            order = self._orders.get(str(order_id))
+            if order is not None:
+                return _response(dict(order))
+        return self._fetch(self.client.get_order_by_id(order_id))
+
+    def get_order_by_correlationID(self, correlationID):
+        """Returns one order by the ``correlationId`` given at placement, asking the API when it is not cached."""
+        self._ensure_loaded()
+        with self._lock:
+            order = self._by_correlation.get(str(correlationID))
+            if order is not None:
+                return _response(dict(order))
+        return self._fetch(self.client.get_order_by_correlationID(correlationID))
+
+    def _fetch(self, response):
+        data = response.get("data")
+        if isinstance(data, list) and len(data) == 1:
+            data = data[0]
+        if response.get("status") == "success" and isinstance(data, dict) and data.get("orderId") is not None:
+            with self._lock:
+                self._merge(dict(data, orderId=str(data["orderId"])))
+        return response
@@ -1,15 +1,44 @@
 """
     The orderupdate class is designed to facilitate asynchronous communication with the DhanHQ API via WebSocket.
-    It enables users to subscribe to market data for a list of instruments and receive real-time updates.
+    It streams real-time updates of the orders placed by the client, keeps the latest state of every order and
+    dispatches events such as fills and rejections to registered callbacks.
 
     :copyright: (c) 2024 by Dhan.
     :license: see LICENSE for details.
 """
 
 import asyncio
+import inspect
+import random
 import websockets
 import json
 import logging
+from collections import defaultdict
+
+"""Order events dispatched to callbacks"""
+FILLED = "filled"
+PARTIALLY_FILLED = "partially_filled"
+REJECTED = "rejected"
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+RECONNECTED = "reconnected"
+
+"""Order status reported by the exchange mapped to the event it raises"""
+STATUS_EVENTS = {
+    "TRADED": FILLED,
+    "PART_TRADED": PARTIALLY_FILLED,
+    "REJECTED": REJECTED,
+    "CANCELLED": CANCELLED,
+    "EXPIRED": EXPIRED,
+}
+
+
+def order_field(data, name):
+    """Reads a field of an order update, which uses ``orderNo`` or ``OrderNo`` style keys."""
+    value = data.get(name)
+    if value is None:
+        value = data.get(name[0].upper() + name[1:])
+    return value
 
 
 class OrderSocket:
@@ -20,25 +49,54 @@ class OrderSocket:
         client_id (str): The client ID for authentication.
         access_token (str): The access token for authentication.
         order_feed_wss (str): The WebSocket URL for order updates.
+        orders (dict): Latest update of every order seen, keyed by order number.
+        reconnect_count (int): Connections established after the first one.
     """
 
-    def __init__(self, client_id, access_token):
+    def __init__(self, client_id, access_token, reconnect_delay=1.0, max_reconnect_delay=60.0):
         """
         Initializes the OrderSocket with client ID and access token.
 
         Args:
             client_id (str): The client ID for authentication.
             access_token (str): The access token for authentication.
+            reconnect_delay (float): First wait, in seconds, before :meth:`listen` reconnects.
+            max_reconnect_delay (float): Longest wait between reconnection attempts.
         """
         self.client_id = client_id
         self.access_token = access_token
         self.order_feed_wss = "wss://api-order-update.dhan.co"
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connections = 0
+        self.reconnect_count = 0
+        self.orders = {}
+        self._callbacks = defaultdict(list)
+        self._listener = None
+        self._stopped = False
+
+    def add_callback(self, callback, event=None):
+        """Registers ``callback(order)`` for one event (e.g. ``FILLED``) or, by default, every order update.
+
+        ``RECONNECTED`` callbacks receive None after :meth:`listen` re-established the connection. Coroutine
+        functions are awaited.
+        """
+        self._callbacks[event].append(callback)
+
+    def remove_callback(self, callback, event=None):
+        """Unregisters a callback added with :meth:`add_callback`."""
+        if callback in self._callbacks.get(event, ()):
+            self._callbacks[event].remove(callback)
+
+    def get_order(self, order_no):
+        """Returns the latest update of an order, or None."""
+        return self.orders.get(str(order_no))
 
     async def connect_order_update(self):
         """
         Connects to the WebSocket and listens for order updates.
 
-        This method authenticates the client and processes incoming messages.
+        This method authenticates the client and processes incoming messages until the connection closes.
         """
         async with websockets.connect(self.order_feed_wss) as websocket:
             auth_message = {
@@ -52,29 +110,108 @@ class OrderSocket:
 
             await websocket.send(json.dumps(auth_message))
             logging.info("Sent subscribe message: %s", auth_message)
+            self.connections += 1
+            if self.connections > 1:
+                self.reconnect_count += 1
+                await self._emit(RECONNECTED, None)
 
             async for message in websocket:
                 data = json.loads(message)
                 await self.handle_order_update(data)
 
+    async def listen(self):
+        """
+        Streams order updates forever, reconnecting with exponential backoff and jitter whenever the
+        connection drops, until :meth:`stop` is called.
+        """
+        self._stopped = False
+        attempt = 0
+        while not self._stopped:
+            connections = self.connections
+            try:
+                await self.connect_order_update()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning("Order update connection lost: %s", e)
+            if self._stopped:
+                break
+            if self.connections != connections:
+                attempt = 0
+            delay = min(self.max_reconnect_delay, self.reconnect_delay * 2 ** attempt)
+            attempt += 1
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def start(self):
+        """Starts :meth:`listen` as a task of the running event loop and returns it."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self.listen())
+        return self._listener
+
+    async def stop(self):
+        """Stops the task started by :meth:`start`."""
+        self._stopped = True
+        listener, self._listener = self._listener, None
+        if listener is not None and listener is not asyncio.current_task():
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+
     async def handle_order_update(self, order_update):
         """
         Handles incoming order update messages.
 
+        Updates the order state table and dispatches the callbacks of the event the update raises.
+
         Args:
             order_update (dict): The order update message received from the WebSocket.
         """
         if order_update.get('Type') == 'order_alert':
             data = order_update.get('Data', {})
-            if "orderNo" in data:
-                order_id = data["orderNo"]
-                status = data.get("status", "Unknown status")
+            order_id = order_field(data, "orderNo")
+            if order_id is not None:
+                status = order_field(data, "status") or "Unknown status"
                 logging.info("Status: %s, Order ID: %s, Data: %s", status, order_id, data)
+                await self.update_order(data)
             else:
                 logging.info("Order Update received: %s", data)
         else:
             logging.warning("Unknown message received: %s", order_update)
 
+    async def update_order(self, data):
+        """Merges an order update into :attr:`orders` and dispatches the event of a status or fill change.
+
+        Returns:
+            str: The event raised, or None.
+        """
+        order_id = str(order_field(data, "orderNo"))
+        previous = self.orders.get(order_id)
+        order = dict(previous or {})
+        order.update(data)
+        self.orders[order_id] = order
+        status = str(order_field(order, "status") or "").upper()
+        event = STATUS_EVENTS.get(status)
+        if event is not None and previous is not None:
+            unchanged = (str(order_field(previous, "status") or "").upper() == status
+                         and order_field(previous, "tradedQty") == order_field(order, "tradedQty"))
+            if unchanged:
+                event = None
+        await self._emit(None, order)
+        if event is not None:
+            await self._emit(event, order)
+        return event
+
+    async def _emit(self, event, order):
+        for callback in list(self._callbacks.get(event, ())):
+            try:
+                result = callback(order)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logging.error("Exception in OrderSocket>>callback: %s", e)
+
     def connect_to_dhan_websocket_sync(self):
         """
         Synchronously connects to the WebSocket.
@@ -0,0 +1,276 @@
+"""
+    Positions and P&L maintained from order fills and live prices.
+
+    :class:`PositionEngine` applies the fills reported by an :class:`dhanhq.orderupdate.OrderSocket` and marks
+    positions to market from the LTP of every :class:`dhanhq.marketfeed.DhanFeed` frame, or from a
+    :class:`dhanhq.snapshot.SnapshotStore`. Instruments are identified by feed exchange segment code and security
+    ID, as security IDs are only unique within a segment. Realized and unrealized P&L are kept per instrument and
+    per tag (the ``correlationId`` of the order by default), and stop-loss/target watches on a tag are checked on
+    every fill and price move.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import logging
+import struct
+from collections import defaultdict
+
+from .marketfeed import BSE, BSE_CURR, BSE_FNO, MCX, NSE, NSE_CURR, NSE_FNO, SEGMENT_CODES
+from .orderupdate import order_field
+
+"""Response codes of the feed packets carrying LTP"""
+LTP_CODES = frozenset((2, 3, 4, 8))
+
+"""Reasons passed to watch callbacks"""
+STOP_LOSS = "stop_loss"
+TARGET = "target"
+
+"""Exchange and segment (E equity, D derivatives, C currency, M commodity) of order updates mapped to the feed
+exchange segment code"""
+ORDER_SEGMENTS = {
+    ("NSE", "E"): NSE,
+    ("NSE", "D"): NSE_FNO,
+    ("NSE", "C"): NSE_CURR,
+    ("BSE", "E"): BSE,
+    ("BSE", "D"): BSE_FNO,
+    ("BSE", "C"): BSE_CURR,
+    ("MCX", "M"): MCX,
+    ("MCX", "D"): MCX,
+}
+
+_HEADER = struct.Struct('<BHBIf')
+
+
+def segment_code(exchange_segment):
+    """Returns the feed code of an exchange segment given as a code or a name such as ``"NSE_FNO"``."""
+    return int(SEGMENT_CODES.get(exchange_segment, exchange_segment))
+
+
+def order_segment(data):
+    """Returns the feed exchange segment code of an order update or REST order, or None when it is missing."""
+    name = order_field(data, "exchangeSegment")
+    if name is not None:
+        return SEGMENT_CODES.get(name)
+    exchange, segment = order_field(data, "exchange"), order_field(data, "segment")
+    if exchange is None or segment is None:
+        return None
+    return ORDER_SEGMENTS.get((str(exchange).upper(), str(segment).upper()[:1]))
+
+
+class Position:
+    """
+    Net position of one instrument under one tag, valued at average cost.
+
+    Attributes:
+        exchange_segment (int): Feed exchange segment code.
+        security_id (int): Security ID within the segment.
+        quantity (int): Net quantity, negative when short.
+        average_price (float): Average cost of the open quantity.
+        realized (float): P&L of the quantity closed so far.
+        ltp (float): Last price the position was marked at, or None.
+    """
+
+    __slots__ = ('exchange_segment', 'security_id', 'tag', 'quantity', 'average_price', 'realized', 'ltp')
+
+    def __init__(self, exchange_segment, security_id, tag=None):
+        self.exchange_segment = exchange_segment
+        self.security_id = security_id
+        self.tag = tag
+        self.quantity = 0
+        self.average_price = 0.0
+        self.realized = 0.0
+        self.ltp = None
+
+    def __repr__(self):
+        return (f"Position({self.exchange_segment}, {self.security_id}, tag={self.tag!r}, quantity={self.quantity}, "
+                f"average_price={self.average_price}, realized={self.realized}, unrealized={self.unrealized})")
+
+    @property
+    def unrealized(self):
+        """P&L of the open quantity at :attr:`ltp`; 0.0 before the first price."""
+        if self.ltp is None or not self.quantity:
+            return 0.0
+        return (self.ltp - self.average_price) * self.quantity
+
+    def fill(self, quantity, price):
+        """Applies a fill of signed ``quantity`` (positive buys) at ``price``."""
+        held = self.quantity
+        if held and (held > 0) != (quantity > 0):
+            closed = min(abs(held), abs(quantity))
+            self.realized += (price - self.average_price) * closed * (1 if held > 0 else -1)
+            held += closed if held < 0 else -closed
+            quantity += closed if quantity < 0 else -closed
+            if not held:
+                self.average_price = 0.0
+        if quantity:
+            self.average_price = (self.average_price * abs(held) + price * abs(quantity)) / (abs(held) + abs(quantity))
+            held += quantity
+        self.quantity = held
+
+
+class PositionEngine:
+    """
+    Positions per ``(exchange_segment, security_id, tag)`` with P&L aggregated per instrument and per tag.
+
+    Register it on a feed with ``feed.add_sink(engine)`` and on an order socket with ``engine.attach(socket)``.
+    Exchange segments are accepted as feed codes or names such as ``"NSE_EQ"``; order updates are mapped with
+    :func:`order_segment`. Watch callbacks run on the thread applying the fill or tick and should return quickly.
+    """
+
+    def __init__(self):
+        self._positions = {}
+        self._by_instrument = defaultdict(list)
+        self._by_tag = defaultdict(list)
+        self._ltp = {}
+        self._tags = {}
+        self._filled = {}
+        self._watches = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def attach(self, socket):
+        """Applies the fills reported by an :class:`dhanhq.orderupdate.OrderSocket`."""
+        socket.add_callback(self.on_order_update)
+
+    def tag_order(self, order_no, tag):
+        """Books the fills of an order under ``tag`` instead of its ``correlationId``."""
+        self._tags[str(order_no)] = tag
+
+    def position(self, exchange_segment, security_id, tag=None):
+        """Returns the :class:`Position` of an instrument under a tag, or None."""
+        return self._positions.get((segment_code(exchange_segment), int(security_id), tag))
+
+    def positions(self, exchange_segment=None, security_id=None, tag=None):
+        """Returns the positions matching an instrument and/or tag, every position by default.
+
+        Raises:
+            ValueError: When ``security_id`` is given without ``exchange_segment``.
+        """
+        instrument = None
+        if security_id is not None:
+            if exchange_segment is None:
+                raise ValueError("security_id needs an exchange_segment, security IDs repeat across segments")
+            instrument = (segment_code(exchange_segment), int(security_id))
+        if tag is not None:
+            positions = self._by_tag.get(tag, ())
+        elif instrument is not None:
+            positions = self._by_instrument.get(instrument, ())
+        else:
+            positions = self._positions.values()
+        segment = None if exchange_segment is None else segment_code(exchange_segment)
+        return [position for position in list(positions)
+                if (segment is None or position.exchange_segment == segment)
+                and (instrument is None or position.security_id == instrument[1])]
+
+    def pnl(self, exchange_segment=None, security_id=None, tag=None):
+        """Returns ``{"realized", "unrealized", "total"}`` summed over the matching positions."""
+        realized = unrealized = 0.0
+        for position in self.positions(exchange_segment, security_id, tag):
+            realized += position.realized
+            unrealized += position.unrealized
+        return {"realized": realized, "unrealized": unrealized, "total": realized + unrealized}
+
+    def watch(self, tag, callback, stop_loss=None, target=None):
+        """Calls ``callback(tag, reason, pnl)`` once the total P&L of ``tag`` falls to ``-abs(stop_loss)`` or
+        rises to ``target``; ``reason`` is :data:`STOP_LOSS` or :data:`TARGET`. The watch is removed after it fires.
+        """
+        self._watches[tag] = (callback, stop_loss, target)
+        self._check(tag)
+
+    def unwatch(self, tag):
+        """Removes the watch of a tag."""
+        self._watches.pop(tag, None)
+
+    def apply_fill(self, exchange_segment, security_id, quantity, price, tag=None):
+        """Applies a fill of signed ``quantity`` (positive buys) at ``price`` and checks the tag's watch."""
+        instrument = (segment_code(exchange_segment), int(security_id))
+        position = self._positions.get(instrument + (tag,))
+        if position is None:
+            position = self._positions[instrument + (tag,)] = Position(*instrument, tag)
+            position.ltp = self._ltp.get(instrument)
+            self._by_instrument[instrument].append(position)
+            self._by_tag[tag].append(position)
+        position.fill(quantity, price)
+        if position.ltp is None:
+            position.ltp = price
+        self._check(tag)
+        return position
+
+    def on_order_update(self, data):
+        """Turns the growth of an order's traded quantity into a fill; the callback of ``OrderSocket``."""
+        order_no = order_field(data, "orderNo")
+        traded = order_field(data, "tradedQty")
+        security_id = order_field(data, "securityId")
+        side = str(order_field(data, "txnType") or order_field(data, "transactionType") or "").upper()
+        if order_no is None or traded is None or security_id is None or not side:
+            return
+        exchange_segment = order_segment(data)
+        if exchange_segment is None:
+            logging.warning("PositionEngine>>on_order_update: no exchange segment in update of order %s", order_no)
+            return
+        order_no, traded = str(order_no), int(traded)
+        previous, previous_average = self._filled.get(order_no, (0, 0.0))
+        if traded <= previous:
+            return
+        average = order_field(data, "avgTradedPrice")
+        if average is not None and float(average):
+            average = float(average)
+            price = (average * traded - previous_average * previous) / (traded - previous)
+        else:
+            price = float(order_field(data, "tradedPrice") or order_field(data, "price") or 0.0)
+            average = (previous_average * previous + price * (traded - previous)) / traded
+        self._filled[order_no] = (traded, average)
+        quantity = traded - previous
+        tag = self._tags.get(order_no) or order_field(data, "correlationId") or None
+        self.apply_fill(exchange_segment, security_id, quantity if side.startswith("B") else -quantity, price, tag)
+
+    def mark(self, exchange_segment, security_id, ltp):
+        """Marks every position of an instrument at ``ltp`` and checks the watches of their tags."""
+        instrument = (segment_code(exchange_segment), int(security_id))
+        self._ltp[instrument] = ltp
+        positions = self._by_instrument.get(instrument)
+        if positions:
+            for position in positions:
+                position.ltp = ltp
+            if self._watches:
+                for tag in {position.tag for position in positions}:
+                    self._check(tag)
+
+    def mark_from(self, snapshot):
+        """Marks every position from the LTPs of a :class:`dhanhq.snapshot.SnapshotStore`."""
+        for exchange_segment, security_id in snapshot.keys():
+            if (exchange_segment, security_id) in self._by_instrument:
+                ltp = snapshot.ltp(exchange_segment, security_id)
+                if ltp is not None:
+                    self.mark(exchange_segment, security_id, ltp)
+
+    def update(self, frame):
+        """Marks positions from one raw binary feed frame; the sink hook of ``DhanFeed``."""
+        if frame[0] not in LTP_CODES:
+            return
+        _, _, exchange_segment, security_id, ltp = _HEADER.unpack_from(frame)
+        if (exchange_segment, security_id) in self._by_instrument:
+            self.mark(exchange_segment, security_id, ltp)
+        else:
+            self._ltp[(exchange_segment, security_id)] = ltp
+
+    def _check(self, tag):
+        watch = self._watches.get(tag)
+        if watch is None:
+            return
+        callback, stop_loss, target = watch
+        total = self.pnl(tag=tag)["total"]
+        if stop_loss is not None and total <= -abs(stop_loss):
+            reason = STOP_LOSS
+        elif target is not None and total >= target:
+            reason = TARGET
+        else:
+            return
+        if self._watches.pop(tag, None) is None:
+            return
+        try:
+            callback(tag, reason, total)
+        except Exception as e:
+            logging.error("Exception in PositionEngine>>watch: %s", e)
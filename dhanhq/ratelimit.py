@@ -0,0 +1,208 @@
+"""
+    Client-side rate limiting of DhanHQ REST calls.
+
+    :class:`RateLimiter` keeps token buckets per endpoint class (orders, data, quotes and non-trading calls) with
+    the limits DhanHQ publishes, so bursts wait on the client instead of being rejected by the API. One limiter
+    can be shared by several clients, sync and async, and by any number of threads. Waiting requests are served
+    by priority: order placement, modification and cancellation go before every other call competing for the
+    same bucket. Wait times are recorded per class and reported by :meth:`RateLimiter.stats`.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import asyncio
+import bisect
+import itertools
+import threading
+import time
+from urllib.parse import urlsplit
+
+"""Endpoint classes"""
+ORDER = "order"
+DATA = "data"
+QUOTE = "quote"
+NON_TRADING = "non_trading"
+
+"""Limits per endpoint class as (requests, per seconds) pairs, all of which apply"""
+DEFAULT_LIMITS = {
+    ORDER: ((25, 1), (250, 60), (1000, 3600)),
+    DATA: ((5, 1),),
+    QUOTE: ((1, 1),),
+    NON_TRADING: ((20, 1),),
+}
+
+"""Priority of each endpoint class, lower is served first"""
+PRIORITIES = {ORDER: 0, NON_TRADING: 1, DATA: 2, QUOTE: 2}
+
+_ORDER_PATHS = ("/orders", "/super/orders", "/forever/orders")
+_DATA_PATHS = ("/charts/", "/optionchain")
+
+
+def endpoint_class(method, url):
+    """Returns the endpoint class of a request, e.g. :data:`ORDER` for ``POST /v2/orders``."""
+    path = urlsplit(url).path
+    if path.startswith("/v2/"):
+        path = path[3:]
+    if method.upper() in ("POST", "PUT", "DELETE") and path.startswith(_ORDER_PATHS):
+        return ORDER
+    if path.startswith("/marketfeed/"):
+        return QUOTE
+    if path.startswith(_DATA_PATHS):
+        return DATA
+    return NON_TRADING
+
+
+class TokenBucket:
+    """Holds up to ``capacity`` tokens, refilled at ``capacity / period`` tokens per second."""
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """Seconds until one token is available, after :meth:`refill`."""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token buckets per endpoint class shared by every request of one or more clients.
+
+    Args:
+        limits (dict): Endpoint class mapped to ``(requests, seconds)`` pairs; classes not listed are not limited.
+        total (tuple): Optional ``(requests, seconds)`` limit over all classes, served strictly by priority.
+    """
+
+    def __init__(self, limits=None, total=None):
+        limits = DEFAULT_LIMITS if limits is None else limits
+        shared = [TokenBucket(*total)] if total else []
+        self._buckets = {name: [TokenBucket(*limit) for limit in pairs] + shared for name, pairs in limits.items()}
+        self._shared = shared
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._stats = {name: {"requests": 0, "waited": 0, "wait_total": 0.0, "wait_max": 0.0, "throttled": 0}
+                       for name in self._buckets}
+
+    def acquire(self, endpoint, timeout=None):
+        """Blocks until a request of ``endpoint`` class may be sent and returns the seconds waited.
+
+        Raises:
+            TimeoutError: When ``timeout`` seconds pass first.
+        """
+        if endpoint not in self._buckets:
+            return 0.0
+        start = time.monotonic()
+        waited = False
+        with self._condition:
+            ticket = self._enqueue(endpoint)
+            try:
+                while True:
+                    delay = self._try(ticket)
+                    if delay is None:
+                        return self._record(endpoint, start, waited)
+                    if timeout is not None:
+                        remaining = start + timeout - time.monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError(f"rate limit wait for {endpoint} exceeded {timeout}s")
+                        delay = min(delay, remaining)
+                    waited = True
+                    self._condition.wait(delay)
+            finally:
+                self._dequeue(ticket)
+
+    async def acquire_async(self, endpoint):
+        """Waits without blocking the event loop until a request of ``endpoint`` class may be sent."""
+        if endpoint not in self._buckets:
+            return 0.0
+        start = time.monotonic()
+        waited = False
+        with self._condition:
+            ticket = self._enqueue(endpoint)
+        try:
+            while True:
+                with self._condition:
+                    delay = self._try(ticket)
+                    if delay is None:
+                        return self._record(endpoint, start, waited)
+                waited = True
+                await asyncio.sleep(delay)
+        finally:
+            with self._condition:
+                self._dequeue(ticket)
+
+    def throttled(self, endpoint):
+        """Empties the buckets of a class after the API rejected a request with HTTP 429."""
+        buckets = self._buckets.get(endpoint)
+        if buckets is None:
+            return
+        with self._condition:
+            now = time.monotonic()
+            for bucket in buckets:
+                if bucket not in self._shared:
+                    bucket.refill(now)
+                    bucket.tokens = min(bucket.tokens, 0.0)
+            self._stats[endpoint]["throttled"] += 1
+
+    def stats(self):
+        """Returns requests, requests that waited, total and longest wait in seconds and 429s per class."""
+        with self._condition:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+            for name, values in stats.items():
+                values["waiting"] = sum(1 for ticket in self._waiting if ticket[2] == name)
+            return stats
+
+    def _enqueue(self, endpoint):
+        ticket = (PRIORITIES.get(endpoint, 1), next(self._sequence), endpoint)
+        bisect.insort(self._waiting, ticket)
+        return ticket
+
+    def _dequeue(self, ticket):
+        index = bisect.bisect_left(self._waiting, ticket)
+        if index < len(self._waiting) and self._waiting[index] == ticket:
+            del self._waiting[index]
+            self._condition.notify_all()
+
+    def _record(self, endpoint, start, waited):
+        stats = self._stats[endpoint]
+        stats["requests"] += 1
+        if not waited:
+            return 0.0
+        seconds = time.monotonic() - start
+        stats["waited"] += 1
+        stats["wait_total"] += seconds
+        stats["wait_max"] = max(stats["wait_max"], seconds)
+        return seconds
+
+    def _try(self, ticket):
+        """Takes a token for ``ticket`` and returns None, or returns the seconds to wait before trying again."""
+        endpoint = ticket[2]
+        buckets = self._buckets[endpoint]
+        for waiting in self._waiting:
+            if waiting == ticket:
+                break
+            if waiting[2] == endpoint or (self._shared and waiting[2] in self._buckets):
+                return self._delay(waiting[2])
+        now = time.monotonic()
+        for bucket in buckets:
+            bucket.refill(now)
+        delay = max(bucket.delay() for bucket in buckets)
+        if delay > 0:
+            return delay
+        for bucket in buckets:
+            bucket.tokens -= 1
+        return None
+
+    def _delay(self, endpoint):
+        now = time.monotonic()
+        buckets = self._buckets[endpoint]
+        for bucket in buckets:
+            bucket.refill(now)
+        return max(max(bucket.delay() for bucket in buckets), 0.001)
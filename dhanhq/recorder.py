@@ -0,0 +1,185 @@
+"""
+    Recording and deterministic replay of raw market feed frames.
+
+    :class:`TickRecorder` is a :class:`dhanhq.marketfeed.DhanFeed` sink appending every binary frame with its
+    receive time to segmented, optionally gzip compressed files. :class:`TickReplay` reads the segments back and
+    feeds the frames through ``process_data`` at the recorded pace, N times faster, or as fast as possible.
+
+    Every segment starts with an 8 byte signature followed by records of a ``'<dI'`` header (receive time as
+    EPOCH seconds, frame length) and the frame bytes.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import asyncio
+import glob
+import gzip
+import os
+import re
+import struct
+import time
+
+"""Signature at the start of every segment"""
+SIGNATURE = b'DHANTK01'
+
+"""Default segment size in uncompressed bytes"""
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+_RECORD = struct.Struct('<dI')
+_SEGMENT_NUMBER = re.compile(r'\.(\d+)\.dtk(?:\.gz)?$')
+
+
+def segment_paths(source):
+    """Returns the segment files of ``source``, a segment file, a directory or a ``directory/prefix`` path,
+    in recording order."""
+    if os.path.isfile(source):
+        return [source]
+    if os.path.isdir(source):
+        pattern = os.path.join(source, '*.dtk*')
+    else:
+        pattern = source + '.*.dtk*'
+    return sorted(glob.glob(pattern))
+
+
+def read_frames(source):
+    """Yields ``(received_at, frame)`` of every record in the segments of ``source``."""
+    for path in segment_paths(source):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as segment:
+            if segment.read(len(SIGNATURE)) != SIGNATURE:
+                raise ValueError(f"{path} is not a tick recording")
+            while True:
+                header = segment.read(_RECORD.size)
+                if len(header) < _RECORD.size:
+                    break
+                received_at, length = _RECORD.unpack(header)
+                frame = segment.read(length)
+                if len(frame) < length:
+                    break
+                yield received_at, frame
+
+
+class TickRecorder:
+    """
+    Appends raw feed frames to ``directory/prefix.NNNNN.dtk`` segments (``.dtk.gz`` with ``compress=True``).
+
+    Register it with ``feed.add_sink(recorder)``; frames are stamped when the feed receives them. A new
+    segment is started once the current one holds ``segment_size`` bytes, and recording resumes after the
+    highest numbered existing segment of the same prefix. Segments are created exclusively, so an existing
+    file is never overwritten.
+
+    Attributes:
+        frames (int): Frames recorded.
+        segments (list): Paths of the segments written by this recorder.
+    """
+
+    def __init__(self, directory, prefix='ticks', segment_size=DEFAULT_SEGMENT_SIZE, compress=False,
+                 compresslevel=6):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.segment_size = segment_size
+        self.compress = compress
+        self.compresslevel = compresslevel
+        self.frames = 0
+        self.segments = []
+        numbers = [int(match.group(1)) for match in map(_SEGMENT_NUMBER.search,
+                                                        segment_paths(os.path.join(directory, prefix))) if match]
+        self._index = max(numbers, default=-1) + 1
+        self._file = None
+        self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def update(self, frame):
+        """Records one binary frame with the current time; text frames are ignored."""
+        if isinstance(frame, str):
+            return
+        self.write(time.time(), frame)
+
+    def write(self, received_at, frame):
+        """Records one frame with an explicit receive time."""
+        if self._file is None or self._size >= self.segment_size:
+            self._rotate()
+        self._file.write(_RECORD.pack(received_at, len(frame)))
+        self._file.write(frame)
+        self._size += _RECORD.size + len(frame)
+        self.frames += 1
+
+    def flush(self):
+        """Flushes buffered records to the current segment."""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Closes the current segment."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        self.close()
+        path = os.path.join(self.directory, f"{self.prefix}.{self._index:05d}.dtk")
+        self._index += 1
+        if self.compress:
+            path += '.gz'
+            self._file = gzip.open(path, 'xb', compresslevel=self.compresslevel)
+        else:
+            self._file = open(path, 'xb', buffering=1024 * 1024)
+        self._file.write(SIGNATURE)
+        self._size = len(SIGNATURE)
+        self.segments.append(path)
+
+
+class TickReplay:
+    """
+    Replays a recording through a :class:`dhanhq.marketfeed.DhanFeed`.
+
+    ``speed`` scales the recorded gaps between frames: 1 replays in real time, 10 ten times faster and None
+    (or 0) without waiting.
+    """
+
+    def __init__(self, source, speed=1.0):
+        self.source = source
+        self.speed = speed
+
+    def frames(self):
+        """Yields the recorded frames, waiting between them according to ``speed``."""
+        for delay, frame in self._paced():
+            if delay > 0:
+                time.sleep(delay)
+            yield frame
+
+    def replay(self, feed):
+        """Yields the packets decoded by ``feed.process_data`` for every recorded frame; sinks are updated too."""
+        for frame in self.frames():
+            packet = feed.process_data(frame)
+            if packet is not None:
+                yield packet
+
+    async def play(self, feed):
+        """Decodes every recorded frame and dispatches it to the feed's callbacks and iterators, as the receive
+        task does. Returns the number of frames replayed."""
+        count = 0
+        for delay, frame in self._paced():
+            if delay > 0:
+                await asyncio.sleep(delay)
+            count += 1
+            await feed.process_frame(frame)
+        return count
+
+    def _paced(self):
+        """Yields ``(seconds_to_wait, frame)`` keeping the replay on the scaled recorded timeline."""
+        started = first = None
+        for received_at, frame in read_frames(self.source):
+            if not self.speed:
+                yield 0, frame
+                continue
+            if started is None:
+                started, first = time.perf_counter(), received_at
+            yield (received_at - first) / self.speed - (time.perf_counter() - started), frame
@@ -0,0 +1,125 @@
+"""
+    Retry policy of the synchronous DhanHQ client.
+
+    Safe requests (GET by default) are retried with exponential backoff and jitter after connection errors and
+    retryable HTTP statuses. Order placement is never blindly resent: :class:`RetryPolicy` tells the client whether
+    a failed attempt could have reached the API. An attempt that provably did not (the connection was never
+    established, or the API answered 429) is sent again. After an ambiguous failure the client looks the order up
+    by its ``correlationId`` and resubmits only once the API confirms no such order exists. A caller supplied tag may
+    be reused across orders, so an order found under one only counts when it was created after the first attempt.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from .jsonbackend import loads
+
+"""HTTP statuses after which a safe request is retried"""
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+"""HTTP statuses after which an order may or may not have been accepted"""
+AMBIGUOUS_STATUSES = frozenset((500, 502, 503, 504))
+
+"""HTTP status and error codes of a lookup that found no order"""
+NOT_FOUND_STATUS = 404
+NOT_FOUND_ERRORS = frozenset(("DH-907",))
+
+"""Format and timezone of the ``createTime`` of an order"""
+CREATE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def request_was_sent(error):
+    """Returns False when ``error`` proves the request never reached the server, True when it may have."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = getattr(error.args[0], "reason", error.args[0]) if error.args else None
+        if isinstance(reason, NewConnectionError):
+            return False
+    return True
+
+
+def order_not_found(response):
+    """Returns True when an order lookup response definitely says the order does not exist."""
+    if response.status_code != NOT_FOUND_STATUS:
+        return False
+    try:
+        error = loads(response.content)
+    except ValueError:
+        return False
+    return isinstance(error, dict) and error.get("errorCode") in NOT_FOUND_ERRORS
+
+
+def created_before(order, since):
+    """Returns True unless ``order`` has a ``createTime`` at or after the epoch time ``since`` (to the second)."""
+    try:
+        created = datetime.strptime(str(order.get("createTime")), CREATE_TIME_FORMAT).replace(tzinfo=IST)
+    except ValueError:
+        return True
+    return created.timestamp() < int(since)
+
+
+class RetryPolicy:
+    """
+    How often and how fast the client retries.
+
+    Attributes:
+        attempts (int): Attempts per request, including the first one.
+        backoff (float): Wait before the first retry; doubled for every further retry.
+        max_backoff (float): Longest wait between two attempts.
+        methods (frozenset): HTTP methods retried by the transport.
+        statuses (frozenset): HTTP statuses retried by the transport.
+        lookup_attempts (int): ``get_order_by_correlationID`` calls that must all find no order before an order
+            is resubmitted after an ambiguous failure.
+        lookup_delay (float): Wait before each of those lookups, giving the API time to register the order.
+    """
+
+    def __init__(self, attempts=3, backoff=0.2, max_backoff=2.0, methods=("GET",), statuses=RETRY_STATUSES,
+                 lookup_attempts=3, lookup_delay=0.5):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.methods = frozenset(method.upper() for method in methods)
+        self.statuses = frozenset(statuses)
+        self.lookup_attempts = lookup_attempts
+        self.lookup_delay = lookup_delay
+        self.retries = 0
+
+    def delay(self, attempt, response=None):
+        """Seconds to wait before retry number ``attempt`` (from 0), honouring a ``Retry-After`` header."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def send(self, send, request):
+        """Sends a request through ``send(request)``, retrying safe methods; returns the last response."""
+        if request.method.upper() not in self.methods:
+            return send(request)
+        for attempt in range(self.attempts):
+            last = attempt == self.attempts - 1
+            try:
+                response = send(request)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if last:
+                    raise
+                self.retries += 1
+                self.sleep(self.delay(attempt))
+                continue
+            if last or response.status_code not in self.statuses:
+                return response
+            self.retries += 1
+            self.sleep(self.delay(attempt, response))
+            response.close()
@@ -0,0 +1,259 @@
+"""
+    Shared-memory fan-out of market feed ticks to local processes.
+
+    One process runs the :class:`dhanhq.marketfeed.DhanFeed` connection with a :class:`TickPublisher` sink, which
+    decodes every frame into a fixed-size record per instrument slot of a ``multiprocessing.shared_memory``
+    block. Any number of :class:`TickSubscriber` processes attach by name and read the records directly,
+    without sockets or pickling. Records are guarded by a sequence counter (seqlock) so readers never return
+    a half written tick, and a ring of slot indices lets subscribers follow updates in arrival order.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import logging
+import math
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from .marketfeed import DEPTH_LEVELS
+from .snapshot import FIELDS, DEPTH_FIELDS, DEPTH_LEVEL, LAYOUTS, field_value
+
+"""Default instrument slots and ring length of a publisher"""
+DEFAULT_SLOTS = 5000
+DEFAULT_RING_SIZE = 65536
+
+"""Default seconds a subscriber waits for a record being written before giving up on the publisher"""
+DEFAULT_READ_TIMEOUT = 0.1
+
+"""Identifies a block written by TickPublisher"""
+_MAGIC = 0x44484E54
+
+# The block is an array of doubles: a header, one record per instrument slot, then the ring of slot indices.
+# Header: magic, slots, ring size, used slots, write count.
+_HEADER = 8
+_SLOTS, _RING_SIZE, _USED, _WRITES = 1, 2, 3, 4
+# Record: sequence, exchange segment, security id, FIELDS, depth levels.
+_SEGMENT, _SECURITY_ID, _VALUES = 1, 2, 3
+_DEPTH = _VALUES + len(FIELDS)
+_DEPTH_WIDTH = DEPTH_LEVELS * len(DEPTH_FIELDS)
+_RECORD = _DEPTH + _DEPTH_WIDTH
+_UPDATED = FIELDS.index('updated')
+
+
+def _block_size(slots, ring_size):
+    return 8 * (_HEADER + slots * _RECORD + ring_size)
+
+
+def _attach(name):
+    """Attaches to an existing block without registering it with this process's resource tracker, which would
+    otherwise unlink the publisher's block when the subscriber exits."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None if rtype == "shared_memory" else register(name, rtype)
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class TickPublisher:
+    """
+    Feed sink writing the latest tick of every instrument into shared memory.
+
+    Register it with ``feed.add_sink(publisher)``. Instruments are given slots in arrival order; frames of
+    instruments beyond ``slots`` are dropped with a warning.
+
+    Attributes:
+        name (str): Name subscribers attach to.
+        dropped (int): Frames dropped because every slot was taken.
+    """
+
+    def __init__(self, name=None, slots=DEFAULT_SLOTS, ring_size=DEFAULT_RING_SIZE):
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=_block_size(slots, ring_size))
+        self.name = self.shm.name
+        self.slots = slots
+        self.ring_size = ring_size
+        self.dropped = 0
+        self._slots = {}
+        self._ring = _HEADER + slots * _RECORD
+        self._data = self.shm.buf.cast('d')
+        self._data[_SLOTS] = slots
+        self._data[_RING_SIZE] = ring_size
+        self._data[_USED] = 0
+        self._data[_WRITES] = 0
+        self._data[0] = _MAGIC
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def update(self, frame):
+        """Decodes one raw binary feed frame into its instrument slot; other frames are ignored."""
+        layout = LAYOUTS.get(frame[0])
+        if layout is None:
+            return
+        packet, slots, depth_offset = layout
+        values = packet.unpack_from(frame)
+        slot = self._slots.get((values[2], values[3]))
+        if slot is None:
+            slot = self._add(values[2], values[3])
+            if slot is None:
+                return
+        data = self._data
+        base = _HEADER + slot * _RECORD
+        seq = data[base]
+        data[base] = seq + 1
+        values_base = base + _VALUES
+        for field, value in zip(slots, values[4:]):
+            data[values_base + field] = value
+        data[values_base + _UPDATED] = time.time()
+        if depth_offset:
+            index = base + _DEPTH
+            levels = memoryview(frame)[depth_offset:depth_offset + DEPTH_LEVELS * DEPTH_LEVEL.size]
+            for level in DEPTH_LEVEL.iter_unpack(levels):
+                for value in level:
+                    data[index] = value
+                    index += 1
+        data[base] = seq + 2
+        writes = data[_WRITES]
+        data[self._ring + int(writes) % self.ring_size] = slot
+        data[_WRITES] = writes + 1
+
+    def close(self, unlink=True):
+        """Releases the block and, by default, removes it once every subscriber has detached."""
+        if self._data is None:
+            return
+        self._data.release()
+        self._data = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+    def _add(self, exchange_segment, security_id):
+        used = len(self._slots)
+        if used >= self.slots:
+            self.dropped += 1
+            if self.dropped == 1:
+                logging.warning("TickPublisher %s is full, dropping new instruments", self.name)
+            return None
+        data = self._data
+        base = _HEADER + used * _RECORD
+        data[base + _SEGMENT] = exchange_segment
+        data[base + _SECURITY_ID] = security_id
+        for index in range(base + _VALUES, base + _RECORD):
+            data[index] = math.nan
+        self._slots[(exchange_segment, security_id)] = used
+        data[_USED] = used + 1
+        return used
+
+
+class TickSubscriber:
+    """
+    Reader of a :class:`TickPublisher` block, usable from any local process.
+
+    :meth:`read` returns the latest tick of one instrument; :meth:`poll` returns the ticks published since the
+    previous poll in arrival order. A subscriber that falls more than the ring length behind skips ahead and
+    counts the missed updates in ``overruns``. A record that stays mid-write for ``read_timeout`` seconds,
+    as when the publisher died while writing it, raises TimeoutError.
+    """
+
+    def __init__(self, name, read_timeout=DEFAULT_READ_TIMEOUT):
+        self.shm = _attach(name)
+        self.name = name
+        self.read_timeout = read_timeout
+        self._data = self.shm.buf.cast('d')
+        if self._data[0] != _MAGIC:
+            self.close()
+            raise ValueError(f"{name} is not a tick publisher block")
+        self.slots = int(self._data[_SLOTS])
+        self.ring_size = int(self._data[_RING_SIZE])
+        self.overruns = 0
+        self._ring = _HEADER + self.slots * _RECORD
+        self._slots = {}
+        self._cursor = int(self._data[_WRITES])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return int(self._data[_USED])
+
+    def read(self, exchange_segment, security_id):
+        """Returns the latest tick of an instrument, or None when it has not been published."""
+        slot = self._slot(int(exchange_segment), int(security_id))
+        return None if slot is None else self._read(slot)
+
+    def poll(self, max_ticks=None):
+        """Returns the ticks published since the last poll, oldest first; an instrument updated several times
+        appears once per update with its latest values."""
+        data = self._data
+        writes = int(data[_WRITES])
+        if writes - self._cursor > self.ring_size:
+            self.overruns += writes - self._cursor - self.ring_size
+            self._cursor = writes - self.ring_size
+        end = writes if max_ticks is None else min(writes, self._cursor + max_ticks)
+        ticks = [self._read(int(data[self._ring + index % self.ring_size])) for index in range(self._cursor, end)]
+        self._cursor = end
+        return ticks
+
+    def ticks(self, interval=0.001):
+        """Yields published ticks forever, sleeping ``interval`` seconds while none are pending."""
+        while True:
+            ticks = self.poll()
+            if not ticks:
+                time.sleep(interval)
+            yield from ticks
+
+    def close(self):
+        """Detaches from the block without removing it."""
+        if self._data is None:
+            return
+        self._data.release()
+        self._data = None
+        self.shm.close()
+
+    def _slot(self, exchange_segment, security_id):
+        slot = self._slots.get((exchange_segment, security_id))
+        if slot is None:
+            data = self._data
+            for index in range(len(self._slots), int(data[_USED])):
+                base = _HEADER + index * _RECORD
+                self._slots[(int(data[base + _SEGMENT]), int(data[base + _SECURITY_ID]))] = index
+            slot = self._slots.get((exchange_segment, security_id))
+        return slot
+
+    def _read(self, slot):
+        """Copies one record, retrying while the publisher is writing it."""
+        data = self._data
+        base = _HEADER + slot * _RECORD
+        deadline = None
+        while True:
+            seq = data[base]
+            if not seq % 2:
+                record = data[base:base + _RECORD].tolist()
+                if data[base] == seq:
+                    break
+            if deadline is None:
+                deadline = time.monotonic() + self.read_timeout
+            elif time.monotonic() > deadline:
+                raise TimeoutError(f"Record {slot} of {self.name} is still being written, is the publisher alive?")
+            # let the publisher finish the record
+            time.sleep(0)
+        tick = {"exchange_segment": int(record[_SEGMENT]), "security_id": int(record[_SECURITY_ID])}
+        for field, value in zip(FIELDS, record[_VALUES:_DEPTH]):
+            if not math.isnan(value):
+                tick[field] = field_value(field, value)
+        if not math.isnan(record[_DEPTH]):
+            width = len(DEPTH_FIELDS)
+            tick["depth"] = [{field: field_value(field, value)
+                              for field, value in zip(DEPTH_FIELDS, record[i:i + width])}
+                             for i in range(_DEPTH, _RECORD, width)]
+        return tick
@@ -0,0 +1,243 @@
+"""
+    Last-value cache of market feed data.
+
+    :class:`SnapshotStore` keeps the latest LTP, quote, OHLC, OI and depth of every instrument seen on a
+    :class:`dhanhq.marketfeed.DhanFeed` in flat ``array('d')`` rows updated in place from the raw frames, so
+    reads are O(1) and no per-tick dict is kept. A :class:`dhanhq.dhanhq` client created with ``snapshot=store``
+    answers ``ticker_data`` and ``quote_data`` from the store when every requested instrument is fresh.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import math
+import time
+from array import array
+from datetime import datetime
+
+from .marketfeed import (SEGMENT_CODES, DEPTH_LEVELS, _TICKER, _OI, _QUOTE, _FULL, _MARKET_DEPTH,
+                         _DEPTH_LEVEL)
+
+"""Fields held for every instrument, in row order"""
+FIELDS = ('LTP', 'LTT', 'LTQ', 'avg_price', 'volume', 'total_sell_quantity', 'total_buy_quantity',
+          'open', 'close', 'high', 'low', 'OI', 'oi_day_high', 'oi_day_low', 'prev_close', 'prev_OI', 'updated')
+
+"""Fields of one depth level, in row order"""
+DEPTH_FIELDS = ('bid_quantity', 'ask_quantity', 'bid_orders', 'ask_orders', 'bid_price', 'ask_price')
+
+_SLOT = {field: index for index, field in enumerate(FIELDS)}
+_STRIDE = len(FIELDS)
+_DEPTH_STRIDE = DEPTH_LEVELS * len(DEPTH_FIELDS)
+_UPDATED = _SLOT['updated']
+_EMPTY_ROW = array('d', [math.nan]) * _STRIDE
+_EMPTY_DEPTH = array('d', [math.nan]) * _DEPTH_STRIDE
+
+"""Binary layout of one depth level, shared with the other raw frame sinks"""
+DEPTH_LEVEL = _DEPTH_LEVEL
+
+
+def _slots(*fields):
+    return tuple(_SLOT[field] for field in fields)
+
+
+"""Response code mapped to the packet layout, the row slots of its values and the offset of its depth"""
+LAYOUTS = {
+    2: (_TICKER, _slots('LTP', 'LTT'), 0),
+    3: (_MARKET_DEPTH, _slots('LTP'), _MARKET_DEPTH.size),
+    4: (_QUOTE, _slots('LTP', 'LTQ', 'LTT', 'avg_price', 'volume', 'total_sell_quantity', 'total_buy_quantity',
+                       'open', 'close', 'high', 'low'), 0),
+    5: (_OI, _slots('OI'), 0),
+    6: (_TICKER, _slots('prev_close', 'prev_OI'), 0),
+    8: (_FULL, _slots('LTP', 'LTQ', 'LTT', 'avg_price', 'volume', 'total_sell_quantity', 'total_buy_quantity',
+                      'OI', 'oi_day_high', 'oi_day_low', 'open', 'close', 'high', 'low'), _FULL.size),
+}
+
+
+"""Fields stored as floats but read back as int"""
+_INTEGER_FIELDS = frozenset(('LTT', 'LTQ', 'volume', 'total_sell_quantity', 'total_buy_quantity', 'OI',
+                             'oi_day_high', 'oi_day_low', 'prev_OI', 'bid_quantity', 'ask_quantity',
+                             'bid_orders', 'ask_orders'))
+
+
+def field_value(field, value):
+    """Returns a value stored as float with the type the feed reports for ``field``."""
+    return int(value) if field in _INTEGER_FIELDS else value
+
+
+class SnapshotStore:
+    """
+    Latest market data per ``(exchange_segment, security_id)``, updated in place from raw feed frames.
+
+    Register the store on a feed with ``feed.add_sink(store)``. Exchange segments may be given as the feed's
+    numeric codes or as the REST names (e.g. ``"NSE_EQ"``) and security IDs as int or str. Values not received
+    yet read as None. Reads from another thread may see a row between two field writes of one tick.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._keys = []
+        self._data = array('d')
+        self._depth = array('d')
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, instrument):
+        return self._row(*instrument) is not None
+
+    def keys(self):
+        """Returns the ``(exchange_segment, security_id)`` of every instrument seen, in arrival order."""
+        return list(self._keys)
+
+    def update(self, frame):
+        """Applies one raw binary feed frame; frames without market data are ignored."""
+        layout = LAYOUTS.get(frame[0])
+        if layout is None:
+            return
+        packet, slots, depth_offset = layout
+        values = packet.unpack_from(frame)
+        key = (values[2], values[3])
+        row = self._rows.get(key)
+        if row is None:
+            row = self._add(key)
+        data = self._data
+        base = row * _STRIDE
+        for slot, value in zip(slots, values[4:]):
+            data[base + slot] = value
+        data[base + _UPDATED] = time.monotonic()
+        if depth_offset:
+            view = memoryview(frame)[depth_offset:depth_offset + DEPTH_LEVELS * _DEPTH_LEVEL.size]
+            base = row * _DEPTH_STRIDE
+            self._depth[base:base + _DEPTH_STRIDE] = array(
+                'd', [value for level in _DEPTH_LEVEL.iter_unpack(view) for value in level])
+
+    def clear(self):
+        """Forgets every instrument."""
+        self._rows.clear()
+        self._keys.clear()
+        del self._data[:]
+        del self._depth[:]
+
+    def ltp(self, exchange_segment, security_id):
+        """Returns the last traded price, or None."""
+        return self.value(exchange_segment, security_id, 'LTP')
+
+    def value(self, exchange_segment, security_id, field):
+        """Returns one field of :data:`FIELDS`, or None."""
+        row = self._row(exchange_segment, security_id)
+        if row is None:
+            return None
+        value = self._data[row * _STRIDE + _SLOT[field]]
+        return None if math.isnan(value) else field_value(field, value)
+
+    def get(self, exchange_segment, security_id):
+        """Returns every received field as a dict, or None for an unknown instrument."""
+        row = self._row(exchange_segment, security_id)
+        if row is None:
+            return None
+        base = row * _STRIDE
+        return {field: field_value(field, value) for field, value in zip(FIELDS, self._data[base:base + _STRIDE])
+                if field != 'updated' and not math.isnan(value)}
+
+    def ohlc(self, exchange_segment, security_id):
+        """Returns open, high, low and close, or None before the first Quote or Full packet."""
+        snapshot = self.get(exchange_segment, security_id)
+        if not snapshot or 'open' not in snapshot:
+            return None
+        return {field: snapshot[field] for field in ('open', 'high', 'low', 'close')}
+
+    def oi(self, exchange_segment, security_id):
+        """Returns the open interest, or None."""
+        return self.value(exchange_segment, security_id, 'OI')
+
+    def depth(self, exchange_segment, security_id):
+        """Returns the five depth levels as dicts, or None before the first Depth or Full packet."""
+        row = self._row(exchange_segment, security_id)
+        if row is None:
+            return None
+        base = row * _DEPTH_STRIDE
+        levels = self._depth[base:base + _DEPTH_STRIDE]
+        if math.isnan(levels[0]):
+            return None
+        width = len(DEPTH_FIELDS)
+        return [{field: field_value(field, value) for field, value in zip(DEPTH_FIELDS, levels[i:i + width])}
+                for i in range(0, _DEPTH_STRIDE, width)]
+
+    def age(self, exchange_segment, security_id):
+        """Returns the seconds since the instrument was last updated, or None."""
+        updated = self.value(exchange_segment, security_id, 'updated')
+        return None if updated is None else time.monotonic() - updated
+
+    def ltp_response(self, securities, max_age=None):
+        """Answers a ``dhanhq.ticker_data`` request, or returns None when an instrument is missing or stale."""
+        return self._response(securities, max_age, self._ltp)
+
+    def quote_response(self, securities, max_age=None):
+        """Answers a ``dhanhq.quote_data`` request, or returns None when an instrument is missing or stale."""
+        return self._response(securities, max_age, self._quote)
+
+    def _response(self, securities, max_age, render):
+        """Builds the ``{"status", "remarks", "data"}`` dict the REST client returns for ``securities``."""
+        data = {}
+        for exchange_segment, security_ids in securities.items():
+            segment = data.setdefault(exchange_segment, {})
+            for security_id in security_ids:
+                key = (exchange_segment, security_id)
+                age = self.age(*key)
+                if age is None or (max_age is not None and age > max_age):
+                    return None
+                rendered = render(key)
+                if rendered is None:
+                    return None
+                segment[str(security_id)] = rendered
+        return {
+            "status": "success",
+            "remarks": "",
+            "data": {"data": data, "status": "success"},
+        }
+
+    def _ltp(self, key):
+        ltp = self.ltp(*key)
+        return None if ltp is None else {"last_price": ltp}
+
+    def _quote(self, key):
+        snapshot = self.get(*key)
+        if 'open' not in snapshot:
+            return None
+        quote = {
+            "last_price": snapshot["LTP"],
+            "last_quantity": snapshot["LTQ"],
+            "last_trade_time": datetime.utcfromtimestamp(snapshot["LTT"]).strftime('%d/%m/%Y %H:%M:%S'),
+            "average_price": snapshot["avg_price"],
+            "volume": snapshot["volume"],
+            "buy_quantity": snapshot["total_buy_quantity"],
+            "sell_quantity": snapshot["total_sell_quantity"],
+            "net_change": snapshot["LTP"] - snapshot["close"],
+            "ohlc": {field: snapshot[field] for field in ('open', 'close', 'high', 'low')},
+        }
+        for field in ('OI', 'oi_day_high', 'oi_day_low'):
+            if field in snapshot:
+                quote[field.lower()] = snapshot[field]
+        depth = self.depth(*key)
+        if depth is not None:
+            quote["depth"] = {
+                "buy": [{"quantity": level["bid_quantity"], "orders": level["bid_orders"],
+                         "price": level["bid_price"]} for level in depth],
+                "sell": [{"quantity": level["ask_quantity"], "orders": level["ask_orders"],
+                          "price": level["ask_price"]} for level in depth],
+            }
+        return quote
+
+    def _row(self, exchange_segment, security_id):
+        exchange_segment = SEGMENT_CODES.get(exchange_segment, exchange_segment)
+        try:
+            return self._rows.get((int(exchange_segment), int(security_id)))
+        except (TypeError, ValueError):
+            return None
+
+    def _add(self, key):
+        row = self._rows[key] = len(self._keys)
+        self._keys.append(key)
+        self._data.extend(_EMPTY_ROW)
+        self._depth.extend(_EMPTY_DEPTH)
+        return row
@@ -0,0 +1,143 @@
+"""
+    Subscription state of a market feed connection.
+
+    :class:`SubscriptionManager` remembers which instruments the server has been sent per request code, compares
+    that with the instruments the feed wants, and sends only the difference: unsubscriptions first, then
+    subscriptions, in packets of up to 100 instruments. Changes made in a burst are coalesced into one flush,
+    flushes run one at a time in call order, and an instrument only counts as live once its packet was sent.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+
+import websockets
+
+"""Instruments carried by one subscription packet or message"""
+BATCH_SIZE = 100
+
+"""Request codes each feed version accepts for subscription"""
+REQUEST_CODES = {
+    'v1': (15, 17, 19),
+    'v2': (15, 17, 21),
+}
+
+
+def normalize(symbols, version):
+    """Returns ``(exchange_segment, security_id, request_code)`` tuples, defaulting to Ticker (15) like the feed.
+
+    Raises:
+        ValueError: For a request code the feed version does not accept.
+    """
+    instruments = []
+    for symbol in symbols:
+        if len(symbol) == 2:
+            symbol = (symbol[0], symbol[1], 15)
+        if symbol[2] not in REQUEST_CODES[version]:
+            if version == 'v1':
+                raise ValueError("Invalid request mode for v1. Only Ticker, Quote, and Depth packet are allowed.")
+            raise ValueError("Invalid request mode for v2. Only Ticker, Quote, and Full packet are allowed.")
+        instruments.append((symbol[0], symbol[1], symbol[2]))
+    return instruments
+
+
+class SubscriptionManager:
+    """
+    Tracks the live subscription of a :class:`dhanhq.marketfeed.DhanFeed` and sends minimal deltas.
+
+    The desired subscription is the feed's ``instruments`` list. Call :meth:`schedule` after changing it, or
+    await :meth:`flush` to send the delta right away.
+
+    Attributes:
+        live (dict): Request code mapped to the set of ``(exchange_segment, security_id)`` sent to the server.
+        coalesce_delay (float): Seconds :meth:`schedule` waits to gather further changes before flushing.
+        packets_sent (int): Subscription and unsubscription packets sent.
+    """
+
+    def __init__(self, feed, coalesce_delay=0.0):
+        self.feed = feed
+        self.coalesce_delay = coalesce_delay
+        self.live = defaultdict(set)
+        self.packets_sent = 0
+        self._pending = None
+        self._lock = None
+
+    def desired(self):
+        """Returns request code mapped to the instruments the feed wants, in subscription order."""
+        desired = defaultdict(dict)
+        for exchange_segment, security_id, code in normalize(self.feed.instruments, self.feed.version):
+            desired[code][(exchange_segment, security_id)] = None
+        return desired
+
+    def diff(self):
+        """Returns ``(unsubscribe, subscribe)``, each mapping request code to the instruments to send."""
+        desired = self.desired()
+        unsubscribe = {}
+        subscribe = {}
+        for code in sorted(set(desired) | set(self.live)):
+            wanted = desired.get(code, {})
+            live = self.live.get(code, set())
+            removed = [instrument for instrument in live if instrument not in wanted]
+            added = [instrument for instrument in wanted if instrument not in live]
+            if removed:
+                unsubscribe[code] = sorted(removed, key=str)
+            if added:
+                subscribe[code] = added
+        return unsubscribe, subscribe
+
+    def reset(self):
+        """Forgets the live state, e.g. for a new connection that has no subscription yet."""
+        self.live.clear()
+
+    def schedule(self):
+        """Flushes soon, coalescing with changes made before the flush starts; returns the flush task."""
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.ensure_future(self._delayed_flush())
+        return self._pending
+
+    async def _delayed_flush(self):
+        if self.coalesce_delay:
+            await asyncio.sleep(self.coalesce_delay)
+        self._pending = None
+        return await self.flush()
+
+    async def flush(self):
+        """Sends the delta between the desired and live subscription and returns the number of packets sent.
+
+        Instruments whose packet could not be sent stay pending for the next flush.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.feed.ws is None:
+                return 0
+            unsubscribe, subscribe = self.diff()
+            sent = 0
+            try:
+                for code, instruments in unsubscribe.items():
+                    for i in range(0, len(instruments), BATCH_SIZE):
+                        batch = instruments[i:i + BATCH_SIZE]
+                        await self._send(batch, code + 1)
+                        self.live[code].difference_update(batch)
+                        sent += 1
+                for code, instruments in subscribe.items():
+                    for i in range(0, len(instruments), BATCH_SIZE):
+                        batch = instruments[i:i + BATCH_SIZE]
+                        await self._send(batch, code)
+                        self.live[code].update(batch)
+                        sent += 1
+            except websockets.ConnectionClosed as e:
+                logging.warning("Subscription update interrupted: %s", e)
+            return sent
+
+    async def _send(self, batch, request_code):
+        feed = self.feed
+        if feed.version == 'v1':
+            message = feed.create_subscription_packet(batch, request_code)
+        else:
+            message = feed.create_subscription_message(batch, request_code)
+        await feed.ws.send(message)
+        self.packets_sent += 1
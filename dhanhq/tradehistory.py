@@ -0,0 +1,111 @@
+"""
+    Streaming over the pages of the trade history.
+
+    :func:`iter_pages` yields the trades of consecutive ``get_trade_history`` pages as they arrive while the next
+    pages are already being fetched in background threads, and stops at the first empty page. :func:`to_dataframe`
+    and :func:`write_parquet` consume the pages one at a time, so the raw trades of a long history are never held
+    in memory at once. pandas and pyarrow are only imported when those helpers are used.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+"""Pages fetched ahead of the page being consumed"""
+PREFETCH = 2
+
+
+def page_trades(page_number, response):
+    """Returns the trades of a ``get_trade_history`` response, raising RuntimeError for a failed page."""
+    if response.get("status") != "success":
+        raise RuntimeError(f"Trade history page {page_number} failed: {response.get('remarks')}")
+    data = response.get("data")
+    if isinstance(data, dict):
+        data = [data]
+    return data or []
+
+
+def iter_pages(fetch, start_page=0, prefetch=PREFETCH):
+    """
+    Yields the trades of consecutive pages, as a list per page, until a page is empty.
+
+    Args:
+        fetch (callable): ``fetch(page_number)`` returning a ``get_trade_history`` response.
+        start_page (int): First page to fetch.
+        prefetch (int): Pages requested ahead of the one being consumed; 0 fetches one page at a time.
+
+    Raises:
+        RuntimeError: When a page fails; the pages before it have been yielded.
+    """
+    if prefetch < 0:
+        raise ValueError("prefetch must not be negative")
+    if not prefetch:
+        page_number = start_page
+        while True:
+            trades = page_trades(page_number, fetch(page_number))
+            if not trades:
+                return
+            yield trades
+            page_number += 1
+    window = prefetch + 1
+    executor = ThreadPoolExecutor(window, thread_name_prefix="trade-history")
+    pending = deque((page, executor.submit(fetch, page)) for page in range(start_page, start_page + window))
+    try:
+        while True:
+            page_number, future = pending.popleft()
+            trades = page_trades(page_number, future.result())
+            if not trades:
+                return
+            next_page = page_number + window
+            pending.append((next_page, executor.submit(fetch, next_page)))
+            yield trades
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def to_dataframe(pages):
+    """Builds a ``pandas.DataFrame`` from an iterable of pages, converting each page as it arrives."""
+    import pandas as pd
+
+    frames = [pd.DataFrame.from_records(trades) for trades in pages]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_parquet(pages, path, schema=None):
+    """
+    Streams an iterable of pages into a Parquet file, one row group per page.
+
+    Args:
+        pages (iterable): Lists of trade dicts.
+        path (str): File to write.
+        schema (pyarrow.Schema): Schema of the file; inferred from the first page by default. Later pages are
+            converted to it, missing fields becoming null and unknown fields being dropped.
+
+    Returns:
+        int: Trades written. No file is created when there are no trades and no schema.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    rows = 0
+    try:
+        for trades in pages:
+            table = pa.Table.from_pylist(trades, schema=schema)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(table)
+            rows += table.num_rows
+        if writer is None and schema is not None:
+            writer = pq.ParquetWriter(path, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
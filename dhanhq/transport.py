@@ -0,0 +1,252 @@
+"""
+    HTTP transport of the synchronous DhanHQ client.
+
+    :func:`create_session` returns a ``requests.Session`` whose adapter keeps a large pool of persistent
+    connections per host, sets TCP_NODELAY and TCP keep-alive on every socket and resolves host names through a
+    small DNS cache. With a :class:`dhanhq.ratelimit.RateLimiter` every request first waits for a token of its
+    endpoint class. :func:`prewarm_session` opens connections ahead of the first request so it does not pay the
+    TCP and TLS handshakes, and :func:`connection_stats` reports how often pooled connections were reused.
+
+    :copyright: (c) 2024 by Dhan.
+    :license: see LICENSE for details.
+"""
+
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .ratelimit import endpoint_class
+
+"""Default transport settings"""
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 32
+KEEPALIVE_IDLE = 60
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 6
+DNS_TTL = 300
+
+
+def tcp_socket_options(tcp_nodelay=True, keepalive=True, keepalive_idle=KEEPALIVE_IDLE,
+                       keepalive_interval=KEEPALIVE_INTERVAL, keepalive_count=KEEPALIVE_COUNT):
+    """Returns the ``setsockopt`` arguments applied to every new connection."""
+    options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if tcp_nodelay else 0)]
+    if keepalive:
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        for name, value in (('TCP_KEEPIDLE', keepalive_idle), ('TCP_KEEPINTVL', keepalive_interval),
+                            ('TCP_KEEPCNT', keepalive_count)):
+            if hasattr(socket, name):
+                options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class DNSCache:
+    """
+    Host name to address cache shared by the connections of one session.
+
+    Attributes:
+        ttl (float): Seconds an address is reused; 0 resolves on every connection.
+        family (int): ``socket.AF_INET`` to resolve IPv4 addresses only, ``socket.AF_UNSPEC`` for any.
+    """
+
+    def __init__(self, ttl=DNS_TTL, family=socket.AF_INET):
+        self.ttl = ttl
+        self.family = family
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        """Returns the address to connect to for ``host``."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+        infos = socket.getaddrinfo(host, port, self.family, socket.SOCK_STREAM)
+        address = infos[0][4][0]
+        with self._lock:
+            self.misses += 1
+            if self.ttl:
+                self._entries[(host, port)] = (address, now + self.ttl)
+        return address
+
+    def invalidate(self, host, port):
+        """Forgets the address of a host, e.g. after connecting to it failed."""
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+class _ResolvingConnectionMixin:
+    """Connects to the address cached by ``dns_cache``; TLS still verifies and sends the host name."""
+
+    dns_cache = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            self._dns_host = self.dns_cache.resolve(host, self.port)
+        except OSError:
+            self._dns_host = host
+        try:
+            return super()._new_conn()
+        except Exception:
+            self.dns_cache.invalidate(host, self.port)
+            raise
+        finally:
+            self._dns_host = host
+
+
+class TunedHTTPAdapter(HTTPAdapter):
+    """
+    ``HTTPAdapter`` with socket options and a DNS cache applied to every connection it opens.
+
+    Attributes:
+        dns_cache (DNSCache): Cache used to resolve host names.
+        rate_limiter (RateLimiter): Limiter every request is scheduled through, or None.
+        retry_policy (RetryPolicy): Policy retrying safe requests, or None.
+    """
+
+    def __init__(self, socket_options=None, dns_cache=None, rate_limiter=None, retry_policy=None, **kwargs):
+        self.socket_options = socket_options if socket_options is not None else tcp_socket_options()
+        self.dns_cache = dns_cache or DNSCache()
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        policy = self.retry_policy
+        if policy is None:
+            return self._send(request, **kwargs)
+        return policy.send(lambda prepared: self._send(prepared, **kwargs), request)
+
+    def _send(self, request, **kwargs):
+        limiter = self.rate_limiter
+        if limiter is None:
+            return super().send(request, **kwargs)
+        endpoint = endpoint_class(request.method, request.url)
+        limiter.acquire(endpoint)
+        response = super().send(request, **kwargs)
+        if response.status_code == 429:
+            limiter.throttled(endpoint)
+        return response
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault('socket_options', self.socket_options)
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        attributes = {'dns_cache': self.dns_cache}
+        http = type('CachedHTTPConnection', (_ResolvingConnectionMixin, HTTPConnection), attributes)
+        https = type('CachedHTTPSConnection', (_ResolvingConnectionMixin, HTTPSConnection), attributes)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('CachedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http}),
+            'https': type('CachedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https}),
+        }
+
+    def __setstate__(self, state):
+        self.socket_options = state.pop('socket_options', None) or tcp_socket_options()
+        self.dns_cache = state.pop('dns_cache', None) or DNSCache()
+        self.rate_limiter = state.pop('rate_limiter', None)
+        self.retry_policy = state.pop('retry_policy', None)
+        super().__setstate__(state)
+
+    def stats(self):
+        """Returns connections opened and requests sent through the pools of this adapter."""
+        connections = requests_sent = pools = 0
+        container = self.poolmanager.pools
+        for key in list(container.keys()):
+            pool = container.get(key)
+            if pool is None:
+                continue
+            pools += 1
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+        return {
+            "pools": pools,
+            "connections": connections,
+            "requests": requests_sent,
+            "reused": max(requests_sent - connections, 0),
+            "dns_hits": self.dns_cache.hits,
+            "dns_misses": self.dns_cache.misses,
+        }
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=False, max_retries=0,
+                   tcp_nodelay=True, keepalive=True, keepalive_idle=KEEPALIVE_IDLE,
+                   keepalive_interval=KEEPALIVE_INTERVAL, keepalive_count=KEEPALIVE_COUNT, dns_ttl=DNS_TTL,
+                   ipv4_only=True, verify=True, rate_limiter=None, retry_policy=None):
+    """
+    Creates a session with a :class:`TunedHTTPAdapter` mounted for http and https.
+
+    Args:
+        pool_connections (int): Number of hosts with a connection pool.
+        pool_maxsize (int): Connections kept per host; set it to at least the number of threads sharing the client.
+        pool_block (bool): Wait for a free connection instead of opening one that is not kept.
+        max_retries (int): Retries of failed connections, see ``requests.adapters.HTTPAdapter``.
+        tcp_nodelay (bool): Disable Nagle's algorithm.
+        keepalive (bool): Enable TCP keep-alive probes so idle connections survive NAT and load balancers.
+        keepalive_idle (int): Idle seconds before the first keep-alive probe.
+        keepalive_interval (int): Seconds between keep-alive probes.
+        keepalive_count (int): Unanswered probes after which the connection is dropped.
+        dns_ttl (float): Seconds a resolved address is reused; 0 disables the cache.
+        ipv4_only (bool): Resolve IPv4 addresses only, for networks where IPv6 connections stall.
+        verify (bool): Verify TLS certificates.
+        rate_limiter (RateLimiter): Optional limiter scheduling every request of the session.
+        retry_policy (RetryPolicy): Optional policy retrying failed GET requests with backoff.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    session = requests.Session()
+    session.verify = verify
+    adapter = TunedHTTPAdapter(
+        socket_options=tcp_socket_options(tcp_nodelay, keepalive, keepalive_idle, keepalive_interval,
+                                          keepalive_count),
+        dns_cache=DNSCache(dns_ttl, socket.AF_INET if ipv4_only else socket.AF_UNSPEC),
+        rate_limiter=rate_limiter,
+        retry_policy=retry_policy,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+        max_retries=max_retries,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def prewarm_session(session, url, connections=1, timeout=10):
+    """
+    Opens ``connections`` pooled connections to the host of ``url`` with concurrent HEAD requests, so later
+    requests reuse established TCP and TLS sessions.
+
+    Returns:
+        int: Connections that completed a request.
+    """
+    def head(_):
+        try:
+            session.head(url, timeout=timeout, allow_redirects=False)
+            return 1
+        except requests.RequestException as e:
+            logging.warning("Exception in transport>>prewarm_session: %s", e)
+            return 0
+
+    if connections <= 1:
+        return head(0)
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        return sum(executor.map(head, range(connections)))
+
+
+def connection_stats(session):
+    """Returns :meth:`TunedHTTPAdapter.stats` of the https adapter of a session, or None for another adapter."""
+    adapter = session.get_adapter("https://")
+    if isinstance(adapter, TunedHTTPAdapter):
+        return adapter.stats()
+    return None
@@ -0,0 +1,45 @@
+import asyncio
+import struct
+
+import websockets
+import websockets.protocol
+
+from dhanhq.marketfeed import DhanFeed
+
+
+DEPTH = b"".join(struct.pack('<IIHHff', 100 + i, 200 + i, 3, 4, 99.5 - i, 100.5 + i) for i in range(5))
+TICKER = struct.pack('<BHBIfI', 2, 16, 1, 1333, 1520.25, 1700000000)
+QUOTE = struct.pack('<BHBIfHIfIIIffff', 4, 50, 1, 1333, 1520.25, 10, 1700000000, 1519.5,
+                    100000, 5000, 6000, 1510.0, 1505.0, 1525.0, 1500.0)
+FULL = struct.pack('<BHBIfHIfIIIIIIffff', 8, 162, 2, 49081, 210.5, 50, 1700000000, 209.75,
+                   250000, 7000, 8000, 120000, 130000, 110000, 205.0, 200.0, 215.0, 199.0) + DEPTH
+
+
+def make_feed(**kwargs):
+    return DhanFeed('CID', 'TOKEN', [], version='v2', **kwargs)
+
+
+class QueuedWebSocket:
+    """Websocket stub whose ``recv`` blocks until a frame is queued."""
+
+    def __init__(self, frames):
+        self.queue = asyncio.Queue()
+        for frame in frames:
+            self.queue.put_nowait(frame)
+
+    async def recv(self):
+        return await self.queue.get()
+
+
+class ClosingWebSocket(QueuedWebSocket):
+    """Websocket stub raising ConnectionClosed once its frames are consumed."""
+
+    state = websockets.protocol.State.CLOSED
+
+    async def recv(self):
+        if self.queue.empty():
+            raise websockets.ConnectionClosed(None, None)
+        return self.queue.get_nowait()
+
+    async def close(self):
+        pass
@@ -9,8 +9,8 @@ class DummyResponse:
         self._data = data
         self.status = status
 
-    async def json(self, content_type=None):
-        return self._data
+    async def json(self, content_type=None, loads=json.loads):
+        return loads(json.dumps(self._data))
 
 
 class DummySession:
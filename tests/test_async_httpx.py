@@ -12,6 +12,10 @@ class DummyResponse:
     def json(self):
         return self._data
 
+    @property
+    def content(self):
+        return json.dumps(self._data).encode()
+
 
 class DummySession:
     def __init__(self, responses):
@@ -55,3 +59,16 @@ async def test_async_httpx_get_positions():
     resp = await api.get_positions()
     assert resp["data"] == {"positions": []}
     assert session.calls[0][0] == "GET"
+
+
+@pytest.mark.asyncio
+async def test_async_httpx_rate_limiter():
+    from dhanhq.ratelimit import RateLimiter, ORDER, NON_TRADING
+    limiter = RateLimiter()
+    session = DummySession([{"positions": []}, {"orderId": "1"}])
+    api = AsyncDhanHQ("CID", "TOKEN", session=session, rate_limiter=limiter)
+    await api.get_positions()
+    await api.place_order(security_id="1", exchange_segment=api.NSE, transaction_type=api.BUY, quantity=1,
+                          order_type=api.MARKET, product_type=api.INTRA, price=0)
+    stats = limiter.stats()
+    assert stats[NON_TRADING]["requests"] == 1 and stats[ORDER]["requests"] == 1
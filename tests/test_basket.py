@@ -0,0 +1,155 @@
+import json
+import threading
+
+import pytest
+import responses
+
+from dhanhq.dhanhq import dhanhq
+from dhanhq.async_httpx import AsyncDhanHQ
+from dhanhq.basket import prepare_legs, CORRELATION_ID_LENGTH
+
+
+def leg(security_id, side="BUY", **extra):
+    return dict(security_id=security_id, exchange_segment="NSE_FNO", transaction_type=side, quantity=50,
+                order_type="MARKET", product_type="INTRADAY", price=0, **extra)
+
+
+def test_prepare_legs_assigns_unique_correlation_ids():
+    legs = prepare_legs([leg("1"), leg("2", tag="mine"), leg("3")], tag_prefix="straddle-20240105-nifty")
+    tags = [item["tag"] for item in legs]
+    assert tags[1] == "mine" and len(set(tags)) == 3
+    assert all(len(tag) <= CORRELATION_ID_LENGTH for tag in tags)
+    random_tags = [item["tag"] for item in prepare_legs([leg("1"), leg("2")])]
+    assert random_tags[0] != random_tags[1] and random_tags[0][:8] == random_tags[1][:8]
+    with pytest.raises(ValueError):
+        prepare_legs([])
+
+
+@responses.activate
+def test_sync_basket_places_legs_concurrently():
+    api = dhanhq("CID", "TOKEN")
+    barrier = threading.Barrier(2, timeout=5)
+
+    def callback(request):
+        barrier.wait()  # both legs are in flight at the same time
+        body = json.loads(request.body)
+        return 200, {}, json.dumps({"orderId": body["securityId"] + "0", "orderStatus": "TRANSIT"})
+
+    responses.add_callback(responses.POST, api.base_url + "/orders", callback=callback)
+    result = api.place_basket_order([leg("1"), leg("2", "SELL")], tag_prefix="b1")
+
+    assert result["status"] == "success"
+    legs = result["data"]["legs"]
+    assert [item["orderId"] for item in legs] == ["10", "20"]
+    assert [item["correlationId"] for item in legs] == ["b1-0", "b1-1"]
+    sent = [json.loads(call.request.body)["correlationId"] for call in responses.calls]
+    assert sorted(sent) == ["b1-0", "b1-1"]
+    assert result["data"]["rollback"] is None
+
+
+@responses.activate
+def test_sync_basket_reverses_filled_legs_when_a_leg_is_rejected():
+    api = dhanhq("CID", "TOKEN")
+
+    def callback(request):
+        body = json.loads(request.body)
+        if body["securityId"] == "2":
+            return 400, {}, json.dumps({"errorType": "Order_Error", "errorCode": "DH-906", "errorMessage": "rejected"})
+        return 200, {}, json.dumps({"orderId": body["securityId"] + "0", "orderStatus": "TRANSIT"})
+
+    responses.add_callback(responses.POST, api.base_url + "/orders", callback=callback)
+    responses.add(responses.DELETE, api.base_url + "/orders/10", json={"errorCode": "DH-906"}, status=400)
+    responses.add(responses.GET, api.base_url + "/orders/10", json=[{"orderId": "10", "filledQty": 50}])
+    result = api.place_basket_order([leg("1"), leg("2")], rollback="reverse")
+
+    assert result["status"] == "failure" and result["remarks"] == "1 of 2 legs failed"
+    assert result["data"]["legs"][1]["orderId"] is None
+    (action,) = result["data"]["rollback"]
+    assert action["orderId"] == "10" and action["cancel"]["status"] == "failure"
+    reverse = [json.loads(call.request.body) for call in responses.calls
+               if call.request.method == "POST" and json.loads(call.request.body)["transactionType"] == "SELL"]
+    assert len(reverse) == 1 and reverse[0]["securityId"] == "1" and reverse[0]["quantity"] == 50
+    assert reverse[0]["orderType"] == "MARKET"
+
+
+def test_sync_basket_rejects_unknown_rollback():
+    api = dhanhq("CID", "TOKEN")
+    assert api.place_basket_order([leg("1")], rollback="undo")["status"] == "failure"
+
+
+def test_paper_basket_reverses_without_api_calls():
+    api = dhanhq("CID", "TOKEN", paper_trading=True)
+    api.place_order = lambda **kwargs: (
+        {"status": "failure", "remarks": "rejected", "data": ""} if kwargs["security_id"] == "2"
+        else dhanhq.place_order(api, **kwargs))
+    result = api.place_basket_order([leg("1"), leg("2")], rollback="reverse")
+    assert result["data"]["rollback"][0]["reverse"]["status"] == "success"
+    assert api._paper_positions["1"]["quantity"] == 0
+
+
+class FakeResponse:
+    def __init__(self, data, status=200):
+        self._data = data
+        self.status_code = status
+
+    def json(self):
+        return self._data
+
+    @property
+    def content(self):
+        return json.dumps(self._data).encode()
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    async def post(self, url, **kwargs):
+        body = json.loads(kwargs["data"])
+        self.calls.append(("POST", body))
+        if body["securityId"] == "2":
+            return FakeResponse({"errorType": "Order_Error", "errorMessage": "rejected"}, 400)
+        return FakeResponse({"orderId": body["securityId"] + "0"})
+
+    async def delete(self, url, **kwargs):
+        self.calls.append(("DELETE", url))
+        return FakeResponse({"orderId": url.rsplit("/", 1)[1], "orderStatus": "CANCELLED"})
+
+    async def get(self, url, **kwargs):
+        self.calls.append(("GET", url))
+        return FakeResponse({"orderId": url.rsplit("/", 1)[1], "filledQty": 0})
+
+
+@pytest.mark.asyncio
+async def test_async_basket_cancels_accepted_legs():
+    session = FakeSession()
+    api = AsyncDhanHQ("CID", "TOKEN", session=session)
+    result = await api.place_basket_order([leg("1"), leg("2"), leg("3")], rollback="cancel")
+
+    assert result["status"] == "failure"
+    assert [item["orderId"] for item in result["data"]["legs"]] == ["10", None, "30"]
+    assert sorted(action["orderId"] for action in result["data"]["rollback"]) == ["10", "30"]
+    deletes = sorted(url for method, url in session.calls if method == "DELETE")
+    assert deletes == [api.base_url + "/orders/10", api.base_url + "/orders/30"]
+    assert not any(method == "GET" for method, _ in session.calls)
+
+
+@responses.activate
+def test_sync_basket_rolls_back_when_a_leg_is_rejected_by_risk_checks():
+    api = dhanhq("CID", "TOKEN")
+
+    def callback(request):
+        body = json.loads(request.body)
+        status = "REJECTED" if body["securityId"] == "2" else "TRANSIT"
+        return 200, {}, json.dumps({"orderId": body["securityId"] + "0", "orderStatus": status})
+
+    responses.add_callback(responses.POST, api.base_url + "/orders", callback=callback)
+    responses.add(responses.DELETE, api.base_url + "/orders/10", json={"orderId": "10", "orderStatus": "CANCELLED"})
+    responses.add(responses.GET, api.base_url + "/orders/10", json=[{"orderId": "10", "filledQty": 0}])
+    result = api.place_basket_order([leg("1"), leg("2")], rollback="reverse")
+
+    assert result["status"] == "failure" and result["remarks"] == "1 of 2 legs failed"
+    rejected = result["data"]["legs"][1]
+    assert rejected["orderId"] == "20" and rejected["rejected"]
+    assert [action["orderId"] for action in result["data"]["rollback"]] == ["10"]
+    assert not any(call.request.method == "DELETE" and call.request.url.endswith("/20") for call in responses.calls)
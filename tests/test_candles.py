@@ -0,0 +1,107 @@
+import asyncio
+import struct
+import time
+
+import pytest
+
+from dhanhq.candles import CandleAggregator, IST_OFFSET
+
+
+def ticker(security_id, ltp, ltt):
+    return struct.pack('<BHBIfI', 2, 16, 1, security_id, ltp, ltt)
+
+
+def quote(security_id, ltp, ltt, volume):
+    return struct.pack('<BHBIfHIfIIIffff', 4, 50, 1, security_id, ltp, 10, ltt, ltp, volume, 0, 0,
+                       ltp, ltp, ltp, ltp)
+
+
+def test_builds_bars_and_emits_on_boundaries():
+    candles = CandleAggregator(intervals=(60, 300))
+    closed = []
+    candles.add_callback(closed.append, 60)
+    candles.update(quote(1333, 100.0, 1200, 1000))
+    candles.update(ticker(1333, 105.0, 1210))
+    candles.update(quote(1333, 98.0, 1230, 1500))
+    candles.update(ticker(1333, 99.0, 1170))
+    assert closed == []
+    candles.update(ticker(1333, 101.0, 1260))
+    assert closed == [{"exchange_segment": 1, "security_id": 1333, "interval": 60, "start": 1200,
+                       "open": 100.0, "high": 105.0, "low": 98.0, "close": 98.0, "volume": 500.0}]
+    assert candles.current(1, 1333, 300)["high"] == 105.0
+    assert candles.current("NSE_EQ", "1333", 60)["open"] == 101.0
+    assert candles.bars(1, 1333, 60) == closed
+
+
+def test_close_due_closes_quiet_instruments_and_keeps_history():
+    candles = CandleAggregator(intervals=(60,), history=2)
+    closed = []
+    candles.add_callback(closed.append)
+    for minute in range(4):
+        candles.update(ticker(7, 10.0 + minute, 60 * minute))
+    assert candles.close_due(now=240) == 1
+    assert candles.current(1, 7, 60) is None
+    assert len(closed) == 4
+    assert [bar["close"] for bar in candles.bars(1, 7, 60)] == [12.0, 13.0]
+
+
+def test_late_tick_of_a_closed_bar_is_dropped():
+    candles = CandleAggregator(intervals=(60,))
+    closed = []
+    candles.add_callback(closed.append)
+    candles.update(ticker(7, 10.0, 6010))
+    assert candles.close_due(now=6061) == 1
+    candles.update(ticker(7, 11.0, 6059))
+    assert candles.current(1, 7, 60) is None
+    candles.update(ticker(7, 12.0, 6065))
+    candles.update(ticker(7, 13.0, 6125))
+    assert [(bar["start"], bar["close"]) for bar in closed] == [(6000, 10.0), (6060, 12.0)]
+
+
+class MinuteClient:
+    def __init__(self):
+        self.calls = []
+
+    def intraday_minute_data(self, security_id, exchange_segment, instrument_type, from_date, to_date):
+        self.calls.append((security_id, exchange_segment, instrument_type))
+        if security_id == "2":
+            return {"status": "failure", "remarks": "no data", "data": ""}
+        start = 1717384500 - IST_OFFSET
+        return {"status": "success", "remarks": "", "data": {
+            "timestamp": [start, start + 60, start + 120],
+            "open": [10, 11, 12], "high": [11, 13, 12.5], "low": [9, 10.5, 11], "close": [11, 12, 12],
+            "volume": [100, 200, 300]}}
+
+
+def test_seed_from_intraday_minute_data():
+    candles = CandleAggregator(intervals=(60, 300))
+    closed = []
+    candles.add_callback(closed.append)
+    client = MinuteClient()
+    failed = candles.seed(client, [(1, 1333, "EQUITY"), ("NSE_EQ", 2, "EQUITY")], "2024-06-03", "2024-06-03")
+    assert failed == [("NSE_EQ", 2, "EQUITY")]
+    assert client.calls[0] == ("1333", "NSE_EQ", "EQUITY")
+    assert closed == []
+    assert [bar["close"] for bar in candles.bars(1, 1333, 60)] == [11, 12]
+    bar = candles.current(1, 1333, 300)
+    assert (bar["start"], bar["high"], bar["low"], bar["volume"]) == (1717384500, 13, 9, 600)
+
+
+@pytest.mark.asyncio
+async def test_timer_closes_quiet_bars_at_the_boundary():
+    candles = CandleAggregator(intervals=(1,))
+    closed = []
+    candles.add_callback(closed.append)
+    started = int(time.time()) + IST_OFFSET
+    candles.update(ticker(7, 10.0, started))
+    timer = candles.start_timer(grace=0.05)
+    try:
+        for _ in range(40):
+            if closed:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        candles.stop_timer()
+    assert [bar["start"] for bar in closed] == [started]
+    await asyncio.sleep(0)
+    assert timer.cancelled()
@@ -0,0 +1,85 @@
+import asyncio
+import struct
+import threading
+
+import pytest
+
+from dhanhq.decodepool import DecodePool
+from dhanhq.feedmetrics import FeedMetrics
+from tests.conftest import ClosingWebSocket, FULL, make_feed
+
+
+def ticker(security_id, ltp):
+    return struct.pack('<BHBIfI', 2, 16, 1, security_id, ltp, 1700000000)
+
+
+def test_pool_keeps_order_per_security_id():
+    batches = []
+    done = threading.Event()
+
+    def on_packets(packets, durations):
+        assert durations is None
+        batches.append(packets)
+        if sum(len(batch) for batch in batches) == 60:
+            done.set()
+
+    pool = DecodePool(workers=3, numeric=True, batch_size=7)
+    pool.start(on_packets)
+    for i in range(20):
+        for security_id in (1, 2, 3):
+            pool.submit(ticker(security_id, float(i)))
+    pool.close()
+    assert done.wait(5)
+    packets = [packet for batch in batches for packet in batch]
+    for security_id in (1, 2, 3):
+        prices = [packet["LTP"] for packet in packets if packet["security_id"] == security_id]
+        assert prices == [float(i) for i in range(20)]
+
+
+@pytest.mark.asyncio
+async def test_feed_decodes_in_workers():
+    feed = make_feed(decode_workers=2, decode_batch_size=4)
+    frames = [ticker(security_id, 10.5) for security_id in range(10)] + [FULL, struct.pack('<BHBIH', 50, 10, 0, 0, 805)]
+    feed.ws = ClosingWebSocket(frames)
+    seen = []
+    feed.add_callback(seen.append)
+    await feed._receive_loop()
+    assert sorted(packet["security_id"] for packet in seen if isinstance(packet, dict)) == list(range(10)) + [49081]
+    assert seen[0]["LTP"] == "10.50"
+    assert feed.on_close
+
+
+def test_decode_workers_exclude_queue():
+    with pytest.raises(ValueError):
+        make_feed(decode_workers=2, queue_size=10)
+
+
+@pytest.mark.asyncio
+async def test_inline_frames_follow_earlier_pooled_packets():
+    metrics = FeedMetrics()
+    feed = make_feed(decode_workers=2, decode_batch_size=4, metrics=metrics)
+    status = struct.pack('<BHBI', 7, 8, 0, 0)
+    feed.ws = ClosingWebSocket([ticker(security_id, 10.5) for security_id in range(10)] + [status, FULL])
+    seen = []
+    feed.add_callback(seen.append)
+    await feed._receive_loop()
+    assert seen.index("Markets Open") == 10
+    assert seen[-1]["type"] == 'Full Data'
+    assert metrics.total_frames == 12
+    assert metrics.decode.count == 12
+
+
+@pytest.mark.asyncio
+async def test_receive_waits_while_too_many_packets_are_pending():
+    feed = make_feed(decode_workers=1, decode_batch_size=1, decode_max_pending=3)
+    feed.ws = ClosingWebSocket([ticker(security_id, 10.5) for security_id in range(20)])
+    pending = []
+
+    async def slow_callback(packet):
+        pending.append(feed._pool_pending)
+        await asyncio.sleep(0.001)
+
+    feed.add_callback(slow_callback)
+    await feed._receive_loop()
+    assert len(pending) == 20
+    assert max(pending) <= 3
@@ -0,0 +1,51 @@
+import struct
+
+import pytest
+
+from dhanhq.depthbook import DepthBook, DepthBooks
+from tests.conftest import DEPTH, FULL, TICKER, make_feed
+
+MARKET_DEPTH = struct.pack('<BHBIf', 3, 112, 2, 49081, 210.5) + DEPTH
+
+
+def test_book_properties():
+    book = DepthBook(2, 49081)
+    book.update(MARKET_DEPTH)
+    assert (book.best_bid, book.best_ask) == (99.5, 100.5)
+    assert (book.best_bid_quantity, book.best_ask_quantity) == (100, 200)
+    assert book.spread == 1.0
+    assert book.mid == 100.0
+    assert (book.total_bid_quantity, book.total_ask_quantity) == (510, 1010)
+    assert book.imbalance == pytest.approx(-500 / 1520)
+    assert book.microprice == pytest.approx((99.5 * 200 + 100.5 * 100) / 300)
+    assert book.level(4) == (104, 204, 3, 4, 95.5, 104.5)
+    assert book.ltp == 210.5
+
+
+def test_book_matches_feed_depth():
+    feed = make_feed(numeric=True)
+    book = DepthBook(2, 49081)
+    book.update(FULL)
+    assert book.levels() == feed.process_data(FULL)["depth"]
+
+
+def test_empty_book():
+    book = DepthBook(1, 1)
+    assert book.imbalance == 0.0
+    assert book.microprice == 0.0
+
+
+def test_books_sink_updates_in_place():
+    feed = make_feed()
+    books = DepthBooks()
+    feed.add_sink(books)
+    feed.process_data(TICKER)
+    assert len(books) == 0
+    feed.process_data(MARKET_DEPTH)
+    book = books["NSE_FNO", "49081"]
+    feed.process_data(FULL)
+    assert books[2, 49081] is book
+    assert book.updates == 2
+    assert (1, 1333) not in books
+    with pytest.raises(KeyError):
+        books[1, 1333]
@@ -0,0 +1,198 @@
+import asyncio
+import queue
+import struct
+import pytest
+import websockets
+
+from dhanhq import feedmanager
+from dhanhq.feedmanager import FeedManager
+from dhanhq.marketfeed import DhanFeed, NSE, Quote, Ticker
+
+
+def ticker_packet(security_id, ltp=100.0):
+    return struct.pack('<BHBIfI', 2, 16, NSE, security_id, ltp, 1700000000)
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = asyncio.Queue()
+        self.sent = []
+        self.closed = False
+        self.state = 1
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def recv(self):
+        frame = await self.frames.get()
+        if frame is None:
+            raise websockets.ConnectionClosed(None, None)
+        return frame
+
+    def drop(self):
+        """Closes the connection from the server side once the queued frames are read."""
+        self.frames.put_nowait(None)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def sockets(monkeypatch):
+    opened = []
+
+    async def fake_connect(url):
+        ws = FakeWebSocket()
+        opened.append(ws)
+        return ws
+
+    monkeypatch.setattr('websockets.connect', fake_connect)
+    return opened
+
+
+def instruments(count, start=1):
+    return [(NSE, str(i), Ticker) for i in range(start, start + count)]
+
+
+def test_assigns_instruments_to_least_loaded_shards():
+    manager = FeedManager('CID', 'TOKEN', instruments(5), shard_size=2)
+    assert [len(shard.instruments) for shard in manager.shards] == [2, 2, 1]
+    manager.subscribe_symbols([(NSE, '10')])
+    assert manager.shard_of((NSE, '10')) == 2
+    with pytest.raises(ValueError):
+        manager.subscribe_symbols(instruments(10, start=100))
+
+
+def test_unsubscribe_rebalances_into_fewer_shards():
+    manager = FeedManager('CID', 'TOKEN', instruments(6), shard_size=3)
+    manager.unsubscribe_symbols([(NSE, '1', Ticker), (NSE, '2', Ticker), (NSE, '4', Ticker)])
+    sizes = sorted(len(shard.instruments) for shard in manager.shards)
+    assert sizes == [0, 3]
+    assert sorted(manager.instruments) == sorted([(NSE, '3', Ticker), (NSE, '5', Ticker), (NSE, '6', Ticker)])
+
+
+@pytest.mark.asyncio
+async def test_merges_ticks_of_every_shard(sockets):
+    manager = FeedManager('CID', 'TOKEN', instruments(4), shard_size=2)
+    await manager.connect()
+    assert len(sockets) == 2
+    sockets[0].frames.put_nowait(ticker_packet(1))
+    sockets[1].frames.put_nowait(ticker_packet(3))
+    ids = {(await manager.get_instrument_data())["security_id"] for _ in range(2)}
+    assert ids == {1, 3}
+
+    manager.subscribe_symbols([(NSE, '9', Quote)])
+    await asyncio.sleep(0)
+    assert len(sockets) == 3
+    await manager.disconnect()
+    assert all(ws.closed for ws in sockets)
+
+
+@pytest.mark.asyncio
+async def test_shard_main_applies_commands(sockets, monkeypatch):
+    ticks = queue.Queue()
+    commands = queue.Queue()
+    task = asyncio.ensure_future(feedmanager._shard_main('CID', 'TOKEN', instruments(1), 'v2', True, ticks, commands))
+    while not sockets:
+        await asyncio.sleep(0.01)
+    sockets[0].frames.put_nowait(ticker_packet(1, 250.5))
+    while ticks.empty():
+        await asyncio.sleep(0.01)
+    assert ticks.get()["LTP"] == 250.5
+    subscribed = []
+    monkeypatch.setattr(DhanFeed, 'subscribe_symbols', lambda self, symbols: subscribed.append(symbols))
+    commands.put(("subscribe_symbols", [(NSE, '2', Ticker)]))
+    commands.put(("close", None))
+    await asyncio.wait_for(task, 5)
+    assert subscribed == [[(NSE, '2', Ticker)]]
+    assert sockets[0].closed
+
+
+@pytest.mark.asyncio
+async def test_shard_process_exits_when_its_connection_closes(sockets):
+    coroutine = feedmanager._shard_main('CID', 'TOKEN', instruments(1), 'v2', True, queue.Queue(), queue.Queue())
+    # asyncio.run waits for the executor thread polling commands, as the shard process does before exiting
+    finished = asyncio.get_running_loop().run_in_executor(None, asyncio.run, coroutine)
+    while not sockets:
+        await asyncio.sleep(0.01)
+    sockets[0].drop()
+    assert await asyncio.wait_for(finished, 5) is False
+
+
+async def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+@pytest.mark.asyncio
+async def test_dead_shard_is_restarted(sockets):
+    manager = FeedManager('CID', 'TOKEN', instruments(2), shard_size=2, restart_delay=0.01)
+    await manager.connect()
+    sockets[0].drop()
+    await wait_for(lambda: len(sockets) == 2 and manager.shards[0].running)
+    assert manager.shard_status() == [
+        {"index": 0, "instruments": 2, "running": True, "restarts": 1, "failed": False}]
+    sockets[1].frames.put_nowait(ticker_packet(2))
+    assert (await manager.get_instrument_data())["security_id"] == 2
+    await manager.disconnect()
+    assert manager.shard_status()[0]["running"] is False
+
+
+@pytest.mark.asyncio
+async def test_shard_disconnected_by_the_server_is_reported_not_restarted(sockets):
+    manager = FeedManager('CID', 'TOKEN', instruments(2), shard_size=2, restart_delay=0.01)
+    await manager.connect()
+    sockets[0].frames.put_nowait(struct.pack('<BHBIH', 50, 10, 0, 0, 805))
+    sockets[0].drop()
+    await wait_for(lambda: manager.shard_status()[0]["failed"])
+    await asyncio.sleep(0.05)
+    assert len(sockets) == 1 and not manager.shards[0].running
+    await manager.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_rebalance_does_not_move_instruments_onto_a_stopped_shard(sockets):
+    manager = FeedManager('CID', 'TOKEN', instruments(4), shard_size=2)
+    await manager.connect()
+    sockets[1].frames.put_nowait(struct.pack('<BHBIH', 50, 10, 0, 0, 805))
+    sockets[1].drop()
+    await wait_for(lambda: manager.shard_status()[1]["failed"])
+    manager.unsubscribe_symbols([(NSE, '1', Ticker), (NSE, '3', Ticker)])
+    assert manager.shard_of((NSE, '2', Ticker)) == 0
+    assert manager.shard_of((NSE, '4', Ticker)) == 0
+    assert (NSE, '4', Ticker) in manager.shards[0].feed.instruments
+    assert not manager.shards[1].instruments
+    await manager.disconnect()
+
+
+class ExitedProcess:
+    def __init__(self, exitcode):
+        self.exitcode = exitcode
+
+    def join(self, timeout=None):
+        pass
+
+    def is_alive(self):
+        return False
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("exitcode, restarted", [(0, True), (feedmanager.SHARD_FATAL_EXIT, False)])
+async def test_dead_shard_process_is_noticed(monkeypatch, exitcode, restarted):
+    manager = FeedManager('CID', 'TOKEN', instruments(1), processes=True, restart_delay=0.01)
+    manager._running = True
+    shard = manager.shards[0]
+    shard.process, shard.commands = ExitedProcess(exitcode), queue.Queue()
+    started = []
+
+    async def fake_start(target):
+        started.append(target)
+        target.process = ExitedProcess(None)
+
+    monkeypatch.setattr(manager, '_start_shard', fake_start)
+    await manager._watch_shard(shard, shard.process, None)
+    assert started == ([shard] if restarted else [])
+    assert shard.failed is not restarted
@@ -0,0 +1,73 @@
+import asyncio
+import struct
+import time
+import urllib.request
+
+import pytest
+
+from dhanhq.feedmetrics import FeedMetrics, Histogram, prometheus_text, start_http_server
+from dhanhq.marketfeed import IST_OFFSET
+from tests.conftest import TICKER, QUOTE, FULL, ClosingWebSocket, make_feed
+
+
+def test_feed_records_counts_decode_time_and_lag():
+    metrics = FeedMetrics()
+    feed = make_feed(metrics=metrics, queue_size=10)
+    for frame in (TICKER, TICKER, QUOTE, FULL, bytes([5]) + bytes(11)):
+        feed.process_data(frame)
+    assert metrics.frames == {'Ticker Data': 2, 'Quote Data': 1, 'Full Data': 1, 'OI Data': 1}
+    assert metrics.decode.count == 5
+    assert metrics.lag.count == 4
+    assert metrics.lag.quantile(0.5) == float('inf')
+    snapshot = metrics.snapshot()
+    assert snapshot["total_frames"] == 5
+    assert snapshot["queues"][0]["depth"] == 0
+
+
+def test_histogram_buckets():
+    histogram = Histogram((1, 2))
+    for value in (0.5, 1, 1.5, 3):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(1, 2), (2, 3), (float('inf'), 4)]
+    assert histogram.quantile(0.5) == 1
+
+
+def test_frames_per_second():
+    metrics = FeedMetrics()
+    metrics._second = int(time.time()) - 1
+    metrics._second_frames = 42
+    assert metrics.frames_per_second() == 42
+
+
+def test_prometheus_export():
+    metrics = FeedMetrics()
+    feed = make_feed(metrics=metrics)
+    feed.process_data(TICKER)
+    text = prometheus_text(metrics)
+    assert 'dhan_feed_frames_total{type="Ticker Data"} 1' in text
+    assert 'dhan_feed_decode_seconds_bucket{le="+Inf"} 1' in text
+    assert 'dhan_feed_reconnects_total 0' in text
+    server = start_http_server(metrics, port=0, address='127.0.0.1')
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        assert urllib.request.urlopen(url).read().decode() == text
+    finally:
+        server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_lag_is_taken_on_receipt_not_after_the_queue():
+    metrics = FeedMetrics(lag_buckets=(1.0, 2.0))
+    feed = make_feed(metrics=metrics, queue_size=10)
+    now = int(time.time()) + IST_OFFSET
+    frames = [struct.pack('<BHBIfI', 2, 16, 1, security_id, 10.0, now) for security_id in range(4)]
+
+    async def slow_callback(packet):
+        await asyncio.sleep(0.4)
+
+    feed.add_callback(slow_callback)
+    feed.ws = ClosingWebSocket(frames)
+    await feed._receive_loop()
+    assert metrics.frames == {'Ticker Data': 4}
+    assert metrics.decode.count == 4
+    assert metrics.lag.quantile(1.0) == 1.0
@@ -0,0 +1,76 @@
+import asyncio
+import struct
+import pytest
+
+from dhanhq.feedqueue import FeedQueue, BLOCK, DROP_OLDEST, CONFLATE
+from dhanhq.marketfeed import DhanFeed
+
+
+def ticker(security_id, ltp):
+    return struct.pack('<BHBIfI', 2, 16, 1, security_id, ltp, 1700000000)
+
+
+def oi(security_id, value):
+    return struct.pack('<BHBII', 5, 12, 2, security_id, value)
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy():
+    queue = FeedQueue(2, DROP_OLDEST)
+    for i in range(4):
+        await queue.put(ticker(i, 1.0))
+    assert queue.depth == 2
+    assert queue.dropped == 2
+    assert [struct.unpack_from('<I', queue.get_nowait(), 4)[0] for _ in range(2)] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_conflate_keeps_newest_per_instrument_in_place():
+    queue = FeedQueue(10, CONFLATE)
+    await queue.put(ticker(1, 10.0))
+    await queue.put(oi(1, 5))
+    await queue.put(ticker(2, 20.0))
+    await queue.put(ticker(1, 11.0))
+    await queue.put(oi(1, 6))
+    assert queue.depth == 4
+    assert queue.conflated == 1
+    frames = [queue.get_nowait() for _ in range(4)]
+    assert frames == [ticker(1, 11.0), oi(1, 5), ticker(2, 20.0), oi(1, 6)]
+    assert queue.stats()["high_watermark"] == 4
+
+
+@pytest.mark.asyncio
+async def test_block_policy_waits_for_space():
+    queue = FeedQueue(1, BLOCK)
+    await queue.put(ticker(1, 1.0))
+    blocked = asyncio.ensure_future(queue.put(ticker(2, 2.0)))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+    assert await queue.get() == ticker(1, 1.0)
+    await blocked
+    assert queue.depth == 1 and queue.dropped == 0
+    queue.close()
+    assert await queue.get() == ticker(2, 2.0)
+    assert await queue.get() is None
+
+
+@pytest.mark.asyncio
+async def test_feed_decodes_through_conflating_queue():
+    import websockets
+
+    class WebSocket:
+        def __init__(self, frames):
+            self.frames = list(frames)
+
+        async def recv(self):
+            if not self.frames:
+                raise websockets.ConnectionClosed(None, None)
+            return self.frames.pop(0)
+
+    feed = DhanFeed('CID', 'TOKEN', [], version='v2', numeric=True, queue_size=10, queue_policy=CONFLATE)
+    feed.ws = WebSocket([ticker(1, 10.0), ticker(1, 10.5), ticker(1, 11.0), ticker(2, 20.0)])
+    received = []
+    feed.add_callback(received.append)
+    await feed._receive_loop()
+    assert [(p["security_id"], p["LTP"]) for p in received] == [(1, 11.0), (2, 20.0)]
+    assert feed.queue.conflated == 2
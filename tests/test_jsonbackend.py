@@ -0,0 +1,66 @@
+import json
+
+import pytest
+import responses
+
+from dhanhq import jsonbackend
+from dhanhq.dhanhq import dhanhq
+from dhanhq.jsonbackend import LazyResponse
+
+
+@pytest.fixture
+def restore_backend():
+    name = jsonbackend.backend()
+    yield
+    jsonbackend.set_backend(name)
+
+
+@pytest.mark.parametrize("name", ["orjson", "ujson", "json"])
+def test_backends_round_trip_like_the_standard_library(name, restore_backend):
+    try:
+        jsonbackend.set_backend(name)
+    except ValueError:
+        pytest.skip(f"{name} is not installed")
+    payload = {"orderId": "1", "price": 101.05, "quantity": 50, "nested": [{"a": None, "b": True}],
+               "big": 2 ** 70, "text": "₹"}
+    encoded = jsonbackend.dumps(payload)
+    assert isinstance(encoded, str)
+    assert json.loads(encoded) == payload
+    assert jsonbackend.loads(json.dumps(payload).encode()) == payload
+    assert jsonbackend.loads(json.dumps(payload)) == payload
+
+
+def test_unknown_backend(restore_backend):
+    with pytest.raises(ValueError):
+        jsonbackend.set_backend("simplejson2")
+    assert jsonbackend.set_backend() == jsonbackend.backend()
+
+
+def test_lazy_response_decodes_on_first_data_access():
+    response = LazyResponse(200, b'[{"orderId": "1"}]')
+    assert response["status"] == "success"
+    assert response._decoded is None
+    assert response.get("data") == [{"orderId": "1"}]
+    assert dict(response) == {"status": "success", "remarks": "", "data": [{"orderId": "1"}]}
+    assert response == {"status": "success", "remarks": "", "data": [{"orderId": "1"}]}
+    with pytest.raises(KeyError):
+        response["other"]
+
+
+def test_lazy_response_errors():
+    error = LazyResponse(400, b'{"errorType": "Input_Exception", "errorCode": "DH-905", "errorMessage": "bad"}')
+    assert error["status"] == "failure"
+    assert error["remarks"] == {"error_code": "DH-905", "error_type": "Input_Exception", "error_message": "bad"}
+    broken = LazyResponse(200, b"<html>")
+    assert broken["data"] == "" and broken["remarks"]
+
+
+@responses.activate
+def test_client_returns_lazy_responses_when_enabled():
+    api = dhanhq("CID", "TOKEN", lazy_responses=True)
+    responses.add(responses.GET, api.base_url + "/orders", json=[{"orderId": "1"}])
+    response = api.get_order_list()
+    assert isinstance(response, LazyResponse)
+    assert response["status"] == "success" and response["data"][0]["orderId"] == "1"
+    eager = dhanhq("CID", "TOKEN").get_order_list()
+    assert isinstance(eager, dict) and eager == response
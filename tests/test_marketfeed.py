@@ -0,0 +1,284 @@
+import json
+import asyncio
+import pytest
+import struct
+from dhanhq.marketfeed import NSE
+from tests.conftest import DEPTH, TICKER, QUOTE, FULL, QueuedWebSocket, ClosingWebSocket, make_feed
+
+
+def test_process_ticker():
+    feed = make_feed()
+    assert feed.process_data(TICKER) == {
+        "type": 'Ticker Data',
+        "exchange_segment": 1,
+        "security_id": 1333,
+        "LTP": "1520.25",
+        "LTT": "22:13:20",
+    }
+
+
+def test_process_quote():
+    data = make_feed().process_data(QUOTE)
+    assert data["type"] == 'Quote Data'
+    assert data["LTQ"] == 10
+    assert data["avg_price"] == "1519.50"
+    assert data["volume"] == 100000
+    assert (data["open"], data["close"], data["high"], data["low"]) == ("1510.00", "1505.00", "1525.00", "1500.00")
+
+
+def test_process_full_depth():
+    data = make_feed().process_data(FULL)
+    assert data["type"] == 'Full Data'
+    assert data["OI"] == 120000
+    assert len(data["depth"]) == 5
+    assert data["depth"][0] == {
+        "bid_quantity": 100,
+        "ask_quantity": 200,
+        "bid_orders": 3,
+        "ask_orders": 4,
+        "bid_price": "99.50",
+        "ask_price": "100.50",
+    }
+    assert data["depth"][4]["ask_price"] == "104.50"
+
+
+def test_process_market_depth():
+    packet = struct.pack('<BHBIf', 3, 112, 1, 1333, 1520.25) + DEPTH
+    data = make_feed().process_data(packet)
+    assert data["type"] == 'Market Depth'
+    assert data["LTP"] == 1520.25
+    assert data["depth"][1]["bid_quantity"] == 101
+
+
+def test_server_disconnection_sets_on_close():
+    feed = make_feed()
+    feed.process_data(struct.pack('<BHBIH', 50, 10, 0, 0, 807))
+    assert feed.on_close is True
+
+
+def test_numeric_mode_keeps_raw_values():
+    feed = make_feed(numeric=True)
+    data = feed.process_data(FULL)
+    assert data["LTP"] == 210.5
+    assert data["LTT"] == 1700000000
+    assert data["depth"][0]["bid_price"] == 99.5
+
+
+def test_format_tick_matches_default_mode():
+    numeric = make_feed(numeric=True)
+    default = make_feed()
+    for packet in (TICKER, QUOTE, FULL):
+        tick = numeric.process_data(packet)
+        assert numeric.format_tick(tick) == default.process_data(packet)
+        assert isinstance(tick["LTP"], float)
+
+
+@pytest.mark.asyncio
+async def test_get_instrument_data_batch():
+    feed = make_feed()
+    feed.ws = QueuedWebSocket([TICKER, QUOTE, TICKER, FULL, struct.pack('<BHBII', 5, 12, 2, 49081, 777)])
+    batch = await feed.get_instrument_data_batch()
+    ticks = batch['Ticker Data']
+    assert len(ticks) == 2
+    assert ticks['security_id'].tolist() == [1333, 1333]
+    assert ticks['LTP'][0] == pytest.approx(1520.25)
+    assert batch['Quote Data']['volume'][0] == 100000
+    full = batch['Full Data']
+    assert full['OI'][0] == 120000
+    assert full['depth']['bid_price'][0].tolist() == pytest.approx([99.5, 98.5, 97.5, 96.5, 95.5])
+    assert batch['others'] == [{"type": 'OI Data', "exchange_segment": 2, "security_id": 49081, "OI": 777}]
+
+
+class FrameSink:
+    def __init__(self):
+        self.frames = []
+
+    def update(self, frame):
+        self.frames.append(frame)
+
+
+@pytest.mark.asyncio
+async def test_get_instrument_data_batch_updates_sinks():
+    from dhanhq.snapshot import SnapshotStore
+    feed = make_feed()
+    store, sink = SnapshotStore(), FrameSink()
+    feed.add_sink(store)
+    feed.add_sink(sink)
+    oi = struct.pack('<BHBII', 5, 12, 2, 49081, 777)
+    feed.ws = QueuedWebSocket([TICKER, QUOTE, FULL, oi])
+    await feed.get_instrument_data_batch()
+    assert sink.frames == [TICKER, QUOTE, FULL, oi]
+    assert store.ltp(1, 1333) == pytest.approx(1520.25)
+    assert store.value(2, 49081, 'OI') == 777
+
+
+def test_create_subscription_packet_layout():
+    feed = make_feed()
+    packet = feed.create_subscription_packet([(1, '1333'), (2, '49081')], 17)
+    assert len(packet) == 83 + 4 + 100 * 21
+    code, length, client_id, _ = struct.unpack_from('<bH30s50s', packet)
+    assert (code, length) == (17, 83 + 4 + 2 * 21)
+    assert client_id.rstrip(b'\0') == b'CID'
+    assert struct.unpack_from('<I', packet, 83) == (2,)
+    assert struct.unpack_from('<B20s', packet, 87 + 21) == (2, b'49081'.ljust(20, b'\0'))
+    assert not any(packet[87 + 2 * 21:])
+
+
+def test_create_subscription_message():
+    message = json.loads(make_feed().create_subscription_message([(2, '49081')], 21))
+    assert message == {
+        "RequestCode": 21,
+        "InstrumentCount": 1,
+        "InstrumentList": [{"ExchangeSegment": "NSE_FNO", "SecurityId": "49081"}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_callbacks_dispatch_by_packet_type():
+    feed = make_feed()
+    feed.ws = ClosingWebSocket([TICKER, QUOTE, TICKER])
+    tickers, everything, seen = [], [], []
+
+    async def on_quote(packet):
+        seen.append(packet["type"])
+
+    feed.add_callback(tickers.append, 'Ticker Data')
+    feed.add_callback(on_quote, 'Quote Data')
+    feed.add_callback(everything.append)
+    feed.on_ticks = lambda packet: None
+    feed._receiver = asyncio.ensure_future(feed._receive_loop())
+    await feed._receiver
+    assert len(tickers) == 2
+    assert seen == ['Quote Data']
+    assert len(everything) == 3
+
+
+@pytest.mark.asyncio
+async def test_async_iteration_over_feed():
+    feed = make_feed(numeric=True)
+    feed.ws = ClosingWebSocket([TICKER, FULL])
+    packets = [packet async for packet in feed]
+    assert [packet["type"] for packet in packets] == ['Ticker Data', 'Full Data']
+
+
+class SingleReaderWebSocket(QueuedWebSocket):
+    """Websocket stub counting the most ``recv`` calls waiting at once."""
+
+    def __init__(self, frames):
+        super().__init__(frames)
+        self.readers = self.max_readers = 0
+
+    async def recv(self):
+        self.readers += 1
+        self.max_readers = max(self.max_readers, self.readers)
+        try:
+            return await super().recv()
+        finally:
+            self.readers -= 1
+
+
+@pytest.mark.asyncio
+async def test_iteration_and_start_share_one_reader(monkeypatch):
+    feed = make_feed()
+    feed.ws = SingleReaderWebSocket([])
+
+    async def connected():
+        pass
+
+    monkeypatch.setattr(feed, 'connect', connected)
+    packets = []
+
+    async def consume():
+        async for packet in feed:
+            packets.append(packet)
+            if len(packets) == 3:
+                break
+
+    consumer = asyncio.ensure_future(consume())
+    await asyncio.sleep(0)
+    receiver = await feed.start()
+    for frame in (TICKER, QUOTE, TICKER):
+        feed.ws.queue.put_nowait(frame)
+    await consumer
+    assert len(packets) == 3 and feed.ws.max_readers == 1
+    assert feed._receiver is receiver and not receiver.done()
+    await feed.stop()
+
+
+@pytest.mark.asyncio
+async def test_iterator_started_receive_task_stops_with_the_iterator():
+    feed = make_feed()
+    feed.ws = QueuedWebSocket([TICKER, QUOTE])
+    iterator = feed.__aiter__()
+    assert (await iterator.__anext__())["type"] == 'Ticker Data'
+    receiver = feed._receiver
+    await iterator.aclose()
+    await asyncio.sleep(0)
+    assert feed._receiver is None and receiver.cancelled()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy, expected", [('block', [0, 1, 2, 3, 4]), ('drop_oldest', [4])])
+async def test_iterator_queue_is_bounded(policy, expected):
+    feed = make_feed(queue_policy=policy)
+    feed.iterator_queue_size = 2
+    feed.ws = ClosingWebSocket([struct.pack('<BHBIfI', 2, 16, 1, security_id, 1.0, 0) for security_id in range(5)])
+    assert [packet["security_id"] async for packet in feed] == expected
+
+
+@pytest.mark.asyncio
+async def test_async_iteration_with_receive_task():
+    feed = make_feed()
+    feed.ws = QueuedWebSocket([TICKER])
+    feed._receiver = asyncio.ensure_future(feed._receive_loop())
+    iterator = feed.__aiter__()
+    first = asyncio.ensure_future(iterator.__anext__())
+    await asyncio.sleep(0)
+    feed.ws.queue.put_nowait(QUOTE)
+    assert (await first)["type"] == 'Quote Data'
+    await feed.stop()
+
+
+@pytest.mark.asyncio
+async def test_reconnects_and_resubscribes(monkeypatch):
+    feed = make_feed(numeric=True, reconnect=True, reconnect_delay=0.001, max_reconnect_attempts=2)
+    feed.instruments = [(NSE, '1333')]
+    feed.ws = ClosingWebSocket([TICKER])
+    sockets = [ClosingWebSocket([QUOTE])]
+    resubscribed = []
+
+    async def fake_connect(url):
+        if not sockets:
+            raise OSError("connection refused")
+        return sockets.pop()
+
+    async def fake_subscribe():
+        resubscribed.append(list(feed.instruments))
+
+    monkeypatch.setattr('websockets.connect', fake_connect)
+    monkeypatch.setattr(feed, 'subscribe_instruments', fake_subscribe)
+    packets = []
+    feed.add_callback(packets.append)
+    feed._receiver = asyncio.ensure_future(feed._receive_loop())
+    await asyncio.wait_for(feed._receiver, 5)
+    assert [packet["type"] for packet in packets] == ['Ticker Data', 'Quote Data']
+    assert resubscribed == [[(NSE, '1333')]]
+    stats = feed.connection_stats()
+    assert stats["reconnects"] == 1
+    assert len(stats["downtime_windows"]) == 1 and stats["total_downtime"] >= 0
+    assert len(stats["time_to_first_tick"]) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("queue_size", [None, 10])
+async def test_fatal_disconnection_is_not_retried(monkeypatch, queue_size):
+    feed = make_feed(reconnect=True, reconnect_delay=0.001, queue_size=queue_size)
+    feed.ws = ClosingWebSocket([TICKER, QUOTE, struct.pack('<BHBIH', 50, 10, 0, 0, 805)])
+
+    async def fake_connect(url):
+        raise AssertionError("reconnected after a fatal disconnection")
+
+    monkeypatch.setattr('websockets.connect', fake_connect)
+    feed._receiver = asyncio.ensure_future(feed._receive_loop())
+    await asyncio.wait_for(feed._receiver, 5)
+    assert feed.connection_stats()["reconnects"] == 0
@@ -0,0 +1,108 @@
+import pytest
+
+from dhanhq.orderbook import OrderBookCache
+from dhanhq.orderupdate import OrderSocket, RECONNECTED
+
+
+class FakeClient:
+    def __init__(self, orders):
+        self.orders = orders
+        self.calls = []
+
+    def get_order_list(self):
+        self.calls.append("list")
+        return {"status": "success", "remarks": "", "data": [dict(order) for order in self.orders]}
+
+    def get_order_by_id(self, order_id):
+        self.calls.append(("id", order_id))
+        return {"status": "success", "remarks": "", "data": [{"orderId": order_id, "orderStatus": "PENDING"}]}
+
+    def get_order_by_correlationID(self, correlationID):
+        self.calls.append(("correlation", correlationID))
+        return {"status": "failure", "remarks": "not found", "data": ""}
+
+
+ORDERS = [
+    {"orderId": "1", "orderStatus": "PENDING", "correlationId": "c-1", "quantity": 10, "filledQty": 0},
+    {"orderId": "2", "orderStatus": "TRADED", "correlationId": "", "quantity": 5, "filledQty": 5},
+]
+
+
+def alert(**data):
+    return {"Type": "order_alert", "Data": data}
+
+
+def test_loads_once_and_serves_indexed_lookups():
+    client = FakeClient(ORDERS)
+    cache = OrderBookCache(client)
+
+    assert cache.get_order_by_id("1")["data"]["orderStatus"] == "PENDING"
+    assert cache.get_order_by_correlationID("c-1")["data"]["orderId"] == "1"
+    assert len(cache.get_order_list()["data"]) == 2
+    assert client.calls == ["list"]
+
+
+def test_misses_fall_back_to_the_api_and_are_cached():
+    client = FakeClient(ORDERS)
+    cache = OrderBookCache(client)
+
+    assert cache.get_order_by_id("7")["status"] == "success"
+    assert cache.get_order_by_id("7")["data"]["orderStatus"] == "PENDING"
+    assert cache.get_order_by_correlationID("missing")["status"] == "failure"
+    assert client.calls == ["list", ("id", "7"), ("correlation", "missing")]
+
+
+@pytest.mark.asyncio
+async def test_socket_updates_keep_the_book_current():
+    client = FakeClient(ORDERS)
+    socket = OrderSocket("CID", "TOKEN")
+    cache = OrderBookCache(client, socket)
+    cache.reconcile()
+
+    await socket.handle_order_update(alert(OrderNo="1", Status="Traded", TradedQty=10, AvgTradedPrice=101.5))
+    await socket.handle_order_update(alert(OrderNo="3", Status="Pending", CorrelationId="c-3", Quantity=1))
+
+    order = cache.get_order_by_id("1")["data"]
+    assert order["orderStatus"] == "TRADED" and order["filledQty"] == 10 and order["averageTradedPrice"] == 101.5
+    assert order["correlationId"] == "c-1"
+    assert cache.get_order_by_correlationID("c-3")["data"]["orderId"] == "3"
+    assert client.calls == ["list"]
+
+
+@pytest.mark.asyncio
+async def test_reconnect_reconciles_with_the_rest_order_list():
+    client = FakeClient(ORDERS)
+    socket = OrderSocket("CID", "TOKEN")
+    cache = OrderBookCache(client, socket)
+    cache.reconcile()
+
+    client.orders = [dict(ORDERS[0], orderStatus="CANCELLED")]
+    await socket._emit(RECONNECTED, None)
+
+    assert client.calls == ["list", "list"]
+    assert cache.reconciliations == 2
+    assert cache.get_order_by_id("1")["data"]["orderStatus"] == "CANCELLED"
+    assert len(cache) == 1
+
+
+def test_updates_during_reconciliation_survive_it():
+    cache = None
+
+    class RacingClient(FakeClient):
+        def get_order_list(self):
+            cache.apply({"orderNo": "1", "status": "TRADED", "tradedQty": 10})
+            return super().get_order_list()
+
+    client = RacingClient(ORDERS)
+    cache = OrderBookCache(client)
+    assert cache.reconcile()
+    assert cache.get_order_by_id("1")["data"]["orderStatus"] == "TRADED"
+
+
+def test_failed_reconciliation_keeps_the_book():
+    client = FakeClient(ORDERS)
+    cache = OrderBookCache(client)
+    cache.reconcile()
+    client.get_order_list = lambda: {"status": "failure", "remarks": "down", "data": ""}
+    assert not cache.reconcile()
+    assert len(cache) == 2
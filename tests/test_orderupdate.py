@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import pytest
+
+from dhanhq import orderupdate
+from dhanhq.orderupdate import OrderSocket, order_field, FILLED, PARTIALLY_FILLED, REJECTED, CANCELLED, RECONNECTED
+
+
+def alert(**data):
+    return {"Type": "order_alert", "Data": data}
+
+
+class ScriptedWebSocket:
+    def __init__(self, messages):
+        self.messages = [json.dumps(message) for message in messages]
+        self.sent = []
+
+    async def send(self, msg):
+        self.sent.append(msg)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.messages:
+            return self.messages.pop(0)
+        raise StopAsyncIteration
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_order_table_and_typed_events():
+    socket = OrderSocket('CID', 'TOKEN')
+    events = []
+    for event in (FILLED, PARTIALLY_FILLED, REJECTED, CANCELLED):
+        socket.add_callback(lambda order, event=event: events.append((event, order_field(order, "orderNo"))), event)
+    updates = []
+    socket.add_callback(updates.append)
+
+    await socket.handle_order_update(alert(orderNo="1", status="PENDING", quantity=10, tradedQty=0))
+    await socket.handle_order_update(alert(orderNo="1", status="PART_TRADED", tradedQty=4))
+    await socket.handle_order_update(alert(orderNo="1", status="PART_TRADED", tradedQty=4))
+    await socket.handle_order_update(alert(orderNo="1", status="PART_TRADED", tradedQty=7))
+    await socket.handle_order_update(alert(orderNo="1", status="TRADED", tradedQty=10))
+    await socket.handle_order_update(alert(OrderNo="2", Status="Rejected"))
+    await socket.handle_order_update(alert(orderNo="3", status="CANCELLED"))
+
+    assert events == [(PARTIALLY_FILLED, "1"), (PARTIALLY_FILLED, "1"), (FILLED, "1"),
+                      (REJECTED, "2"), (CANCELLED, "3")]
+    assert len(updates) == 7
+    order = socket.get_order(1)
+    assert order["status"] == "TRADED" and order["quantity"] == 10 and order["tradedQty"] == 10
+    assert set(socket.orders) == {"1", "2", "3"}
+
+
+@pytest.mark.asyncio
+async def test_callback_errors_are_isolated_and_coroutines_awaited():
+    socket = OrderSocket('CID', 'TOKEN')
+    seen = []
+
+    def broken(order):
+        raise RuntimeError("boom")
+
+    async def coroutine(order):
+        seen.append(order["orderNo"])
+
+    socket.add_callback(broken, FILLED)
+    socket.add_callback(coroutine, FILLED)
+    await socket.handle_order_update(alert(orderNo="9", status="TRADED"))
+    assert seen == ["9"]
+    socket.remove_callback(coroutine, FILLED)
+    await socket.handle_order_update(alert(orderNo="10", status="TRADED"))
+    assert seen == ["9"]
+
+
+@pytest.mark.asyncio
+async def test_unknown_messages_leave_table_untouched():
+    socket = OrderSocket('CID', 'TOKEN')
+    await socket.handle_order_update({"Type": "heartbeat"})
+    await socket.handle_order_update(alert(message="no order number"))
+    assert socket.orders == {}
+
+
+@pytest.mark.asyncio
+async def test_listen_reconnects_with_backoff(monkeypatch):
+    connections = [
+        ScriptedWebSocket([alert(orderNo="1", status="PENDING")]),
+        OSError("refused"),
+        ScriptedWebSocket([alert(orderNo="1", status="TRADED")]),
+    ]
+    socket = OrderSocket('CID', 'TOKEN', reconnect_delay=0.01)
+
+    def connect(url):
+        item = connections.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+        if not connections:
+            await socket.stop()
+        await real_sleep(0)
+
+    monkeypatch.setattr(orderupdate.websockets, 'connect', connect)
+    monkeypatch.setattr(orderupdate.asyncio, 'sleep', fake_sleep)
+    fills, reconnects = [], []
+    socket.add_callback(fills.append, FILLED)
+    socket.add_callback(reconnects.append, RECONNECTED)
+
+    await socket.listen()
+
+    assert [order["orderNo"] for order in fills] == ["1"]
+    assert reconnects == [None]
+    assert socket.connections == 2 and socket.reconnect_count == 1
+    assert len(delays) == 3
+    assert 0.005 <= delays[0] <= 0.01 and 0.01 <= delays[1] <= 0.02
@@ -0,0 +1,121 @@
+import struct
+
+import pytest
+
+from dhanhq.orderupdate import OrderSocket
+from dhanhq.marketfeed import IDX, NSE, NSE_FNO
+from dhanhq.positions import PositionEngine, Position, STOP_LOSS, TARGET, order_segment
+
+
+def ticker(security_id, ltp, segment=2):
+    return struct.pack('<BHBIfI', 2, 16, segment, security_id, ltp, 0)
+
+
+def alert(**data):
+    return {"Type": "order_alert", "Data": data}
+
+
+def test_position_average_cost_and_realized_pnl():
+    position = Position(NSE, 1)
+    position.fill(10, 100.0)
+    position.fill(10, 110.0)
+    assert position.quantity == 20 and position.average_price == 105.0
+    position.fill(-5, 120.0)
+    assert position.quantity == 15 and position.realized == 75.0
+    position.fill(-25, 100.0)
+    assert position.quantity == -10 and position.average_price == 100.0
+    assert position.realized == 75.0 + 15 * -5.0
+    position.ltp = 90.0
+    assert position.unrealized == 100.0
+
+
+def test_feed_frames_mark_positions_per_security_and_tag():
+    engine = PositionEngine()
+    engine.apply_fill(NSE_FNO, 1001, 50, 100.0, tag="straddle")
+    engine.apply_fill("NSE_FNO", 1002, -50, 80.0, tag="straddle")
+    engine.apply_fill(NSE_FNO, 1001, 10, 101.0)
+
+    engine.update(ticker(1001, 102.0))
+    engine.update(ticker(1002, 79.0))
+    engine.update(ticker(9999, 1.0))
+    engine.update(b'\x07' + bytes(20))
+
+    assert engine.pnl(tag="straddle")["unrealized"] == pytest.approx(50 * 2.0 + 50 * 1.0)
+    assert engine.pnl(NSE_FNO, 1001)["unrealized"] == pytest.approx(100.0 + 10.0)
+    assert engine.pnl()["total"] == pytest.approx(160.0)
+    assert len(engine) == 3
+    # prices seen before the first fill value new positions immediately
+    assert engine.apply_fill(NSE_FNO, 9999, 1, 2.0).unrealized == pytest.approx(-1.0)
+    with pytest.raises(ValueError):
+        engine.positions(security_id=1001)
+
+
+def test_security_ids_are_only_unique_within_a_segment():
+    engine = PositionEngine()
+    fired = []
+    engine.apply_fill("NSE_EQ", 13, 10, 100.0, tag="equity")
+    engine.watch("equity", lambda *args: fired.append(args), stop_loss=50, target=50)
+    engine.update(ticker(13, 24000.0, segment=IDX))
+    assert engine.position(NSE, 13, "equity").ltp == 100.0 and fired == []
+    engine.update(ticker(13, 103.0, segment=NSE))
+    assert engine.pnl("NSE_EQ", 13)["unrealized"] == pytest.approx(30.0)
+    assert engine.pnl(IDX, 13)["total"] == 0.0
+
+
+def test_order_segment_maps_order_updates_to_feed_codes():
+    assert order_segment({"Exchange": "NSE", "Segment": "D"}) == NSE_FNO
+    assert order_segment({"exchange": "NSE", "segment": "E"}) == NSE
+    assert order_segment({"exchangeSegment": "BSE_FNO"}) == 8
+    assert order_segment({"SecurityId": "13"}) is None
+
+
+@pytest.mark.asyncio
+async def test_order_socket_fills_are_applied_incrementally():
+    socket = OrderSocket("CID", "TOKEN")
+    engine = PositionEngine()
+    engine.attach(socket)
+
+    await socket.handle_order_update(alert(OrderNo="7", Exchange="NSE", Segment="D", SecurityId="1001", TxnType="B",
+                                           TradedQty=0, Status="PENDING", CorrelationId="s1"))
+    await socket.handle_order_update(alert(OrderNo="7", TradedQty=4, AvgTradedPrice=100.0, Status="PART_TRADED"))
+    await socket.handle_order_update(alert(OrderNo="7", TradedQty=10, AvgTradedPrice=103.0, Status="TRADED"))
+    await socket.handle_order_update(alert(OrderNo="7", TradedQty=10, AvgTradedPrice=103.0, Status="TRADED"))
+    engine.tag_order("8", "s1")
+    await socket.handle_order_update(alert(OrderNo="8", Exchange="NSE", Segment="D", SecurityId="1001", TxnType="S",
+                                           TradedQty=10, AvgTradedPrice=110.0, Status="TRADED"))
+    await socket.handle_order_update(alert(OrderNo="9", SecurityId="1001", TxnType="B", TradedQty=10,
+                                           AvgTradedPrice=110.0, Status="TRADED"))
+
+    assert len(engine) == 1
+    position = engine.position(NSE_FNO, 1001, "s1")
+    assert position.quantity == 0
+    assert position.realized == pytest.approx(70.0)
+
+
+def test_watches_fire_once_on_stop_loss_and_target():
+    engine = PositionEngine()
+    fired = []
+    engine.apply_fill(NSE_FNO, 1001, 10, 100.0, tag="a")
+    engine.apply_fill(NSE_FNO, 1002, 10, 100.0, tag="b")
+    engine.watch("a", lambda *args: fired.append(args), stop_loss=50)
+    engine.watch("b", lambda *args: fired.append(args), target=30)
+
+    engine.update(ticker(1001, 97.0))
+    engine.update(ticker(1002, 102.0))
+    assert fired == []
+    engine.update(ticker(1001, 95.0))
+    engine.update(ticker(1002, 103.0))
+    engine.update(ticker(1001, 90.0))
+    assert fired == [("a", STOP_LOSS, -50.0), ("b", TARGET, 30.0)]
+
+
+def test_mark_from_snapshot():
+    from dhanhq.snapshot import SnapshotStore
+    store = SnapshotStore()
+    store.update(ticker(1001, 120.0))
+    engine = PositionEngine()
+    engine.apply_fill(NSE_FNO, 1001, 1, 100.0)
+    engine.apply_fill(NSE, 1001, 1, 100.0)
+    engine.mark_from(store)
+    assert engine.pnl(NSE_FNO, 1001)["unrealized"] == pytest.approx(20.0)
+    assert engine.position(NSE, 1001).ltp == 100.0
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+import responses
+
+from dhanhq import dhanhq
+from dhanhq.ratelimit import RateLimiter, endpoint_class, ORDER, DATA, QUOTE, NON_TRADING
+
+
+def test_endpoint_classes():
+    base = "https://api.dhan.co/v2"
+    assert endpoint_class("POST", base + "/orders") == ORDER
+    assert endpoint_class("DELETE", base + "/super/orders/1/ENTRY_LEG") == ORDER
+    assert endpoint_class("GET", base + "/orders") == NON_TRADING
+    assert endpoint_class("POST", base + "/marketfeed/quote") == QUOTE
+    assert endpoint_class("POST", base + "/charts/historical") == DATA
+    assert endpoint_class("POST", base + "/optionchain/expirylist") == DATA
+    assert endpoint_class("GET", base + "/fundlimit") == NON_TRADING
+
+
+def test_burst_then_wait_and_stats():
+    limiter = RateLimiter({ORDER: ((2, 0.1),)})
+    start = time.monotonic()
+    assert limiter.acquire(ORDER) == 0.0
+    assert limiter.acquire(ORDER) == 0.0
+    waited = limiter.acquire(ORDER)
+    assert 0.03 <= waited and time.monotonic() - start >= 0.04
+    stats = limiter.stats()[ORDER]
+    assert stats["requests"] == 3 and stats["waited"] == 1 and stats["wait_max"] == waited
+    assert limiter.acquire(DATA) == 0.0  # classes without limits pass through
+
+
+def test_timeout():
+    limiter = RateLimiter({DATA: ((1, 10),)})
+    limiter.acquire(DATA)
+    with pytest.raises(TimeoutError):
+        limiter.acquire(DATA, timeout=0.02)
+    assert limiter.stats()[DATA]["waiting"] == 0
+
+
+def test_orders_are_served_before_waiting_data_calls():
+    limiter = RateLimiter({ORDER: ((100, 1),), DATA: ((100, 1),)}, total=(1, 0.05))
+    limiter.acquire(DATA)
+    served = []
+
+    def call(endpoint):
+        limiter.acquire(endpoint)
+        served.append(endpoint)
+
+    data = threading.Thread(target=call, args=(DATA,))
+    data.start()
+    time.sleep(0.01)
+    order = threading.Thread(target=call, args=(ORDER,))
+    order.start()
+    data.join(1)
+    order.join(1)
+    assert served == [ORDER, DATA]
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_shares_buckets():
+    limiter = RateLimiter({QUOTE: ((1, 0.05),)})
+    limiter.acquire(QUOTE)
+    waited = await limiter.acquire_async(QUOTE)
+    assert waited > 0.02
+    assert limiter.stats()[QUOTE]["requests"] == 2
+
+
+@responses.activate
+def test_sync_client_schedules_requests_and_backs_off_after_429():
+    limiter = RateLimiter({NON_TRADING: ((5, 1),)})
+    api = dhanhq("1", "token", rate_limiter=limiter)
+    responses.add(responses.GET, "https://api.dhan.co/v2/fundlimit", json={"errorCode": "DH-904"}, status=429)
+    assert api.get_fund_limits()["status"] == "failure"
+    stats = limiter.stats()[NON_TRADING]
+    assert stats["requests"] == 1 and stats["throttled"] == 1
+    assert limiter._buckets[NON_TRADING][0].tokens <= 0.01
+    assert isinstance(dhanhq("1", "token", rate_limiter=True).rate_limiter, RateLimiter)
@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+
+from dhanhq.recorder import TickRecorder, TickReplay, read_frames, segment_paths
+from tests.conftest import TICKER, QUOTE, FULL, ClosingWebSocket, make_feed
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_records_segments_and_reads_them_back(tmp_path, compress):
+    with TickRecorder(str(tmp_path), segment_size=100, compress=compress) as recorder:
+        for frame in (TICKER, QUOTE, FULL, TICKER):
+            recorder.update(frame)
+        recorder.update('{"text": "ignored"}')
+    assert recorder.frames == 4
+    assert len(recorder.segments) > 1
+    assert segment_paths(str(tmp_path / "ticks")) == recorder.segments
+    assert [frame for _, frame in read_frames(str(tmp_path))] == [TICKER, QUOTE, FULL, TICKER]
+
+
+def test_recording_resumes_after_existing_segments(tmp_path):
+    with TickRecorder(str(tmp_path)) as recorder:
+        recorder.update(TICKER)
+    with TickRecorder(str(tmp_path)) as recorder:
+        recorder.update(QUOTE)
+    assert [frame for _, frame in read_frames(str(tmp_path))] == [TICKER, QUOTE]
+
+
+def test_feed_sink_records_and_replay_decodes(tmp_path):
+    feed = make_feed(numeric=True)
+    recorder = TickRecorder(str(tmp_path))
+    feed.add_sink(recorder)
+    feed.process_data(TICKER)
+    feed.process_data(FULL)
+    recorder.close()
+    packets = list(TickReplay(str(tmp_path), speed=None).replay(make_feed(numeric=True)))
+    assert [packet["type"] for packet in packets] == ['Ticker Data', 'Full Data']
+
+
+@pytest.mark.asyncio
+async def test_queued_feed_records_every_frame_on_receipt(tmp_path):
+    feed = make_feed(queue_size=1, queue_policy='drop_oldest')
+    recorder = TickRecorder(str(tmp_path))
+    feed.add_sink(recorder)
+    decoded = []
+
+    def slow_decode(packet):
+        decoded.append(packet)
+        time.sleep(0.01)
+
+    feed.add_callback(slow_decode)
+    feed.ws = ClosingWebSocket([TICKER, QUOTE, FULL, TICKER])
+    started = time.time()
+    await feed._receive_loop()
+    recorder.close()
+    records = list(read_frames(str(tmp_path)))
+    assert [frame for _, frame in records] == [TICKER, QUOTE, FULL, TICKER]
+    assert len(decoded) < 4
+    assert all(received_at - started < 0.01 for received_at, _ in records)
+
+
+def test_replay_keeps_scaled_pace(tmp_path):
+    with TickRecorder(str(tmp_path)) as recorder:
+        recorder.write(1000.0, TICKER)
+        recorder.write(1000.2, QUOTE)
+    started = time.perf_counter()
+    assert len(list(TickReplay(str(tmp_path), speed=2).frames())) == 2
+    assert 0.09 <= time.perf_counter() - started < 1
+
+
+@pytest.mark.asyncio
+async def test_play_dispatches_to_callbacks(tmp_path):
+    with TickRecorder(str(tmp_path), compress=True) as recorder:
+        recorder.write(1000.0, TICKER)
+        recorder.write(1000.001, QUOTE)
+    feed = make_feed()
+    seen = []
+    feed.add_callback(lambda packet: seen.append(packet["type"]))
+    assert await TickReplay(str(tmp_path), speed=10).play(feed) == 2
+    assert seen == ['Ticker Data', 'Quote Data']
+
+
+def test_recording_resumes_after_the_highest_segment(tmp_path):
+    for index in (0, 1, 2):
+        with TickRecorder(str(tmp_path), segment_size=1) as recorder:
+            recorder.write(1000.0 + index, TICKER)
+    os.remove(os.path.join(str(tmp_path), 'ticks.00001.dtk'))
+    with TickRecorder(str(tmp_path)) as recorder:
+        recorder.write(1003.0, QUOTE)
+    assert recorder.segments == [os.path.join(str(tmp_path), 'ticks.00003.dtk')]
+    assert [received_at for received_at, _ in read_frames(str(tmp_path))] == [1000.0, 1002.0, 1003.0]
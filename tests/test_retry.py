@@ -0,0 +1,187 @@
+import json
+import re
+import time
+from datetime import datetime
+
+import pytest
+import requests
+import responses
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from dhanhq.dhanhq import dhanhq
+from dhanhq.retry import CREATE_TIME_FORMAT, IST, RetryPolicy, request_was_sent
+
+
+def client(**kwargs):
+    policy = RetryPolicy(**kwargs)
+    policy.waits = []
+    policy.sleep = policy.waits.append
+    return dhanhq("CID", "TOKEN", retry_policy=policy), policy
+
+
+def create_time(offset=0):
+    return datetime.fromtimestamp(time.time() + offset, IST).strftime(CREATE_TIME_FORMAT)
+
+
+def order_calls():
+    return [call for call in responses.calls if call.request.method == "POST"]
+
+
+def test_request_was_sent_separates_connection_failures():
+    refused = requests.exceptions.ConnectionError(
+        MaxRetryError(None, "/orders", NewConnectionError(None, "refused")))
+    assert not request_was_sent(refused)
+    assert not request_was_sent(requests.exceptions.ConnectTimeout())
+    assert request_was_sent(requests.exceptions.ReadTimeout())
+    assert request_was_sent(requests.exceptions.ConnectionError(ProtocolError("Connection aborted.")))
+
+
+def test_delay_backs_off_exponentially_up_to_the_limit():
+    policy = RetryPolicy(backoff=0.1, max_backoff=1.0)
+    assert 0.05 <= policy.delay(0) <= 0.1
+    assert 0.2 <= policy.delay(2) <= 0.4
+    assert 0.5 <= policy.delay(10) <= 1.0
+    response = requests.Response()
+    response.headers["Retry-After"] = "3"
+    assert policy.delay(0, response) == 1.0
+
+
+@responses.activate
+def test_get_is_retried_after_errors_and_5xx():
+    api, policy = client()
+    url = api.base_url + "/orders"
+    responses.add(responses.GET, url, body=requests.exceptions.ConnectionError("reset"))
+    responses.add(responses.GET, url, status=503, json={})
+    responses.add(responses.GET, url, json=[{"orderId": "1"}])
+    assert api.get_order_list() == {"status": "success", "remarks": "", "data": [{"orderId": "1"}]}
+    assert len(responses.calls) == 3 and len(policy.waits) == 2 and policy.retries == 2
+
+
+@responses.activate
+def test_get_returns_the_last_response_when_retries_run_out():
+    api, policy = client(attempts=2)
+    responses.add(responses.GET, api.base_url + "/positions", status=500,
+                  json={"errorType": "Server", "errorCode": "DH-908", "errorMessage": "down"})
+    assert api.get_positions()["remarks"]["error_code"] == "DH-908"
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_order_gets_a_correlation_id_and_is_sent_once_when_accepted():
+    api, policy = client()
+    responses.add(responses.POST, api.base_url + "/orders", json={"orderId": "11", "orderStatus": "TRANSIT"})
+    result = api.place_order("1333", "NSE_EQ", "BUY", 1, "MARKET", "INTRADAY", 0)
+    assert result["data"]["orderId"] == "11"
+    assert json.loads(order_calls()[0].request.body)["correlationId"]
+    assert len(responses.calls) == 1 and not policy.waits
+
+
+@responses.activate
+def test_order_is_resent_when_it_never_reached_the_api():
+    api, policy = client()
+    url = api.base_url + "/orders"
+    responses.add(responses.POST, url, body=requests.exceptions.ConnectTimeout())
+    responses.add(responses.POST, url, status=429, json={})
+    responses.add(responses.POST, url, json={"orderId": "11", "orderStatus": "TRANSIT"})
+    result = api.place_order("1333", "NSE_EQ", "BUY", 1, "MARKET", "INTRADAY", 0, tag="mine")
+    assert result["status"] == "success"
+    assert [json.loads(call.request.body)["correlationId"] for call in order_calls()] == ["mine"] * 3
+    assert not any(call.request.method == "GET" for call in responses.calls)
+
+
+@responses.activate
+def test_ambiguous_failure_returns_the_order_found_by_correlation_id():
+    api, policy = client()
+    responses.add(responses.POST, api.base_url + "/orders", body=requests.exceptions.ReadTimeout())
+    responses.add(responses.GET, api.base_url + "/orders/external/mine",
+                  json={"orderId": "11", "orderStatus": "TRADED", "correlationId": "mine", "createTime": create_time()})
+    result = api.place_order("1333", "NSE_EQ", "BUY", 1, "MARKET", "INTRADAY", 0, tag="mine")
+    assert result == {"status": "success", "remarks": "", "data": {"orderId": "11", "orderStatus": "TRADED"}}
+    assert len(order_calls()) == 1
+
+
+@responses.activate
+def test_ambiguous_failure_resubmits_only_when_the_api_has_no_order():
+    api, policy = client(lookup_attempts=2)
+    responses.add(responses.POST, api.base_url + "/orders/slicing", status=502, body="<html>bad gateway</html>")
+    responses.add(responses.POST, api.base_url + "/orders/slicing", json=[{"orderId": "11"}, {"orderId": "12"}])
+    responses.add(responses.GET, api.base_url + "/orders/external/mine", status=404,
+                  json={"errorType": "Data_Error", "errorCode": "DH-907", "errorMessage": "no order"})
+    result = api.place_slice_order("1333", "NSE_EQ", "BUY", 2, "MARKET", "INTRADAY", 0, tag="mine")
+    assert result["status"] == "success" and len(result["data"]) == 2
+    assert len(order_calls()) == 2
+    lookups = [call for call in responses.calls if call.request.method == "GET"]
+    assert len(lookups) == 2
+
+
+@responses.activate
+def test_order_is_not_resubmitted_when_its_state_is_unknown():
+    api, policy = client()
+    responses.add(responses.POST, api.base_url + "/orders", body=requests.exceptions.ReadTimeout())
+    responses.add(responses.GET, api.base_url + "/orders/external/mine",
+                  body=requests.exceptions.ConnectionError("down"))
+    result = api.place_order("1333", "NSE_EQ", "BUY", 1, "MARKET", "INTRADAY", 0, tag="mine")
+    assert result["status"] == "failure" and "mine" in result["remarks"]
+    assert len(order_calls()) == 1
+
+
+@responses.activate
+def test_without_a_policy_orders_are_sent_once_without_correlation_id():
+    api = dhanhq("CID", "TOKEN")
+    responses.add(responses.POST, api.base_url + "/orders", body=requests.exceptions.ReadTimeout())
+    result = api.place_order("1333", "NSE_EQ", "BUY", 1, "MARKET", "INTRADAY", 0)
+    assert result["status"] == "failure"
+    assert len(responses.calls) == 1
+    assert "correlationId" not in json.loads(responses.calls[0].request.body)
+
+
+@pytest.mark.parametrize("policy", [True, None])
+def test_client_accepts_default_policy(policy):
+    api = dhanhq("CID", "TOKEN", retry_policy=policy)
+    assert isinstance(api.retry_policy, RetryPolicy) is bool(policy)
+    assert api.session.get_adapter(api.base_url).retry_policy is api.retry_policy
+
+
+@pytest.mark.parametrize("status, error_code", [(500, "DH-908"), (429, "DH-904"), (401, "DH-901"), (400, "DH-907")])
+@responses.activate
+def test_lookup_errors_leave_the_order_state_unknown(status, error_code):
+    api, policy = client()
+    responses.add(responses.POST, api.base_url + "/orders", body=requests.exceptions.ReadTimeout())
+    responses.add(responses.GET, api.base_url + "/orders/external/mine", status=status,
+                  json={"errorType": "Error", "errorCode": error_code, "errorMessage": "failed"})
+    result = api.place_order("1333", "NSE_EQ", "BUY", 1, "MARKET", "INTRADAY", 0, tag="mine")
+    assert result["status"] == "failure" and "check correlationId mine" in result["remarks"]
+    assert len(order_calls()) == 1
+
+
+@responses.activate
+def test_recovered_slice_order_lists_every_slice():
+    api, policy = client()
+    responses.add(responses.POST, api.base_url + "/orders/slicing", body=requests.exceptions.ReadTimeout())
+    responses.add(responses.GET, api.base_url + "/orders/external/mine",
+                  json=[{"orderId": "11", "orderStatus": "TRADED", "createTime": create_time()},
+                        {"orderId": "12", "orderStatus": "PENDING", "createTime": create_time()}])
+    result = api.place_slice_order("1333", "NSE_EQ", "BUY", 2, "MARKET", "INTRADAY", 0, tag="mine")
+    assert result["data"] == [{"orderId": "11", "orderStatus": "TRADED"}, {"orderId": "12", "orderStatus": "PENDING"}]
+    assert len(order_calls()) == 1
+
+
+@responses.activate
+def test_older_order_under_a_reused_tag_is_not_taken_as_placed():
+    api, policy = client()
+    responses.add(responses.POST, api.base_url + "/orders", body=requests.exceptions.ReadTimeout())
+    responses.add(responses.GET, api.base_url + "/orders/external/mine",
+                  json={"orderId": "7", "orderStatus": "TRADED", "createTime": create_time(-600)})
+    result = api.place_order("1333", "NSE_EQ", "BUY", 1, "MARKET", "INTRADAY", 0, tag="mine")
+    assert result["status"] == "failure" and "check correlationId mine" in result["remarks"]
+    assert len(order_calls()) == 1
+
+
+@responses.activate
+def test_generated_correlation_id_needs_no_create_time():
+    api, policy = client()
+    responses.add(responses.POST, api.base_url + "/orders", body=requests.exceptions.ReadTimeout())
+    responses.add(responses.GET, re.compile(api.base_url + "/orders/external/.+"),
+                  json={"orderId": "11", "orderStatus": "TRADED"})
+    result = api.place_order("1333", "NSE_EQ", "BUY", 1, "MARKET", "INTRADAY", 0)
+    assert result["data"] == {"orderId": "11", "orderStatus": "TRADED"}
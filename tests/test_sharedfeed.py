@@ -0,0 +1,73 @@
+import multiprocessing
+import struct
+
+import pytest
+
+from dhanhq.sharedfeed import TickPublisher, TickSubscriber
+from tests.conftest import TICKER, QUOTE, FULL, make_feed
+
+
+def ticker(security_id, ltp):
+    return struct.pack('<BHBIfI', 2, 16, 1, security_id, ltp, 1700000000)
+
+
+@pytest.fixture
+def publisher():
+    with TickPublisher(slots=4, ring_size=8) as publisher:
+        yield publisher
+
+
+def test_subscriber_reads_latest_tick(publisher):
+    feed = make_feed()
+    feed.add_sink(publisher)
+    with TickSubscriber(publisher.name) as subscriber:
+        assert subscriber.read(1, 1333) is None
+        feed.process_data(QUOTE)
+        feed.process_data(TICKER)
+        tick = subscriber.read(1, 1333)
+        assert tick["LTP"] == 1520.25 and tick["volume"] == 100000 and tick["close"] == 1505.0
+        feed.process_data(FULL)
+        full = subscriber.read(2, 49081)
+        assert full["OI"] == 120000
+        assert full["depth"][4]["ask_price"] == 104.5
+        assert len(subscriber) == 2
+
+
+def test_poll_follows_updates_and_counts_overruns(publisher):
+    with TickSubscriber(publisher.name) as subscriber:
+        publisher.update(ticker(1, 10.0))
+        publisher.update(ticker(2, 20.0))
+        assert [tick["security_id"] for tick in subscriber.poll()] == [1, 2]
+        assert subscriber.poll() == []
+        for i in range(10):
+            publisher.update(ticker(3, float(i)))
+        assert len(subscriber.poll()) == 8
+        assert subscriber.overruns == 2
+        for security_id in range(4, 7):
+            publisher.update(ticker(security_id, 1.0))
+        assert publisher.dropped == 2
+        assert subscriber.read(1, 6) is None
+
+
+def _read_in_child(name, results):
+    with TickSubscriber(name) as subscriber:
+        results.put(subscriber.read(1, 1333)["LTP"])
+
+
+def test_subscriber_in_another_process(publisher):
+    publisher.update(TICKER)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(target=_read_in_child, args=(publisher.name, results))
+    child.start()
+    assert results.get(timeout=10) == 1520.25
+    child.join(10)
+
+
+def test_read_gives_up_on_a_record_left_mid_write(publisher):
+    publisher.update(ticker(1, 10.0))
+    # an odd sequence counter marks the first record as mid-write, as a publisher dying inside update leaves it
+    publisher._data[8] += 1
+    with TickSubscriber(publisher.name, read_timeout=0.01) as subscriber:
+        with pytest.raises(TimeoutError):
+            subscriber.read(1, 1)
@@ -0,0 +1,59 @@
+import responses
+
+from dhanhq.dhanhq import dhanhq
+from dhanhq.snapshot import SnapshotStore
+from tests.conftest import TICKER, QUOTE, FULL, make_feed
+
+
+def test_store_updates_in_place():
+    store = SnapshotStore()
+    store.update(TICKER)
+    assert store.ltp(1, 1333) == 1520.25
+    assert store.ltp("NSE_EQ", "1333") == 1520.25
+    assert store.ohlc(1, 1333) is None
+    store.update(QUOTE)
+    store.update(TICKER)
+    assert len(store) == 1
+    assert store.ohlc("NSE_EQ", 1333) == {"open": 1510.0, "high": 1525.0, "low": 1500.0, "close": 1505.0}
+    assert store.get(1, 1333)["volume"] == 100000
+    assert store.ltp(1, 9999) is None
+
+
+def test_store_keeps_depth_and_oi():
+    store = SnapshotStore()
+    store.update(FULL)
+    assert store.oi("NSE_FNO", 49081) == 120000
+    depth = store.depth(2, 49081)
+    assert len(depth) == 5
+    assert depth[0] == {"bid_quantity": 100, "ask_quantity": 200, "bid_orders": 3, "ask_orders": 4,
+                        "bid_price": 99.5, "ask_price": 100.5}
+    assert store.keys() == [(2, 49081)]
+
+
+def test_feed_updates_registered_sinks():
+    feed = make_feed()
+    store = SnapshotStore()
+    feed.add_sink(store)
+    feed.process_data(TICKER)
+    assert store.ltp(1, 1333) == 1520.25
+    feed.remove_sink(store)
+    feed.process_data(FULL)
+    assert (2, 49081) not in store
+
+
+@responses.activate
+def test_rest_client_answers_from_snapshot():
+    store = SnapshotStore()
+    store.update(QUOTE)
+    client = dhanhq("cid", "token", snapshot=store, snapshot_max_age=60)
+    ltp = client.ticker_data({"NSE_EQ": [1333]})
+    assert ltp["status"] == "success"
+    assert ltp["data"]["data"]["NSE_EQ"]["1333"] == {"last_price": 1520.25}
+    quote = client.quote_data({"NSE_EQ": [1333]})
+    assert quote["data"]["data"]["NSE_EQ"]["1333"]["ohlc"]["close"] == 1505.0
+    assert len(responses.calls) == 0
+
+    url = "https://api.dhan.co/v2/marketfeed/ltp"
+    responses.add(responses.POST, url, json={"data": {}, "status": "success"}, status=200)
+    client.ticker_data({"NSE_EQ": [1333, 11536]})
+    assert len(responses.calls) == 1
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from dhanhq.marketfeed import DhanFeed, NSE, NSE_FNO, Quote, Ticker
+from dhanhq.subscriptions import normalize
+
+
+class RecordingWebSocket:
+    def __init__(self, fail_after=None):
+        self.sent = []
+        self.fail_after = fail_after
+
+    async def send(self, message):
+        if self.fail_after is not None and len(self.sent) >= self.fail_after:
+            raise websockets.ConnectionClosed(None, None)
+        await asyncio.sleep(0)
+        self.sent.append(json.loads(message))
+
+
+def sent_ids(message):
+    return message["RequestCode"], [item["SecurityId"] for item in message["InstrumentList"]]
+
+
+def make_feed(instruments=()):
+    feed = DhanFeed('CID', 'TOKEN', list(instruments), version='v2')
+    feed.ws = RecordingWebSocket()
+    return feed
+
+
+def test_normalize_defaults_to_ticker_and_validates():
+    assert normalize([(NSE, '1'), (NSE, '2', Quote)], 'v2') == [(NSE, '1', Ticker), (NSE, '2', Quote)]
+    with pytest.raises(ValueError):
+        normalize([(NSE, '1', 19)], 'v2')
+
+
+@pytest.mark.asyncio
+async def test_only_deltas_are_sent():
+    feed = make_feed([(NSE, '1'), (NSE, '2')])
+    await feed.subscribe_instruments()
+    assert [sent_ids(m) for m in feed.ws.sent] == [(15, ['1', '2'])]
+    feed.ws.sent.clear()
+    await feed.subscribe_symbols([(NSE, '2'), (NSE, '3'), (NSE, '2', Quote)])
+    assert [sent_ids(m) for m in feed.ws.sent] == [(15, ['3']), (17, ['2'])]
+    feed.ws.sent.clear()
+    await feed.unsubscribe_symbols([(NSE, '1'), (NSE, '9')])
+    assert [sent_ids(m) for m in feed.ws.sent] == [(16, ['1'])]
+    assert feed.subscriptions.live[Ticker] == {(NSE, '2'), (NSE, '3')}
+
+
+@pytest.mark.asyncio
+async def test_burst_of_changes_is_coalesced():
+    feed = make_feed()
+    feed.subscriptions.coalesce_delay = 0.01
+    await feed.subscriptions.flush()
+    feed.subscribe_symbols([(NSE_FNO, '100', Quote)])
+    feed.unsubscribe_symbols([(NSE_FNO, '100', Quote)])
+    task = feed.subscribe_symbols([(NSE_FNO, '101', Quote)])
+    assert await task == 1
+    assert [sent_ids(m) for m in feed.ws.sent] == [(17, ['101'])]
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_is_sent_before_subscribe_in_batches():
+    feed = make_feed([(NSE, str(i)) for i in range(150)])
+    await feed.subscribe_instruments()
+    assert [len(m["InstrumentList"]) for m in feed.ws.sent] == [100, 50]
+    feed.ws.sent.clear()
+    feed.instruments = [(NSE, '0'), (NSE, '500')]
+    assert await feed.subscriptions.flush() == 3
+    assert [m["RequestCode"] for m in feed.ws.sent] == [16, 16, 15]
+
+
+@pytest.mark.asyncio
+async def test_failed_send_stays_pending():
+    feed = make_feed([(NSE, '1')])
+    feed.ws = RecordingWebSocket(fail_after=0)
+    assert await feed.subscriptions.flush() == 0
+    feed.ws = RecordingWebSocket()
+    assert await feed.subscriptions.flush() == 1
+    assert feed.subscriptions.diff() == ({}, {})
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+import responses
+
+from dhanhq.dhanhq import dhanhq
+from dhanhq.tradehistory import iter_pages, page_trades, write_parquet
+
+
+def trade(number):
+    return {"orderId": str(number), "tradedQuantity": number, "tradedPrice": 100.5 + number}
+
+
+def pages_of(sizes):
+    pages = []
+    number = 0
+    for size in sizes:
+        pages.append([trade(number + i) for i in range(size)])
+        number += size
+    return pages
+
+
+def fetcher(pages, calls):
+    def fetch(page_number):
+        calls.append(page_number)
+        data = pages[page_number] if page_number < len(pages) else []
+        return {"status": "success", "remarks": "", "data": data}
+    return fetch
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_pages_are_yielded_in_order_until_an_empty_page(prefetch):
+    pages = pages_of([3, 3, 2]) + [[], pages_of([1])[0]]
+    calls = []
+    assert list(iter_pages(fetcher(pages, calls), prefetch=prefetch)) == pages[:3]
+    if prefetch:
+        assert set(calls) >= {0, 1, 2, 3}
+    else:
+        assert calls == [0, 1, 2, 3]
+
+
+def test_next_pages_are_fetched_while_the_current_one_is_consumed():
+    started = {page: threading.Event() for page in range(3)}
+
+    def fetch(page_number):
+        started[page_number].set()
+        return {"status": "success", "data": [trade(page_number)] if page_number < 2 else []}
+
+    pages = iter_pages(fetch, prefetch=2)
+    assert next(pages) == [trade(0)]
+    assert started[1].wait(5) and started[2].wait(5)
+    assert list(pages) == [[trade(1)]]
+
+
+def test_failed_page_raises_after_earlier_pages():
+    def fetch(page_number):
+        if page_number == 1:
+            return {"status": "failure", "remarks": "Read timed out", "data": ""}
+        return {"status": "success", "data": [trade(page_number)]}
+
+    pages = iter_pages(fetch, prefetch=1)
+    assert next(pages) == [trade(0)]
+    with pytest.raises(RuntimeError, match="page 1"):
+        next(pages)
+    assert page_trades(0, {"status": "success", "data": ""}) == []
+
+
+@responses.activate
+def test_client_streams_history_into_a_dataframe():
+    pytest.importorskip("pandas")
+    api = dhanhq("CID", "TOKEN")
+    pages = pages_of([2, 1])
+    for number, data in enumerate(pages + [[]]):
+        responses.add(responses.GET, api.base_url + f"/trades/2024-01-01/2024-01-31/{number}", json=data)
+    frame = api.trade_history_dataframe("2024-01-01", "2024-01-31", prefetch=0)
+    assert list(frame["orderId"]) == ["0", "1", "2"]
+    assert len(responses.calls) == 3
+
+
+def test_parquet_writes_one_row_group_per_page(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "trades.parquet"
+    pages = pages_of([2, 3])
+    pages[1][0]["extra"] = "dropped"
+    del pages[1][1]["tradedPrice"]
+    assert write_parquet(iter(pages), path) == 5
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column_names == ["orderId", "tradedQuantity", "tradedPrice"]
+    assert table.column("tradedPrice").null_count == 1
@@ -0,0 +1,107 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from dhanhq import dhanhq
+from dhanhq.transport import (TunedHTTPAdapter, DNSCache, create_session, prewarm_session, connection_stats,
+                              tcp_socket_options)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://localhost:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused_and_dns_is_cached(server):
+    session = create_session(dns_ttl=60)
+    for _ in range(5):
+        assert session.get(server + "/v2/orders", timeout=5).json() == {"ok": True}
+    stats = connection_stats(session)
+    assert stats["connections"] == 1 and stats["requests"] == 5 and stats["reused"] == 4
+    assert stats["dns_misses"] == 1
+
+
+def test_prewarm_opens_connections_in_parallel(server):
+    session = create_session()
+    assert prewarm_session(session, server, connections=3) == 3
+    opened = connection_stats(session)["connections"]
+    assert 1 <= opened <= 3
+    session.get(server, timeout=5)
+    assert connection_stats(session)["connections"] == opened
+
+
+def test_socket_options_and_pool_size():
+    options = tcp_socket_options(keepalive_idle=30)
+    assert (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) in options
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30) in options
+    assert tcp_socket_options(keepalive=False) == [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+
+    session = create_session(pool_maxsize=64)
+    adapter = session.get_adapter("https://api.dhan.co")
+    assert isinstance(adapter, TunedHTTPAdapter) and adapter._pool_maxsize == 64
+    options = create_session(keepalive_interval=5, keepalive_count=3).get_adapter("https://").socket_options
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 5) in options
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3) in options
+    assert adapter.poolmanager.connection_pool_kw["socket_options"] == adapter.socket_options
+
+
+def test_dns_cache_ttl_and_invalidation(monkeypatch):
+    calls = []
+
+    def fake_getaddrinfo(host, port, family, kind):
+        calls.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", port))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo)
+    cache = DNSCache(ttl=60)
+    assert cache.resolve("api.dhan.co", 443) == "10.0.0.1"
+    assert cache.resolve("api.dhan.co", 443) == "10.0.0.1"
+    assert calls == ["api.dhan.co"] and cache.hits == 1
+    cache.invalidate("api.dhan.co", 443)
+    cache.resolve("api.dhan.co", 443)
+    uncached = DNSCache(ttl=0)
+    uncached.resolve("api.dhan.co", 443)
+    uncached.resolve("api.dhan.co", 443)
+    assert len(calls) == 4
+
+
+def test_client_uses_tuned_session_without_global_side_effects():
+    import urllib3.util.connection
+    before = urllib3.util.connection.HAS_IPV6
+    api = dhanhq("1", "token", disable_ssl=True, pool={"pool_maxsize": 8, "dns_ttl": 0})
+    assert urllib3.util.connection.HAS_IPV6 == before
+    assert api.session.verify is True
+    assert dhanhq("1", "token", pool={"verify": False}).session.verify is False
+    assert api.session.get_adapter("https://api.dhan.co")._pool_maxsize == 8
+    assert api.connection_stats()["requests"] == 0
+    assert isinstance(api.session, requests.Session)
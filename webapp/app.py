@@ -1,4 +1,6 @@
+import asyncio
 import os
+import threading
 import pandas as pd
 from datetime import datetime, time, date, timedelta
 from flask import Flask, render_template, request, redirect, url_for, flash, session
@@ -6,6 +8,8 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from apscheduler.schedulers.background import BackgroundScheduler
 from dhanhq.dhanhq import dhanhq
+from dhanhq.orderbook import OrderBookCache
+from dhanhq.orderupdate import OrderSocket
 import logging
 
 # --- Basic Logging Setup ---
@@ -89,6 +93,20 @@ def get_api():
     paper = os.getenv("PAPER_TRADING") == "1"
     return dhanhq(client_id, access_token, paper_trading=paper)
 
+# Order book kept current from live order updates, see start_order_cache()
+order_cache = None
+
+def start_order_cache():
+    """Starts an OrderBookCache fed by an OrderSocket running in a daemon thread."""
+    global order_cache
+    api = get_api()
+    if api is None or api.paper_trading:
+        return None
+    socket = OrderSocket(api.client_id, api.access_token)
+    order_cache = OrderBookCache(api, socket)
+    threading.Thread(target=asyncio.run, args=(socket.listen(),), daemon=True).start()
+    return order_cache
+
 # --- Core Trading Logic ---
 def get_opposite_transaction(transaction_type):
     return "BUY" if transaction_type == "SELL" else "SELL"
@@ -102,12 +120,14 @@ def square_off_position(api, strategy, reason=""):
     call_exit_transaction = get_opposite_transaction(strategy.call_transaction_type)
     put_exit_transaction = get_opposite_transaction(strategy.put_transaction_type)
     
-    api.place_order(security_id=strategy.call_security_id, exchange_segment=api.FNO,
-                    transaction_type=call_exit_transaction, quantity=quantity, order_type=api.MARKET,
-                    product_type=strategy.product_type, price=0)
-    api.place_order(security_id=strategy.put_security_id, exchange_segment=api.FNO,
-                    transaction_type=put_exit_transaction, quantity=quantity, order_type=api.MARKET,
-                    product_type=strategy.product_type, price=0)
+    api.place_basket_order([
+        dict(security_id=strategy.call_security_id, exchange_segment=api.FNO,
+             transaction_type=call_exit_transaction, quantity=quantity, order_type=api.MARKET,
+             product_type=strategy.product_type, price=0),
+        dict(security_id=strategy.put_security_id, exchange_segment=api.FNO,
+             transaction_type=put_exit_transaction, quantity=quantity, order_type=api.MARKET,
+             product_type=strategy.product_type, price=0),
+    ])
 
     strategy.trade_active = False
     strategy.status = f'stopped ({reason})'
@@ -172,16 +192,20 @@ def execute_strategies():
                     continue
 
                 quantity = 50 * strategy.lots
-                call_order = api.place_order(security_id=call_sec_id, exchange_segment=api.FNO, transaction_type=strategy.call_transaction_type, quantity=quantity, order_type=api.MARKET, product_type=strategy.product_type, price=0)
-                put_order = api.place_order(security_id=put_sec_id, exchange_segment=api.FNO, transaction_type=strategy.put_transaction_type, quantity=quantity, order_type=api.MARKET, product_type=strategy.product_type, price=0)
+                entry = api.place_basket_order([
+                    dict(security_id=call_sec_id, exchange_segment=api.FNO, transaction_type=strategy.call_transaction_type, quantity=quantity, order_type=api.MARKET, product_type=strategy.product_type, price=0),
+                    dict(security_id=put_sec_id, exchange_segment=api.FNO, transaction_type=strategy.put_transaction_type, quantity=quantity, order_type=api.MARKET, product_type=strategy.product_type, price=0),
+                ], rollback="reverse")
 
-                if call_order.get('status') == 'success' and put_order.get('status') == 'success':
+                if entry.get('status') == 'success':
                     strategy.trade_active = True
                     strategy.status = 'running'
                     strategy.call_security_id = call_sec_id
                     strategy.put_security_id = put_sec_id
                     db.session.commit()
                     logging.info(f"Trade placed successfully for {strategy.name}.")
+                else:
+                    logging.error(f"Entry failed for {strategy.name}: {entry.get('remarks')}")
 
             # Time-based Exit
             if strategy.status == 'running' and current_time >= strategy.exit_time:
@@ -238,7 +262,7 @@ def place_order_route():
 def orders_page():
     if not session.get('logged_in'):
         return redirect(url_for('index'))
-    api = get_api()
+    api = order_cache or get_api()
     data = []
     if api:
         resp = api.get_order_list()
@@ -297,6 +321,8 @@ if __name__ == "__main__":
     scheduler = BackgroundScheduler(daemon=True)
     scheduler.add_job(execute_strategies, 'interval', minutes=1)
     scheduler.start()
+    if os.getenv("ORDER_CACHE") == "1":
+        start_order_cache()
     
     logging.info("Scheduler started. The app is running.")
     app.run(debug=True, use_reloader=False)